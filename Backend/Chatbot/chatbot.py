@@ -5,14 +5,37 @@ Single file with Langchain + Groq + JSON output
 
 import os
 import json
-import requests
-from typing import Dict, Optional, Any
-from datetime import datetime
+import time
+import asyncio
+import uuid
+import httpx
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from pydantic import BaseModel, Field
+from collections import deque
+from statistics import median
+from pydantic import BaseModel, Field, ValidationError
+from .city_matcher import CityMatcher
+from .gazetteer import AUTOCOMPLETE_LIMIT, get_gazetteer
+from .fast_path import classify_intent, fast_recommendation
+from .flight_cache import FlightCache, flight_cache_key
+from .llm_cache import LLMResponseCache
+from .price_history import PriceHistory, offer_prices
+from .price_alerts import PriceAlertMatcher
+from .resilience import Deadline, DeadlineExceeded, LatencyWindow, Upstream, UpstreamUnavailable
+from .flexible_dates import (
+    FLEX_CONCURRENCY,
+    FLEX_MAX_OFFERS,
+    cheapest_calendar,
+    date_window,
+    merge_offers,
+    normalize_offers
+)
+from .conversation_store import ConversationStore
+from authentication.mongo_connection import conversations_collection
 
 load_dotenv()
 
@@ -20,7 +43,17 @@ load_dotenv()
 
 # Groq LLM - Fast model (initialized lazily)
 groq_api_key = os.getenv("GROQ_API_KEY", "")
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "10"))
+# Retries inside one call; repeated failures are left to the circuit breaker
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "1"))
+# Groq free tier: 30 requests per minute
+GROQ_RATE_LIMIT = float(os.getenv("GROQ_RATE_LIMIT", "0.5"))
+GROQ_RATE_BURST = float(os.getenv("GROQ_RATE_BURST", "5"))
+# The LLM is skipped (mock/fast answer instead) when less than this is left of the deadline
+GROQ_MIN_BUDGET = float(os.getenv("GROQ_MIN_BUDGET", "1"))
 llm = None
+# Rate limit + circuit breaker around every LLM call
+groq_upstream = Upstream("groq", GROQ_RATE_LIMIT, GROQ_RATE_BURST)
 
 def get_llm():
     """Get or initialize Groq LLM"""
@@ -30,77 +63,326 @@ def get_llm():
             model="openai/gpt-oss-120b",
             api_key=groq_api_key,
             temperature=0.3,
-            max_tokens=1024
+            max_tokens=1024,
+            timeout=GROQ_TIMEOUT,
+            max_retries=GROQ_MAX_RETRIES
         )
     return llm
 
 # Amadeus API credentials
 AMADEUS_CLIENT_ID = os.getenv("AMADEUS_KEY", "")
 AMADEUS_CLIENT_SECRET = os.getenv("SECRET", "")
+# Overridable so the client can be pointed at a local stub server
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
+
+# Connection pool for the shared keep-alive HTTP client
+AMADEUS_MAX_CONNECTIONS = int(os.getenv("AMADEUS_MAX_CONNECTIONS", "20"))
+AMADEUS_MAX_KEEPALIVE = int(os.getenv("AMADEUS_MAX_KEEPALIVE", "10"))
+AMADEUS_KEEPALIVE_EXPIRY = float(os.getenv("AMADEUS_KEEPALIVE_EXPIRY", "30"))
+AMADEUS_TIMEOUT = float(os.getenv("AMADEUS_TIMEOUT", "5"))
+# Amadeus self-service quota: 10 transactions per second on the test environment
+AMADEUS_RATE_LIMIT = float(os.getenv("AMADEUS_RATE_LIMIT", "10"))
+AMADEUS_RATE_BURST = float(os.getenv("AMADEUS_RATE_BURST", "10"))
+# Send a second flight-offers request when the first is slower than the recent p95
+AMADEUS_HEDGING = os.getenv("AMADEUS_HEDGING", "1") == "1"
+AMADEUS_HEDGE_MIN_DELAY = float(os.getenv("AMADEUS_HEDGE_MIN_DELAY", "0.05"))
+
+# End-to-end latency target of one chat/recommendation request, in seconds
+CHAT_LATENCY_TARGET = float(os.getenv("CHAT_LATENCY_TARGET", "8"))
+
+
+def chat_deadline() -> Deadline:
+    """Deadline of a chat request, started by the route handler"""
+    return Deadline(CHAT_LATENCY_TARGET)
+
+# Refresh the OAuth token this long before Amadeus expires it
+TOKEN_REFRESH_MARGIN = 60
+
+# Searches without a date look this many days ahead
+DEFAULT_DEPARTURE_DAYS_AHEAD = int(os.getenv("DEFAULT_DEPARTURE_DAYS_AHEAD", "7"))
+
+
+def default_departure_date() -> str:
+    return (date.today() + timedelta(days=DEFAULT_DEPARTURE_DAYS_AHEAD)).isoformat()
 
 # ==================== AMADEUS API INTEGRATION ====================
 
 class AmadeusClient:
-    """Fast Amadeus API client for flight data"""
-    
-    BASE_URL = "https://test.api.amadeus.com"
+    """Async Amadeus API client on a pooled, keep-alive HTTP connection"""
     
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str = AMADEUS_BASE_URL,
+        max_connections: int = AMADEUS_MAX_CONNECTIONS,
+        max_keepalive: int = AMADEUS_MAX_KEEPALIVE,
+        keepalive_expiry: float = AMADEUS_KEEPALIVE_EXPIRY,
+        timeout: float = AMADEUS_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[FlightCache] = None,
+        price_history: Optional[PriceHistory] = None,
+        alert_matcher: Optional[PriceAlertMatcher] = None,
+        upstream: Optional[Upstream] = None,
+        hedging: bool = AMADEUS_HEDGING
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.transport = transport
+        self.cache = cache if cache is not None else FlightCache()
+        # Fresh upstream fares are appended here (cache hits are not re-recorded)
+        self.price_history = price_history
+        self.alert_matcher = alert_matcher
+        # Calls are rate limited, and skipped outright while Amadeus keeps failing
+        if upstream is None:
+            upstream = Upstream("amadeus", AMADEUS_RATE_LIMIT, AMADEUS_RATE_BURST)
+        self.upstream = upstream
+        self.hedging = hedging
+        self.offer_latency = LatencyWindow()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.deadline_misses = 0
         self.token = None
-        self.token_expiry = 0
+        self.token_expiry = 0.0
+        self.token_fetches = 0
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._token_refresh: Optional[asyncio.Future] = None
     
-    def get_token(self) -> Optional[str]:
-        """Get OAuth2 token from Amadeus"""
-        if self.token and datetime.now().timestamp() < self.token_expiry:
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created on first use in the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport
+            )
+            self._http_loop = loop
+        return self._http
+    
+    async def aclose(self):
+        """Close pooled connections (call on app shutdown)"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+    
+    async def get_token(self) -> Optional[str]:
+        """
+        Get OAuth2 token from Amadeus.
+
+        Single-flight: callers arriving while a refresh is running await that
+        same refresh instead of requesting their own token.
+        """
+        if self.token and time.monotonic() < self.token_expiry:
             return self.token
+        if not self.client_id or not self.client_secret:
+            return None
         
+        if self._token_refresh is None:
+            self._token_refresh = asyncio.ensure_future(self._fetch_token())
+        # Shielded so one cancelled caller doesn't cancel the refresh for everyone
+        return await asyncio.shield(self._token_refresh)
+    
+    async def _fetch_token(self) -> Optional[str]:
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/v1/security/oauth2/token",
+            self.token_fetches += 1
+            response = await self.http.post(
+                "/v1/security/oauth2/token",
                 data={
                     "grant_type": "client_credentials",
                     "client_id": self.client_id,
                     "client_secret": self.client_secret
-                },
-                timeout=5
+                }
             )
             if response.status_code == 200:
                 data = response.json()
+                expires_in = data.get("expires_in", 1800)
                 self.token = data.get("access_token")
-                self.token_expiry = datetime.now().timestamp() + data.get("expires_in", 1800)
+                self.token_expiry = time.monotonic() + expires_in - min(TOKEN_REFRESH_MARGIN, expires_in / 2)
                 return self.token
         except Exception as e:
             print(f"Token error: {e}")
+        finally:
+            self._token_refresh = None
         return None
     
-    def get_flights(self, origin: str, destination: str) -> Dict[str, Any]:
-        """Fetch flights from Amadeus API"""
-        token = self.get_token()
-        if not token:
+    async def get_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: Optional[str] = None,
+        adults: int = 1,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch flights from Amadeus API, through the flight-offer cache
+        
+        With a ``deadline``, waits at most for the time left; the upstream call
+        itself carries on in the background and fills the cache.
+        """
+        departure_date = departure_date or default_departure_date()
+        lookup = self._cached_flights(origin, destination, departure_date, adults)
+        try:
+            data = await (deadline.run(lookup, "flight offers") if deadline is not None else lookup)
+        except DeadlineExceeded:
+            self.deadline_misses += 1
+            data = None
+        if data is None:
             return self._get_mock_flights(origin, destination)
+        return {"source": "amadeus", "data": data}
+    
+    async def _cached_flights(
+        self, origin: str, destination: str, departure_date: str, adults: int, fetched: Optional[set] = None
+    ) -> Optional[Dict]:
+        """Offers for one day from the cache, else upstream; upstream days are added to ``fetched``"""
+        async def fetch():
+            if fetched is not None:
+                fetched.add(departure_date)
+            return await self._fetch_flights(origin, destination, departure_date, adults)
+        
+        return await self.cache.get_or_fetch(flight_cache_key(origin, destination, departure_date, adults), fetch)
+    
+    async def get_flight_calendar(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: Optional[str] = None,
+        flex_days: int = 0,
+        adults: int = 1,
+        concurrency: int = FLEX_CONCURRENCY
+    ) -> Dict[str, Any]:
+        """
+        Flights for every day in ``departure_date ± flex_days``, merged, with a cheapest-per-day calendar
+        
+        Days are fetched in parallel, at most ``concurrency`` at a time, each
+        through the flight cache, so a ±3 window costs at most 7 upstream calls
+        and none for days already cached. A day whose fetch fails falls back to
+        the mock flights, like ``get_flights``.
+        """
+        center = date.fromisoformat(departure_date or default_departure_date())
+        days = [day.isoformat() for day in date_window(center, flex_days)]
+        semaphore = asyncio.Semaphore(concurrency)
+        fetched: set = set()
+        
+        async def fetch_day(day: str) -> Tuple[str, str, List[Dict[str, Any]]]:
+            async with semaphore:
+                data = await self._cached_flights(origin, destination, day, adults, fetched)
+            if data is None:
+                return day, "mock", normalize_offers(self._get_mock_flights(origin, destination)["data"], day)
+            return day, "amadeus", normalize_offers(data, day)
+        
+        sources: Dict[str, str] = {}
+        offers: List[Dict[str, Any]] = []
+        for day, source, day_offers in await asyncio.gather(*(fetch_day(day) for day in days)):
+            sources[day] = source
+            offers.extend(day_offers)
+        merged = merge_offers(offers)
+        calendar = cheapest_calendar(days, merged, sources)
+        priced = [entry for entry in calendar if entry["min_price"] is not None]
+        return {
+            "origin": origin.upper(),
+            "destination": destination.upper(),
+            "departure_date": center.isoformat(),
+            "flex_days": flex_days,
+            "calendar": calendar,
+            "cheapest": min(priced, key=lambda entry: entry["min_price"]) if priced else None,
+            "offers": merged[:FLEX_MAX_OFFERS],
+            "total_offers": len(merged),
+            "upstream_calls": len(fetched)
+        }
+    
+    async def _fetch_flights(self, origin: str, destination: str, departure_date: str, adults: int) -> Optional[Dict]:
+        """One upstream call (token + flight offers); None on failure or when the breaker is open"""
+        if not self.client_id or not self.client_secret:
+            return None
         
         try:
-            headers = {"Authorization": f"Bearer {token}"}
-            params = {
-                "originLocationCode": origin,
-                "destinationLocationCode": destination,
-                "departureDate": "2024-12-25",
-                "adults": "1"
-            }
-            response = requests.get(
-                f"{self.BASE_URL}/v2/shopping/flight-offers",
-                headers=headers,
-                params=params,
-                timeout=5
-            )
-            if response.status_code == 200:
-                return {"source": "amadeus", "data": response.json()}
+            async with self.upstream.attempt() as attempt:
+                token = await self.get_token()
+                if not token:
+                    attempt.fail()
+                    return None
+                
+                headers = {"Authorization": f"Bearer {token}"}
+                params = {
+                    "originLocationCode": origin,
+                    "destinationLocationCode": destination,
+                    "departureDate": departure_date,
+                    "adults": str(adults)
+                }
+                response = await self._get_offers(headers, params)
+                if response.status_code == 200:
+                    data = response.json()
+                    prices = offer_prices(data)
+                    if self.price_history is not None:
+                        self.price_history.record(origin, destination, departure_date, prices)
+                    if self.alert_matcher is not None:
+                        self.alert_matcher.observe(origin, destination, prices)
+                    return data
+                # Throttling and server errors count against Amadeus; a bad request does not
+                if response.status_code == 429 or response.status_code >= 500:
+                    attempt.fail()
+        except UpstreamUnavailable:
+            pass
         except Exception as e:
             print(f"Flight fetch error: {e}")
+        return None
+    
+    async def _get_offers(self, headers: Dict[str, str], params: Dict[str, str]) -> httpx.Response:
+        """
+        GET flight offers, hedged: if the request is still running after the
+        recent p95 latency, a second identical request is sent (when the rate
+        limit has a token to spare) and the first good response wins.
+        """
+        async def timed() -> httpx.Response:
+            started = time.perf_counter()
+            response = await self.http.get("/v2/shopping/flight-offers", headers=headers, params=params)
+            self.offer_latency.record(time.perf_counter() - started)
+            return response
+        
+        hedge_delay = self.offer_latency.p95() if self.hedging else None
+        if hedge_delay is None:
+            return await timed()
         
-        return self._get_mock_flights(origin, destination)
+        first = asyncio.ensure_future(timed())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(hedge_delay, AMADEUS_HEDGE_MIN_DELAY))
+            if not done and self.upstream.bucket.reserve(0) is not None:
+                tasks.add(asyncio.ensure_future(timed()))
+                self.hedges_sent += 1
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    if first not in succeeded:
+                        self.hedges_won += 1
+                    return succeeded[0].result()
+                if not tasks:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def hedge_stats(self) -> Dict[str, Any]:
+        p95 = self.offer_latency.p95()
+        return {
+            "enabled": self.hedging,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "deadline_misses": self.deadline_misses
+        }
     
     def _get_mock_flights(self, origin: str, destination: str) -> Dict[str, Any]:
         """Fallback mock flight data - super fast"""
@@ -139,8 +421,15 @@ class AmadeusClient:
             }
         }
 
+# Fare observations behind /prices and the price forecasts
+price_history = PriceHistory()
+# Fresh fares are also matched against users' price alerts
+alert_matcher = PriceAlertMatcher()
+
 # Initialize Amadeus client
-amadeus = AmadeusClient(AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET)
+amadeus = AmadeusClient(
+    AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET, price_history=price_history, alert_matcher=alert_matcher
+)
 
 # ==================== PYDANTIC OUTPUT MODELS ====================
 
@@ -164,18 +453,10 @@ class RouteRecommendation(BaseModel):
 
 # ==================== LANGCHAIN SETUP ====================
 
-# City to airport code mapping
-CITY_AIRPORT_MAP = {
-    "delhi": "DEL", "new delhi": "DEL", "dilli": "DEL",
-    "mumbai": "BOM", "bombay": "BOM",
-    "bangalore": "BLR", "bengaluru": "BLR",
-    "hyderabad": "HYD", "kolkata": "CCU", "calcutta": "CCU",
-    "goa": "GOI", "gurugram": "DEL", "noida": "DEL"
-}
-
 def get_airport_code(city: str) -> str:
-    """Convert city name to airport code"""
-    return CITY_AIRPORT_MAP.get(city.lower().strip(), city.upper()[:3])
+    """Convert city name (or alias) to its IATA airport code via the gazetteer"""
+    # Cities without an airport keep the old 3-letter placeholder
+    return get_gazetteer().airport_code(city) or city.upper()[:3]
 
 # JSON Output Parser
 output_parser = JsonOutputParser(pydantic_object=RouteRecommendation)
@@ -214,14 +495,70 @@ def get_chain():
         # Fallback chain without LLM for testing/mock mode
         return None
 
+_city_matcher: Optional[CityMatcher] = None
+
+def get_city_matcher() -> CityMatcher:
+    """Compile the city matcher once from the gazetteer's names, aliases and IATA codes"""
+    global _city_matcher
+    if _city_matcher is None:
+        places = get_gazetteer()
+        _city_matcher = CityMatcher(places.aliases(), places.iata_codes())
+    return _city_matcher
+
+def extract_route(message: str) -> Tuple[Optional[str], Optional[str]]:
+    """Source and destination cities in a chat message ("from X to Y", "Y from X", "X to Y")"""
+    return get_city_matcher().extract_route(message)
+
+CLARIFICATION_RESPONSE = {
+    "status": "clarification_needed",
+    "message": "Please specify source and destination cities (e.g., 'flights from Delhi to Mumbai')",
+    "data": None
+}
+
+def summarize_response(response: Dict[str, Any]) -> str:
+    """What the assistant said, as stored in the conversation history"""
+    data = response.get("data")
+    if isinstance(data, dict) and data.get("recommendation_reason"):
+        return data["recommendation_reason"]
+    return response.get("message") or response.get("status", "")
+
 # ==================== MAIN CHATBOT CLASS ====================
 
+class ServingPathStats:
+    """Request count and recent latencies per serving path (fast_path, groq_ai, ...)"""
+    
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.counts: Dict[str, int] = {}
+        self.latencies: Dict[str, deque] = {}
+    
+    def record(self, path: str, seconds: float):
+        self.counts[path] = self.counts.get(path, 0) + 1
+        self.latencies.setdefault(path, deque(maxlen=self.window)).append(seconds)
+    
+    def summary(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        return {
+            path: {
+                "requests": count,
+                "share": round(count / total, 3),
+                "p50_ms": round(median(self.latencies[path]) * 1000, 3),
+                "mean_ms": round(sum(self.latencies[path]) / len(self.latencies[path]) * 1000, 3)
+            }
+            for path, count in self.counts.items()
+        }
+
 class GroqTravelAssistant:
     """Fast travel assistant using Groq LLM"""
     
     def __init__(self):
         self.amadeus = amadeus
-        self.conversation_history = []
+        self.llm_cache = LLMResponseCache()
+        self.path_stats = ServingPathStats()
+        # Requests whose deadline left no time for (or cut short) the LLM call
+        self.llm_deadline_misses = 0
+        # Per-session ring buffers, written behind to Mongo
+        self.conversations = ConversationStore(conversations_collection)
     
     def _generate_mock_recommendation(self, source: str, destination: str, flights: list) -> Dict[str, Any]:
         """Generate mock recommendation when Groq not available"""
@@ -248,11 +585,13 @@ class GroqTravelAssistant:
             "recommendation_reason": "Fast mock recommendation (Groq LLM not configured). Add GROQ_API_KEY to .env for AI recommendations."
         }
     
-    def get_recommendation(
+    async def get_recommendation(
         self, 
         source: str, 
         destination: str, 
-        query: str = "What's the best flight option?"
+        query: str = "What's the best flight option?",
+        departure_date: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
         """
         Get travel recommendation - FAST
@@ -261,41 +600,115 @@ class GroqTravelAssistant:
             source: Starting city (e.g., "Delhi")
             destination: Destination city (e.g., "Mumbai")
             query: User's specific question (optional)
+            departure_date: ISO date to search (default: DEFAULT_DEPARTURE_DAYS_AHEAD from today)
+            deadline: End-to-end budget; flights and the LLM get what is left of it
         
         Returns:
-            JSON response with flight recommendations
+            JSON response with flight recommendations; ``source`` names the
+            path that served it (fast_path, groq_ai or mock_recommendation)
         """
+        started = time.perf_counter()
+        response = await self._recommend(source, destination, query, departure_date, deadline)
+        path = response.get("source", "error")
+        if response.get("llm_cache") in ("exact", "similar"):
+            path = "groq_ai_cached"
+        self.path_stats.record(path, time.perf_counter() - started)
+        return response
+    
+    async def _fetch_flight_list(
+        self, source_code: str, dest_code: str, departure_date: Optional[str] = None, deadline: Optional[Deadline] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Flights from Amadeus (or mock) and which of the two served them"""
+        flight_response = await self.amadeus.get_flights(source_code, dest_code, departure_date, deadline=deadline)
+        if "data" in flight_response and "flights" in flight_response["data"]:
+            flights = flight_response["data"]["flights"]
+        else:
+            flights = []
+        return flights, flight_response.get("source", "mock")
+    
+    def _fast_path(
+        self, source: str, destination: str, source_code: str, dest_code: str, flights: list, intent: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Ranked recommendation for a cheapest/fastest/earliest/latest query, if the flights allow it"""
+        if not intent or not flights:
+            return None
+        try:
+            typed_flights = [Flight(**flight).model_dump() for flight in flights]
+        except (ValidationError, TypeError):
+            return None
+        return fast_recommendation(source, destination, source_code, dest_code, typed_flights, intent)
+    
+    @staticmethod
+    def _chain_inputs(source: str, destination: str, flights: list, query: str) -> Dict[str, str]:
+        return {
+            "source_city": source.title(),
+            "destination_city": destination.title(),
+            "flight_data": json.dumps(flights, indent=2),
+            "user_query": query
+        }
+    
+    @staticmethod
+    def _check_llm_budget(deadline: Optional[Deadline]):
+        """Raise DeadlineExceeded when too little time is left for an LLM call to finish"""
+        if deadline is not None and deadline.remaining() < GROQ_MIN_BUDGET:
+            raise DeadlineExceeded("not enough time left for the LLM")
+    
+    async def _invoke_llm(self, chain, inputs: Dict[str, str], deadline: Optional[Deadline]) -> Dict[str, Any]:
+        self._check_llm_budget(deadline)
+        async with groq_upstream.attempt():
+            call = chain.ainvoke(inputs)
+            return await (deadline.run(call, "LLM") if deadline is not None else call)
+    
+    async def _recommend(
+        self,
+        source: str,
+        destination: str,
+        query: str,
+        departure_date: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         try:
             # Get airport codes
             source_code = get_airport_code(source)
             dest_code = get_airport_code(destination)
             
             # Fetch flights from Amadeus (or mock)
-            flight_response = self.amadeus.get_flights(source_code, dest_code)
+            flights, amadeus_source = await self._fetch_flight_list(source_code, dest_code, departure_date, deadline)
             
-            # Format flight data for LLM
-            if "data" in flight_response and "flights" in flight_response["data"]:
-                flights = flight_response["data"]["flights"]
-            else:
-                flights = []
+            # Cheapest/fastest/earliest/latest questions are ranked directly, no LLM needed
+            intent = classify_intent(query)
+            recommendation = self._fast_path(source, destination, source_code, dest_code, flights, intent)
+            if recommendation is not None:
+                return {
+                    "status": "success",
+                    "data": recommendation,
+                    "source": "fast_path",
+                    "intent": intent,
+                    "amadeus_source": amadeus_source
+                }
             
             # Try to use Groq LLM if available
             chain = get_chain()
             if chain:
                 try:
-                    flight_data_str = json.dumps(flights, indent=2)
-                    recommendation = chain.invoke({
-                        "source_city": source.title(),
-                        "destination_city": destination.title(),
-                        "flight_data": flight_data_str,
-                        "user_query": query
-                    })
+                    recommendation, cache_tier = self.llm_cache.lookup(source, destination, flights, query)
+                    if recommendation is None:
+                        started = time.perf_counter()
+                        recommendation = await self._invoke_llm(
+                            chain, self._chain_inputs(source, destination, flights, query), deadline
+                        )
+                        self.llm_cache.store_result(
+                            source, destination, flights, query, recommendation, time.perf_counter() - started
+                        )
                     return {
                         "status": "success",
                         "data": recommendation,
                         "source": "groq_ai",
-                        "amadeus_source": flight_response.get("source", "mock")
+                        "amadeus_source": amadeus_source,
+                        "llm_cache": cache_tier or "miss"
                     }
+                except DeadlineExceeded:
+                    self.llm_deadline_misses += 1
                 except Exception as e:
                     print(f"LLM error: {e}, using mock recommendation")
             
@@ -305,7 +718,7 @@ class GroqTravelAssistant:
                 "status": "success",
                 "data": recommendation,
                 "source": "mock_recommendation",
-                "amadeus_source": flight_response.get("source", "mock"),
+                "amadeus_source": amadeus_source,
                 "note": "Using mock recommendation (add GROQ_API_KEY for AI-powered responses)"
             }
             
@@ -316,70 +729,239 @@ class GroqTravelAssistant:
                 "data": None
             }
     
-    def chat(self, user_message: str) -> Dict[str, Any]:
+    async def stream_recommendation(
+        self,
+        source: str,
+        destination: str,
+        query: str = "What's the best flight option?",
+        departure_date: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of get_recommendation, yielding (event, data) pairs
+        
+        Events, in order:
+        - ``route``: cities and airport codes, before any I/O
+        - ``flights``: the flight list, ranked (cheapest first unless the query asks otherwise)
+        - ``reason``: ``{"delta": ...}`` chunks of recommendation_reason as the LLM writes it
+        - ``recommendation``: the complete RouteRecommendation
+        - ``done``: which path served it; or ``error`` instead of the rest
+        """
+        started = time.perf_counter()
+        path = "error"
+        try:
+            source_code = get_airport_code(source)
+            dest_code = get_airport_code(destination)
+            yield "route", {
+                "source_city": source.title(),
+                "destination_city": destination.title(),
+                "source_airport": source_code,
+                "destination_airport": dest_code
+            }
+            
+            flights, amadeus_source = await self._fetch_flight_list(source_code, dest_code, departure_date, deadline)
+            intent = classify_intent(query)
+            ranked = self._fast_path(source, destination, source_code, dest_code, flights, intent or "cheapest")
+            yield "flights", {
+                "all_flights": ranked["all_flights"] if ranked else flights,
+                "amadeus_source": amadeus_source
+            }
+            
+            recommendation = None
+            if intent and ranked:
+                path, recommendation = "fast_path", ranked
+                yield "reason", {"delta": recommendation["recommendation_reason"]}
+            
+            chain = get_chain() if recommendation is None else None
+            if chain:
+                try:
+                    cached, cache_tier = self.llm_cache.lookup(source, destination, flights, query)
+                    if cached is not None:
+                        path, recommendation = "groq_ai_cached", cached
+                        yield "reason", {"delta": cached.get("recommendation_reason", "")}
+                    else:
+                        llm_started = time.perf_counter()
+                        partial: Dict[str, Any] = {}
+                        sent = 0
+                        self._check_llm_budget(deadline)
+                        # JsonOutputParser streams partially parsed objects; forward the reason as it grows
+                        async with groq_upstream.attempt():
+                            chunks = chain.astream(self._chain_inputs(source, destination, flights, query))
+                            try:
+                                while True:
+                                    # Each chunk may take what is left of the deadline
+                                    step = anext(chunks)
+                                    try:
+                                        partial = await (deadline.run(step, "LLM") if deadline is not None else step)
+                                    except StopAsyncIteration:
+                                        break
+                                    reason = partial.get("recommendation_reason") if isinstance(partial, dict) else None
+                                    if isinstance(reason, str) and len(reason) > sent:
+                                        yield "reason", {"delta": reason[sent:]}
+                                        sent = len(reason)
+                            finally:
+                                await chunks.aclose()
+                        path, recommendation = "groq_ai", partial
+                        self.llm_cache.store_result(
+                            source, destination, flights, query, recommendation, time.perf_counter() - llm_started
+                        )
+                except DeadlineExceeded:
+                    self.llm_deadline_misses += 1
+                except Exception as e:
+                    print(f"LLM error: {e}, using mock recommendation")
+            
+            if recommendation is None:
+                path = "mock_recommendation"
+                recommendation = self._generate_mock_recommendation(source, destination, flights)
+                yield "reason", {"delta": recommendation["recommendation_reason"]}
+            
+            yield "recommendation", recommendation
+            yield "done", {"source": path, "amadeus_source": amadeus_source}
+        except Exception as e:
+            yield "error", {"message": str(e)}
+        finally:
+            self.path_stats.record(path, time.perf_counter() - started)
+    
+    async def chat(
+        self, user_message: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """
         Multi-turn conversation - extracts source/destination from message
         
         Args:
             user_message: User's query (e.g., "flights from Delhi to Mumbai")
+            session_id: Conversation to continue; a new one is started if omitted
+            deadline: End-to-end budget of this turn
         
         Returns:
-            JSON response
+            JSON response, including the ``session_id``
         """
-        # Store in history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Simple extraction of source and destination
-        words = user_message.lower().split()
-        source = destination = None
+        session_id = session_id or uuid.uuid4().hex
+        self.conversations.append(session_id, "user", user_message)
         
-        # Extract cities from message
-        all_cities = list(CITY_AIRPORT_MAP.keys())
-        for word in words:
-            if word in all_cities:
-                if source is None:
-                    source = word.title()
-                else:
-                    destination = word.title()
-                    break
+        source, destination = extract_route(user_message)
         
         # If not found, ask for clarification
         if not source or not destination:
-            response = {
-                "status": "clarification_needed",
-                "message": "Please specify source and destination cities (e.g., 'flights from Delhi to Mumbai')",
-                "data": None
-            }
+            response = dict(CLARIFICATION_RESPONSE)
         else:
-            response = self.get_recommendation(source, destination, user_message)
-        
-        # Store response
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": str(response),
-            "timestamp": datetime.now().isoformat()
-        })
+            response = await self.get_recommendation(source, destination, user_message, deadline=deadline)
         
+        self.conversations.append(session_id, "assistant", summarize_response(response))
+        response["session_id"] = session_id
         return response
 
+    async def stream_chat(
+        self, user_message: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Streaming variant of chat: a ``session`` event, then the stream_recommendation events"""
+        session_id = session_id or uuid.uuid4().hex
+        self.conversations.append(session_id, "user", user_message)
+        yield "session", {"session_id": session_id}
+        
+        source, destination = extract_route(user_message)
+        final: Dict[str, Any] = dict(CLARIFICATION_RESPONSE)
+        if not source or not destination:
+            yield "clarification", final
+        else:
+            async for event, data in self.stream_recommendation(source, destination, user_message, deadline=deadline):
+                if event == "recommendation":
+                    final = {"status": "success", "data": data}
+                elif event == "error":
+                    final = {"status": "error", "message": data["message"], "data": None}
+                yield event, data
+        
+        self.conversations.append(session_id, "assistant", summarize_response(final))
+
 # ==================== GLOBAL INSTANCE ====================
 
 travel_assistant = GroqTravelAssistant()
 
 # ==================== UTILITY FUNCTIONS ====================
 
-def get_travel_recommendation(source: str, destination: str, query: str = "") -> Dict[str, Any]:
+async def get_travel_recommendation(
+    source: str,
+    destination: str,
+    query: str = "",
+    departure_date: Optional[str] = None,
+    deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
     """Public function to get travel recommendation"""
-    return travel_assistant.get_recommendation(source, destination, query)
+    return await travel_assistant.get_recommendation(source, destination, query, departure_date, deadline)
 
-def chat_with_assistant(user_message: str) -> Dict[str, Any]:
+async def chat_with_assistant(
+    user_message: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
     """Public function for multi-turn conversation"""
-    return travel_assistant.chat(user_message)
+    return await travel_assistant.chat(user_message, session_id, deadline)
+
+def stream_travel_recommendation(
+    source: str,
+    destination: str,
+    query: str = "",
+    departure_date: Optional[str] = None,
+    deadline: Optional[Deadline] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Public function to stream a travel recommendation as (event, data) pairs"""
+    return travel_assistant.stream_recommendation(source, destination, query, departure_date, deadline)
+
+def stream_chat_with_assistant(
+    user_message: str, session_id: Optional[str] = None, deadline: Optional[Deadline] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Public function to stream a chat turn as (event, data) pairs"""
+    return travel_assistant.stream_chat(user_message, session_id, deadline)
+
+def get_conversation_history(session_id: str) -> List[Dict[str, Any]]:
+    """Recent messages of one chat session"""
+    return travel_assistant.conversations.history(session_id)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the response caches"""
+    return {
+        "flight_cache": amadeus.cache.stats(),
+        "llm_cache": travel_assistant.llm_cache.stats(),
+        "serving_paths": travel_assistant.path_stats.summary(),
+        "conversations": travel_assistant.conversations.stats(),
+        "price_history": price_history.stats(),
+        "price_alerts": alert_matcher.stats(),
+        "upstreams": get_upstream_status()
+    }
+
+def get_upstream_status() -> Dict[str, Any]:
+    """Circuit-breaker state and rate-limit counters per upstream API"""
+    return {
+        "amadeus": {**amadeus.upstream.stats(), "hedging": amadeus.hedge_stats()},
+        "groq": {**groq_upstream.stats(), "deadline_misses": travel_assistant.llm_deadline_misses},
+        "latency_target_seconds": CHAT_LATENCY_TARGET
+    }
 
 def get_available_cities() -> Dict[str, list]:
     """Get list of available cities"""
-    return {"cities": sorted(list(set(CITY_AIRPORT_MAP.keys())))}
+    return {"cities": get_gazetteer().airport_cities()}
+
+def autocomplete_cities(query: str, limit: int = AUTOCOMPLETE_LIMIT) -> Dict[str, Any]:
+    """Cities/airports starting with ``query``, best connected first"""
+    return {"query": query, "results": get_gazetteer().autocomplete(query, limit)}
+
+def get_price_history(origin: str, destination: str, departure_date: Optional[str] = None) -> Dict[str, Any]:
+    """Daily fare rollups (min/mean/percentiles) of a route, cities or IATA codes"""
+    origin_code, destination_code = get_airport_code(origin), get_airport_code(destination)
+    return {
+        "origin": origin_code,
+        "destination": destination_code,
+        "daily": price_history.daily_stats(origin_code, destination_code, departure_date)
+    }
+
+def get_price_forecast(origin: str, destination: str, departure_date: Optional[str] = None) -> Dict[str, Any]:
+    """Will the fare for this departure date get cheaper? From the precomputed rollups"""
+    return price_history.forecast(
+        get_airport_code(origin), get_airport_code(destination), departure_date or default_departure_date()
+    )
+
+async def get_flight_calendar(
+    origin: str, destination: str, departure_date: Optional[str] = None, flex_days: int = 0, adults: int = 1
+) -> Dict[str, Any]:
+    """Flights around a date (cities or IATA codes) with the cheapest fare per day"""
+    return await amadeus.get_flight_calendar(
+        get_airport_code(origin), get_airport_code(destination), departure_date, flex_days, adults
+    )
@@ -0,0 +1,238 @@
+"""
+Compiled city/alias matcher for chat entity extraction
+
+All city names, aliases, IATA codes and dataset cities are compiled once
+into an Aho-Corasick automaton, so a message is scanned in a single
+O(message length) pass however many aliases there are. Matches must sit on
+word boundaries ("goa" does not match inside "goal"), overlapping matches
+keep the longest ("new delhi" over "delhi"), and IATA codes only match
+when written in upper case ("DEL", not "del").
+
+Words left unmatched are looked up in a BK-tree of the aliases, so typos
+like "dehli" or "bangalor" still resolve (edit distance 1 for words of 5-7
+letters, 2 from 8 letters; shorter words are too close to ordinary ones,
+e.g. "june" / "pune").
+
+"from X to Y" / "to Y from X" cues decide which city is the source;
+without cues the first city mentioned is the source. A city after "via" is
+a stopover and is neither source nor destination.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SOURCE_CUES = {"from", "leaving", "departing"}
+DESTINATION_CUES = {"to", "towards", "into", "reach", "reaching", "arriving", "destination"}
+STOPOVER_CUES = {"via", "through"}
+
+# Never fuzzy-matched against city names
+STOPWORDS = {
+    "from", "flight", "flights", "fly", "flying", "train", "trains", "best", "option", "options",
+    "cheapest", "fastest", "earliest", "latest", "what", "which", "where", "when", "there",
+    "please", "want", "would", "like", "need", "book", "travel", "trip", "today", "tomorrow",
+    "show", "find", "give", "tell", "with", "going", "leaving", "reach", "about", "route", "routes"
+}
+
+
+class CityMatch(NamedTuple):
+    city: str  # display name passed on to get_airport_code, e.g. "Delhi"
+    start: int  # character span in the normalised message
+    end: int
+    kind: str  # "alias", "iata" or "fuzzy"
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase with punctuation turned into spaces, keeping character offsets"""
+    return re.sub(r"[^0-9a-z_]", " ", text.lower())
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps cost 1), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class BKTree:
+    """Metric tree over strings for bounded edit-distance lookups"""
+
+    def __init__(self, words: Iterable[str]):
+        self.root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            distance = osa_distance(word, node[0], 64)
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> Optional[Tuple[int, str]]:
+        """Closest (distance, word) within max_distance, or None"""
+        if self.root is None:
+            return None
+        best: Optional[Tuple[int, str]] = None
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = osa_distance(word, node_word, max_distance + 64)
+            if distance <= max_distance and (best is None or (distance, node_word) < best):
+                best = (distance, node_word)
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return best
+
+
+class CityMatcher:
+    """Aho-Corasick automaton over city aliases plus a BK-tree for typos"""
+
+    def __init__(self, aliases: Dict[str, str], iata_codes: Dict[str, str]):
+        """
+        Args:
+            aliases: lowercase alias (may be several words) -> display city name
+            iata_codes: upper-case IATA code -> display city name
+        """
+        self._patterns: List[Tuple[str, str, str]] = []  # (pattern, city, kind)
+        for alias, city in aliases.items():
+            pattern = " ".join(normalize_text(alias).split())
+            if pattern:
+                self._patterns.append((pattern, city, "alias"))
+        for code, city in iata_codes.items():
+            self._patterns.append((code.lower(), city, "iata"))
+
+        # Trie: goto transitions, failure links and pattern ids ending at each node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, (pattern, _, _) in enumerate(self._patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+        # Fuzzy tier: plain-word aliases only (no codes, no anonymised "city_01234" names)
+        self._fuzzy_cities: Dict[str, str] = {
+            pattern: city for pattern, city, kind in self._patterns
+            if kind == "alias" and len(pattern) >= 4 and not any(c.isdigit() for c in pattern)
+        }
+        self._bk_tree = BKTree(self._fuzzy_cities)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def find_all(self, message: str) -> List[CityMatch]:
+        """Non-overlapping city mentions in message order"""
+        text = normalize_text(message)
+        candidates: List[Tuple[int, int, int]] = []  # (start, end, pattern index)
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for index in self._out[node]:
+                start = position - len(self._patterns[index][0]) + 1
+                end = position + 1
+                if (start > 0 and text[start - 1] != " ") or (end < len(text) and text[end] != " "):
+                    continue
+                if self._patterns[index][2] == "iata" and not message[start:end].isupper():
+                    continue
+                candidates.append((start, end, index))
+
+        # Leftmost-longest, non-overlapping
+        candidates.sort(key=lambda c: (c[0], -(c[1] - c[0])))
+        matches: List[CityMatch] = []
+        covered_until = 0
+        for start, end, index in candidates:
+            if start < covered_until:
+                continue
+            _, city, kind = self._patterns[index]
+            matches.append(CityMatch(city, start, end, kind))
+            covered_until = end
+
+        # Typo tolerance for the words no pattern covered
+        for word_match in re.finditer(r"[a-z]+", text):
+            word = word_match.group()
+            if len(word) < 5 or word in STOPWORDS:
+                continue
+            if any(m.start <= word_match.start() < m.end for m in matches):
+                continue
+            found = self._bk_tree.search(word, 1 if len(word) < 8 else 2)
+            if found is not None:
+                matches.append(CityMatch(self._fuzzy_cities[found[1]], word_match.start(), word_match.end(), "fuzzy"))
+
+        matches.sort(key=lambda m: m.start)
+        return matches
+
+    def extract_route(self, message: str) -> Tuple[Optional[str], Optional[str]]:
+        """(source, destination) display names using from/to cues, else mention order
+
+        (None, None) when both ends are the same city, e.g. "Delhi to New Delhi".
+        """
+        matches = self.find_all(message)
+        text = normalize_text(message)
+        source = destination = None
+        unassigned: List[str] = []
+        for match in matches:
+            preceding = text[:match.start].split()
+            cue = preceding[-1] if preceding else ""
+            if cue in STOPOVER_CUES:
+                continue
+            if cue in SOURCE_CUES and source is None:
+                source = match.city
+            elif cue in DESTINATION_CUES and destination is None:
+                destination = match.city
+            else:
+                unassigned.append(match.city)
+
+        for city in unassigned:
+            if source is None:
+                source = city
+            elif destination is None and city != source:
+                destination = city
+        if source is not None and source == destination:
+            return None, None
+        return source, destination
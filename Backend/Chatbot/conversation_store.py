@@ -0,0 +1,171 @@
+"""
+Per-session conversation store for the travel assistant
+
+Each chat session keeps its last CHAT_MAX_TURNS turns in a ring buffer.
+Sessions idle for CHAT_SESSION_TTL seconds, or beyond CHAT_MAX_SESSIONS
+(least recently used first), are evicted from memory.
+
+Changed sessions are written to Mongo ``conversations_collection`` by a
+background task: every CHAT_PERSIST_INTERVAL seconds, one unordered bulk
+upsert of up to CHAT_PERSIST_BATCH sessions, run in a worker thread. The
+request path only appends to memory and never waits on the database.
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "20"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+CHAT_PERSIST_INTERVAL = float(os.getenv("CHAT_PERSIST_INTERVAL", "2"))
+CHAT_PERSIST_BATCH = int(os.getenv("CHAT_PERSIST_BATCH", "200"))
+
+
+class Conversation:
+    """Ring buffer of one session's messages (a turn is a user + assistant message)"""
+
+    __slots__ = ("messages", "last_active")
+
+    def __init__(self, max_turns: int):
+        self.messages: deque = deque(maxlen=max_turns * 2)
+        self.last_active = time.monotonic()
+
+
+class ConversationStore:
+    """Bounded, LRU/TTL-evicted sessions with batched write-behind to Mongo"""
+
+    def __init__(
+        self,
+        collection=None,
+        max_turns: int = CHAT_MAX_TURNS,
+        max_sessions: int = CHAT_MAX_SESSIONS,
+        ttl: float = CHAT_SESSION_TTL,
+        persist_interval: float = CHAT_PERSIST_INTERVAL,
+        persist_batch: int = CHAT_PERSIST_BATCH
+    ):
+        self.collection = collection
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.persist_interval = persist_interval
+        self.persist_batch = persist_batch
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        # Sessions awaiting a write: None = read the live session, list = snapshot of an evicted one
+        self._dirty: "OrderedDict[str, Optional[List[Dict]]]" = OrderedDict()
+        self._writer: Optional[asyncio.Task] = None
+        self.evictions = 0
+        self.persisted = 0
+        self.persist_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def append(self, session_id: str, role: str, content: str):
+        """Record one message; O(1), never touches the database"""
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            conversation = self._sessions[session_id] = Conversation(self.max_turns)
+        else:
+            self._sessions.move_to_end(session_id)
+        conversation.messages.append({
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        })
+        conversation.last_active = time.monotonic()
+        # Only queue writes while the writer runs, so the queue can't grow unbounded
+        if self._writer is not None:
+            self._dirty[session_id] = None
+        self._evict()
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        conversation = self._sessions.get(session_id)
+        return list(conversation.messages) if conversation is not None else []
+
+    def _evict(self):
+        """Drop least recently used sessions past the size bound or idle past the TTL"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - conversation.last_active < self.ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+            if session_id in self._dirty:
+                self._dirty[session_id] = list(conversation.messages)
+
+    # ==================== WRITE-BEHIND ====================
+
+    def start(self):
+        """Start the background writer (call from the running event loop)"""
+        if self.collection is not None and self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_loop())
+
+    async def stop(self):
+        """Stop the writer and flush everything still pending"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        while self._dirty:
+            if not await self.flush():
+                break
+
+    async def _write_loop(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            self._evict()
+            while self._dirty:
+                if not await self.flush() or len(self._dirty) < self.persist_batch:
+                    break
+
+    async def flush(self) -> bool:
+        """Write one batch of changed sessions; False if the write failed"""
+        batch = []
+        while self._dirty and len(batch) < self.persist_batch:
+            session_id, snapshot = self._dirty.popitem(last=False)
+            messages = snapshot if snapshot is not None else self.history(session_id)
+            batch.append((session_id, messages))
+        if not batch:
+            return True
+
+        operations = [
+            UpdateOne(
+                {"_id": session_id},
+                {"$set": {"conversation": messages, "updatedAt": datetime.now()}},
+                upsert=True
+            )
+            for session_id, messages in batch
+        ]
+        try:
+            await asyncio.to_thread(self.collection.bulk_write, operations, ordered=False)
+        except Exception as e:
+            print(f"Conversation persist error: {e}")
+            self.persist_errors += 1
+            # Re-queue unless a newer change is already pending
+            for session_id, messages in batch:
+                if session_id not in self._dirty:
+                    self._dirty[session_id] = None if session_id in self._sessions else messages
+            return False
+        self.persisted += len(batch)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "max_turns": self.max_turns,
+            "evictions": self.evictions,
+            "pending_writes": len(self._dirty),
+            "persisted": self.persisted,
+            "persist_errors": self.persist_errors
+        }
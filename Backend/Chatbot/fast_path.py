@@ -0,0 +1,106 @@
+"""
+Deterministic fast path for recommendation queries
+
+"Cheapest" / "fastest" / "earliest" / "latest" questions are answered by
+ranking the flight list directly, in microseconds and without the LLM.
+Anything open-ended (comparisons, several intents, questions about
+baggage, refunds, ...) returns no intent and goes to the Groq chain.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+INTENT_PATTERNS = {
+    "cheapest": r"\b(cheap|cheapest|cheaper|lowest (?:price|fare|cost)|least expensive|budget|affordable|low[- ]cost)\b",
+    "fastest": r"\b(fast|fastest|faster|quickest|quick|shortest|least time)\b",
+    "earliest": r"\b(earliest|early|first flight|soonest)\b",
+    "latest": r"\b(latest|last flight|late)\b"
+}
+_INTENT_REGEXES = {intent: re.compile(pattern) for intent, pattern in INTENT_PATTERNS.items()}
+
+# Questions the ranker can't answer from the flight list alone
+OPEN_ENDED = re.compile(
+    r"\b(why|compare|comparison|versus|vs|difference|between|baggage|luggage|refund|cancel\w*|"
+    r"meal|seat\w*|layover|stop\w*|direct|non[- ]?stop|visa|weather|under|below|above|before|after|"
+    r"morning|afternoon|evening|night|except|without|not|but)\b"
+)
+
+
+def classify_intent(query: str) -> Optional[str]:
+    """The single ranking intent in ``query``, or None if it needs the LLM"""
+    text = (query or "").lower()
+    if OPEN_ENDED.search(text):
+        return None
+    intents = [intent for intent, regex in _INTENT_REGEXES.items() if regex.search(text)]
+    return intents[0] if len(intents) == 1 else None
+
+
+def duration_minutes(duration: str) -> float:
+    """Minutes in "2h 30m" or ISO-8601 "PT2H30M"; inf if unparseable"""
+    hours = re.search(r"(\d+)\s*h", duration or "", re.IGNORECASE)
+    minutes = re.search(r"(\d+)\s*m", duration or "", re.IGNORECASE)
+    if not hours and not minutes:
+        return float("inf")
+    return (int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0)
+
+
+def clock_minutes(time_str: str) -> float:
+    """Minutes after midnight of "08:00" or "2024-12-25T08:00:00"; inf if unparseable"""
+    match = re.search(r"(\d{1,2}):(\d{2})", time_str or "")
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else float("inf")
+
+
+def _latest_key(flight: Dict[str, Any]) -> tuple:
+    departure = clock_minutes(flight["departure"])
+    # Unparseable times sort last rather than first
+    return (-departure if departure != float("inf") else departure, flight["price"])
+
+
+RANK_KEYS: Dict[str, Callable[[Dict[str, Any]], tuple]] = {
+    "cheapest": lambda f: (f["price"], duration_minutes(f["duration"]), clock_minutes(f["departure"])),
+    "fastest": lambda f: (duration_minutes(f["duration"]), f["price"], clock_minutes(f["departure"])),
+    "earliest": lambda f: (clock_minutes(f["departure"]), f["price"]),
+    "latest": _latest_key
+}
+
+
+def rank_flights(flights: List[Dict[str, Any]], intent: str) -> List[Dict[str, Any]]:
+    """Flights ordered best-first for ``intent``"""
+    return sorted(flights, key=RANK_KEYS[intent])
+
+
+INTENT_PHRASES = {
+    "cheapest": "the cheapest",
+    "fastest": "the fastest",
+    "earliest": "the earliest departure",
+    "latest": "the latest departure"
+}
+
+
+def explain(best: Dict[str, Any], intent: str, count: int) -> str:
+    return (
+        f"{best['airline']} {best['id']} is {INTENT_PHRASES[intent]} of {count} available "
+        f"flight{'s' if count != 1 else ''}: departs {best['departure']}, arrives {best['arrival']}, "
+        f"{best['duration']}, {best.get('currency', 'INR')} {best['price']:g}."
+    )
+
+
+def fast_recommendation(
+    source: str,
+    destination: str,
+    source_airport: str,
+    destination_airport: str,
+    flights: List[Dict[str, Any]],
+    intent: str
+) -> Dict[str, Any]:
+    """RouteRecommendation-shaped answer built by ranking ``flights``"""
+    ranked = rank_flights(flights, intent)
+    return {
+        "source_city": source.title(),
+        "destination_city": destination.title(),
+        "source_airport": source_airport,
+        "destination_airport": destination_airport,
+        "best_flight": ranked[0],
+        "all_flights": ranked,
+        "recommendation_reason": explain(ranked[0], intent, len(ranked))
+    }
@@ -0,0 +1,113 @@
+"""
+Flexible-date flight search helpers
+
+A flexible search asks for every departure day in ``center ± days``,
+dropping days already in the past. Each day is fetched through the
+flight-offer cache, so days already cached cost nothing upstream. The
+offers of all days are normalised to one flat shape (the Amadeus payload
+and the mock ``flights`` list both fit), deduplicated (Amadeus returns
+several fares for the same flights; the cheapest wins) and merged.
+The calendar gives the cheapest fare per day.
+"""
+
+import os
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Largest ± window one request may ask for (3 -> at most 7 days / upstream calls)
+FLEX_MAX_DAYS = int(os.getenv("FLEX_MAX_DAYS", "3"))
+# Days fetched concurrently by one flexible search
+FLEX_CONCURRENCY = int(os.getenv("FLEX_CONCURRENCY", "4"))
+# Offers returned in the merged list (the calendar always covers every day)
+FLEX_MAX_OFFERS = int(os.getenv("FLEX_MAX_OFFERS", "50"))
+
+_ISO_DURATION = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+
+def date_window(center: date, days: int, today: Optional[date] = None) -> List[date]:
+    """``center ± days`` in order, without days before ``today``"""
+    today = today or date.today()
+    return [
+        day for day in (center + timedelta(days=offset) for offset in range(-days, days + 1))
+        if day >= today
+    ]
+
+
+def _duration(value: str) -> str:
+    match = _ISO_DURATION.fullmatch(value or "")
+    if not match:
+        return value or ""
+    hours, minutes = match.groups()
+    return f"{int(hours or 0)}h {int(minutes or 0)}m"
+
+
+def _amadeus_offer(offer: Dict[str, Any], day: str) -> Optional[Dict[str, Any]]:
+    """Outbound itinerary of an Amadeus flight offer in the ``Flight`` shape"""
+    try:
+        itinerary = offer["itineraries"][0]
+        segments = itinerary["segments"]
+        price = offer["price"]
+        return {
+            "id": str(offer.get("id", "")),
+            "date": day,
+            "airline": segments[0]["carrierCode"],
+            "flight_numbers": "/".join(f"{s['carrierCode']}{s['number']}" for s in segments),
+            "departure": segments[0]["departure"]["at"][11:16],
+            "arrival": segments[-1]["arrival"]["at"][11:16],
+            "duration": _duration(itinerary.get("duration", "")),
+            "stops": len(segments) - 1,
+            "price": float(price.get("grandTotal") or price["total"]),
+            "currency": price.get("currency", "INR")
+        }
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def normalize_offers(data: Dict[str, Any], day: str) -> List[Dict[str, Any]]:
+    """Offers of one day's payload (Amadeus ``data`` or mock ``flights``), tagged with the day"""
+    offers = []
+    for offer in data.get("flights") or []:
+        if isinstance(offer, dict) and offer.get("price") is not None:
+            offers.append({**offer, "date": day, "price": float(offer["price"])})
+    for offer in data.get("data") or []:
+        normalized = _amadeus_offer(offer, day) if isinstance(offer, dict) else None
+        if normalized is not None:
+            offers.append(normalized)
+    return offers
+
+
+def _offer_key(offer: Dict[str, Any]) -> Tuple[Any, ...]:
+    return offer["date"], offer.get("flight_numbers") or offer.get("airline"), offer.get("departure")
+
+
+def merge_offers(offers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One offer per (day, flights, departure time), the cheapest, sorted by price then day"""
+    best: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for offer in offers:
+        key = _offer_key(offer)
+        if key not in best or offer["price"] < best[key]["price"]:
+            best[key] = offer
+    return sorted(best.values(), key=lambda offer: (offer["price"], offer["date"], offer.get("departure") or ""))
+
+
+def cheapest_calendar(days: List[str], offers: List[Dict[str, Any]], sources: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Per day: cheapest merged offer (None when the day had none), offer count and data source"""
+    cheapest: Dict[str, Dict[str, Any]] = {}
+    counts: Dict[str, int] = {}
+    for offer in offers:
+        day = offer["date"]
+        counts[day] = counts.get(day, 0) + 1
+        if day not in cheapest or offer["price"] < cheapest[day]["price"]:
+            cheapest[day] = offer
+    return [
+        {
+            "date": day,
+            "min_price": cheapest[day]["price"] if day in cheapest else None,
+            "currency": cheapest[day].get("currency", "INR") if day in cheapest else None,
+            "airline": cheapest[day].get("airline") if day in cheapest else None,
+            "offers": counts.get(day, 0),
+            "source": sources.get(day, "unavailable")
+        }
+        for day in days
+    ]
@@ -0,0 +1,218 @@
+"""
+Flight-offer response cache for the Amadeus client
+
+Entries are keyed by (origin, destination, date, adults) and live in a
+pluggable store:
+- MemoryStore (default): per-process LRU dict
+- SQLiteStore: one local SQLite file shared by every worker on the host.
+  Its calls can wait on another worker's write lock, so FlightCache runs
+  them in a worker thread rather than on the event loop.
+
+Within FLIGHT_CACHE_TTL an entry is served as-is. For a further
+FLIGHT_CACHE_STALE_TTL it is still served, but a background refresh is
+started (stale-while-revalidate). Identical in-flight fetches are coalesced
+so a burst of requests for one key makes a single upstream call.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+FLIGHT_CACHE_TTL = float(os.getenv("FLIGHT_CACHE_TTL", "300"))
+FLIGHT_CACHE_STALE_TTL = float(os.getenv("FLIGHT_CACHE_STALE_TTL", "900"))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "1024"))
+FLIGHT_CACHE_BACKEND = os.getenv("FLIGHT_CACHE_BACKEND", "memory")  # "memory" or "sqlite"
+FLIGHT_CACHE_PATH = os.getenv("FLIGHT_CACHE_PATH", "/tmp/techtonic_flight_cache.sqlite3")
+
+
+def flight_cache_key(origin: str, destination: str, departure_date: str, adults: int) -> str:
+    return f"{origin.upper()}:{destination.upper()}:{departure_date}:{adults}"
+
+
+# ==================== BACKING STORES ====================
+
+class MemoryStore:
+    """In-process LRU store"""
+
+    # Calls never wait, so they run on the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = FLIGHT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, stored_at) or None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """LRU store in a local SQLite file, shared by all workers on one host"""
+
+    # Calls may wait up to 5 s for another process's write lock
+    blocking = True
+
+    def __init__(self, path: str = FLIGHT_CACHE_PATH, max_entries: int = FLIGHT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS flight_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS flight_cache_lru ON flight_cache (last_access)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM flight_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE flight_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO flight_cache (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time())
+            )
+            evicted = self._db.execute(
+                "DELETE FROM flight_cache WHERE key IN ("
+                " SELECT key FROM flight_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM flight_cache").fetchone()[0]
+
+
+def make_store(backend: str = FLIGHT_CACHE_BACKEND):
+    """Store selected by FLIGHT_CACHE_BACKEND"""
+    if backend == "sqlite":
+        return SQLiteStore()
+    if backend == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unknown FLIGHT_CACHE_BACKEND '{backend}', expected 'memory' or 'sqlite'")
+
+
+# ==================== CACHE ====================
+
+class FlightCache:
+    """TTL cache with stale-while-revalidate and request coalescing"""
+
+    def __init__(
+        self,
+        store=None,
+        ttl: float = FLIGHT_CACHE_TTL,
+        stale_ttl: float = FLIGHT_CACHE_STALE_TTL
+    ):
+        self.store = store if store is not None else make_store()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: set = set()
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        Cached value for ``key``, calling ``fetch`` on a miss.
+
+        ``fetch`` returns None on failure; failures are not cached, and a
+        failed background refresh keeps serving the stale entry.
+        """
+        entry = await self._store_call(self.store.get, key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._start_fetch(key, fetch)
+                return value
+
+        self.misses += 1
+        if key in self._inflight:
+            self.coalesced += 1
+            future = self._inflight[key]
+        else:
+            future = self._start_fetch(key, fetch)
+        # Shielded so one cancelled caller doesn't fail the others waiting on this key
+        return await asyncio.shield(future)
+
+    async def _store_call(self, method: Callable[..., Any], *args) -> Any:
+        """Call the store; a blocking (file-backed) store runs in a worker thread"""
+        if getattr(self.store, "blocking", False):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def _start_fetch(self, key: str, fetch: Callable[[], Awaitable[Optional[Any]]]) -> asyncio.Future:
+        """Run the single upstream call for ``key``; concurrent callers share its future"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        async def run():
+            value = None
+            try:
+                value = await fetch()
+                if value is not None:
+                    await self._store_call(self.store.set, key, value, time.time())
+            except Exception as e:
+                print(f"Flight cache fetch error: {e}")
+            finally:
+                del self._inflight[key]
+                future.set_result(value)
+
+        task = asyncio.ensure_future(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": type(self.store).__name__,
+            "entries": len(self.store),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "background_refreshes": self.refreshes,
+            "evictions": self.store.evictions,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,192 @@
+"""
+Airport/city gazetteer with prefix autocomplete
+
+Places come from ``dataset/india_airports.csv`` (IATA code, city, airport,
+state, ``|``-separated aliases) plus every city of the route graph. Each
+place is indexed under its city name, aliases and IATA code in one sorted
+NumPy string array, so:
+
+- city -> IATA and IATA -> city are a single binary search, O(log n)
+- a prefix is the slice ``[searchsorted(q), searchsorted(q + U+FFFF))``,
+  ranked by route connectivity (outgoing routes in the dataset)
+
+Lookups over the ~3.5k places take a few microseconds; prefix queries
+matching thousands of places stay well under a millisecond.
+"""
+
+import csv
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from routes.route_graph import DATASET_DIR, RouteGraph, get_route_graph, normalize_location
+
+GAZETTEER_CSV = Path(os.getenv("GAZETTEER_CSV", DATASET_DIR / "india_airports.csv"))
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Sorts after every character a city name or code can contain
+_PREFIX_END = "\uffff"
+
+
+def read_airports(path: Path = GAZETTEER_CSV) -> List[Dict[str, Any]]:
+    """Rows of the airport table; empty if the file is missing"""
+    if not Path(path).exists():
+        return []
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            {
+                "iata": row["iata"].strip().upper(),
+                "city": row["city"].strip(),
+                "airport": row["airport"].strip(),
+                "state": row["state"].strip(),
+                "aliases": [alias.strip() for alias in (row.get("aliases") or "").split("|") if alias.strip()]
+            }
+            for row in csv.DictReader(handle)
+        ]
+
+
+class Gazetteer:
+    """Sorted, array-backed prefix index over places and their aliases"""
+
+    def __init__(self, airports: List[Dict[str, Any]], graph: Optional[RouteGraph] = None):
+        # One place per city; airport rows first so curated cities keep their code
+        self.places: List[Dict[str, Any]] = []
+        place_ids: Dict[str, int] = {}
+        for airport in airports:
+            key = normalize_location(airport["city"])
+            if key in place_ids:
+                continue
+            place_ids[key] = len(self.places)
+            self.places.append({
+                "city": airport["city"],
+                "iata": airport["iata"] or None,
+                "airport": airport["airport"] or None,
+                "state": airport["state"] or None,
+                "aliases": airport["aliases"]
+            })
+        if graph is not None:
+            for name in graph.city_names:
+                if normalize_location(name) not in place_ids:
+                    place_ids[normalize_location(name)] = len(self.places)
+                    self.places.append({"city": name, "iata": None, "airport": None, "state": None, "aliases": []})
+
+        # Connectivity: outgoing routes of the place's city in the route graph
+        self.routes = np.zeros(len(self.places), dtype=np.int64)
+        if graph is not None and self.places:
+            ids = graph.city_ids([place["city"] for place in self.places])
+            degrees = np.diff(graph.offsets).astype(np.int64)
+            known = ids >= 0
+            self.routes[known] = degrees[ids[known]]
+            # An airport city missing from the dataset takes its best-connected alias's routes
+            for place_id in np.flatnonzero(~known):
+                alias_ids = [graph.city_id(alias) for alias in self.places[place_id]["aliases"]]
+                alias_ids = [alias_id for alias_id in alias_ids if alias_id is not None]
+                if alias_ids:
+                    self.routes[place_id] = degrees[alias_ids].max()
+
+        keys: List[str] = []
+        key_places: List[int] = []
+        self._alias_places: Dict[str, int] = {}
+        self._code_places: Dict[str, int] = {}
+        for place_id, place in enumerate(self.places):
+            for name in [place["city"]] + place["aliases"]:
+                self._alias_places.setdefault(normalize_location(name), place_id)
+            if place["iata"]:
+                self._code_places.setdefault(place["iata"], place_id)
+            names = {normalize_location(name) for name in [place["city"]] + place["aliases"]}
+            if place["iata"]:
+                names.add(place["iata"].lower())
+            for name in names:
+                keys.append(name)
+                key_places.append(place_id)
+
+        order = np.argsort(np.asarray(keys, dtype=np.str_), kind="stable")
+        self._keys = np.asarray(keys, dtype=np.str_)[order]
+        self._key_places = np.asarray(key_places, dtype=np.int64)[order]
+        # Rank of each place for autocomplete: most routes first, airports before bare cities, then by name
+        rank_order = np.lexsort((
+            np.asarray([place["city"].lower() for place in self.places], dtype=np.str_),
+            np.asarray([place["iata"] is None for place in self.places]),
+            -self.routes
+        ))
+        self._place_rank = np.empty(len(self.places), dtype=np.int64)
+        self._place_rank[rank_order] = np.arange(len(self.places))
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _find(self, name: str) -> Optional[int]:
+        """Place id for an exact city name / alias / IATA code"""
+        key = normalize_location(name)
+        position = int(np.searchsorted(self._keys, key))
+        if position < len(self._keys) and self._keys[position] == key:
+            return int(self._key_places[position])
+        return None
+
+    def airport_code(self, city: str) -> Optional[str]:
+        """IATA code for a city name or alias, or None if it has no airport"""
+        place_id = self._find(city)
+        return self.places[place_id]["iata"] if place_id is not None else None
+
+    def city_for_code(self, code: str) -> Optional[str]:
+        """City served by an IATA code"""
+        place_id = self._code_places.get(code.strip().upper())
+        return self.places[place_id]["city"] if place_id is not None else None
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        """Place for an exact city name, alias or IATA code"""
+        place_id = self._find(name)
+        return self._describe(place_id) if place_id is not None else None
+
+    def aliases(self) -> Dict[str, str]:
+        """Every indexed city name / alias (lowercase) -> canonical city name"""
+        return {alias: self.places[place_id]["city"] for alias, place_id in self._alias_places.items()}
+
+    def iata_codes(self) -> Dict[str, str]:
+        """IATA code -> canonical city name"""
+        return {code: self.places[place_id]["city"] for code, place_id in self._code_places.items()}
+
+    def airport_cities(self) -> List[str]:
+        """Canonical names of the cities that have an airport"""
+        return sorted(place["city"] for place in self.places if place["iata"])
+
+    def autocomplete(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Dict[str, Any]]:
+        """Top ``limit`` places whose name, alias or code starts with ``query``, best connected first"""
+        prefix = normalize_location(query)
+        if not prefix or limit <= 0:
+            return []
+        start = int(np.searchsorted(self._keys, prefix, side="left"))
+        end = int(np.searchsorted(self._keys, prefix + _PREFIX_END, side="left"))
+        if start == end:
+            return []
+        # A place can match through several keys ("del" and "delhi"); keep it once
+        candidates = np.unique(self._key_places[start:end])
+        ranks = self._place_rank[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(ranks, limit - 1)[:limit]
+            candidates, ranks = candidates[top], ranks[top]
+        return [self._describe(int(place_id)) for place_id in candidates[np.argsort(ranks)]]
+
+    def _describe(self, place_id: int) -> Dict[str, Any]:
+        place = self.places[place_id]
+        return {
+            "city": place["city"],
+            "iata": place["iata"],
+            "airport": place["airport"],
+            "state": place["state"],
+            "routes": int(self.routes[place_id])
+        }
+
+
+gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get or build the shared gazetteer (airport table + route graph cities)"""
+    global gazetteer
+    if gazetteer is None:
+        gazetteer = Gazetteer(read_airports(), get_route_graph())
+    return gazetteer
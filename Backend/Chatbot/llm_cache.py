@@ -0,0 +1,151 @@
+"""
+Response cache for the Groq recommendation chain
+
+Exact tier: key is a SHA-256 of the canonical prompt inputs (route, sorted
+flight list, normalised query), so the same question over the same flights
+skips the LLM for LLM_CACHE_TTL seconds.
+
+Similarity tier (optional, LLM_CACHE_SIMILARITY > 0): a miss on the exact
+tier may reuse the answer to an earlier query on the same route and flight
+set whose character-trigram cosine similarity is at least the threshold,
+e.g. "What's the best flight option?" vs "whats the best flight option".
+"""
+
+import os
+import re
+import json
+import math
+import time
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .flight_cache import MemoryStore
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "900"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+# 0 disables the similarity tier; 0.9 only matches near-identical wording
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+# Earlier queries compared per route in the similarity tier
+SIMILAR_QUERIES_PER_ROUTE = 32
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", (query or "").lower()).split())
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _trigrams(text: str) -> Counter:
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class LLMResponseCache:
+    """Exact + optional similarity cache for LLM recommendations"""
+
+    def __init__(
+        self,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = LLM_CACHE_SIMILARITY
+    ):
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.store = MemoryStore(max_entries)
+        # route digest -> recent (query trigrams, exact key), newest last
+        self._route_queries: "OrderedDict[str, List[Tuple[Counter, str]]]" = OrderedDict()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    @staticmethod
+    def route_digest(source: str, destination: str, flights: List[Dict]) -> str:
+        """Hash of the route and its flight set (order-insensitive)"""
+        canonical_flights = sorted(json.dumps(flight, sort_keys=True, default=str) for flight in flights)
+        return _digest([source.lower().strip(), destination.lower().strip(), canonical_flights])
+
+    def _live(self, key: str) -> Optional[Any]:
+        entry = self.store.get(key)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def _mean_llm_seconds(self) -> float:
+        return self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+
+    def lookup(self, source: str, destination: str, flights: List[Dict], query: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(cached recommendation, "exact" | "similar") or (None, None) on a miss"""
+        route = self.route_digest(source, destination, flights)
+        normalized = normalize_query(query)
+
+        value = self._live(_digest([route, normalized]))
+        if value is not None:
+            self.exact_hits += 1
+            self.seconds_saved += self._mean_llm_seconds()
+            return value, "exact"
+
+        if self.similarity_threshold > 0 and route in self._route_queries:
+            grams = _trigrams(normalized)
+            best_key, best_score = None, self.similarity_threshold
+            for other_grams, other_key in self._route_queries[route]:
+                score = _cosine(grams, other_grams)
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+            if best_key is not None:
+                value = self._live(best_key)
+                if value is not None:
+                    self.similar_hits += 1
+                    self.seconds_saved += self._mean_llm_seconds()
+                    return value, "similar"
+
+        self.misses += 1
+        return None, None
+
+    def store_result(
+        self, source: str, destination: str, flights: List[Dict], query: str, value: Any, llm_seconds: float
+    ):
+        """Cache a fresh LLM answer and record how long the call took"""
+        self.llm_calls += 1
+        self.llm_seconds += llm_seconds
+
+        route = self.route_digest(source, destination, flights)
+        normalized = normalize_query(query)
+        key = _digest([route, normalized])
+        self.store.set(key, value, time.time())
+
+        if self.similarity_threshold > 0:
+            queries = [entry for entry in self._route_queries.get(route, []) if entry[1] != key]
+            queries.append((_trigrams(normalized), key))
+            self._route_queries[route] = queries
+            self._route_queries.move_to_end(route)
+            del queries[:-SIMILAR_QUERIES_PER_ROUTE]
+            while len(self._route_queries) > self.store.max_entries:
+                self._route_queries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "entries": len(self.store),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.store.evictions,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+            "llm_calls": self.llm_calls,
+            "mean_llm_latency_ms": round(self._mean_llm_seconds() * 1000, 1),
+            "llm_latency_saved_ms": round(self.seconds_saved * 1000, 1),
+            "similarity_threshold": self.similarity_threshold
+        }
@@ -0,0 +1,353 @@
+"""
+Price-alert matcher over ``price_alerts`` (PriceAlertSchema)
+
+Active alerts are held in memory as flat NumPy columns: target price,
+alert id and user id. They are sorted by (origin, destination,
+targetPrice), so each route is one contiguous slice with ascending
+targets. A fare ``p`` satisfies every alert with ``targetPrice >= p``. That
+is the suffix of the route's slice after one binary search, and firing
+those alerts is just shrinking the slice. No alert is scanned, and 1M
+alerts take about 50 bytes each.
+
+Alerts created after the last load go into a small per-route list, kept
+sorted with ``bisect.insort``. Every PRICE_ALERT_RELOAD_INTERVAL seconds
+the columns are rebuilt from Mongo, streaming the active alerts in
+batches.
+
+Fresh fares are handed to ``observe``, which only enqueues the route. It
+keeps one pending minimum per route, so repeated fares for a queued route
+coalesce. The queue holds at most PRICE_ALERT_QUEUE_SIZE routes; when it
+is full (the writer is behind), observations are shed rather than buffered.
+The background task matches each route and writes PRICE_DROP notifications
+in batches of PRICE_ALERT_BATCH_SIZE, or every PRICE_ALERT_FLUSH_INTERVAL
+seconds when fewer have fired. Before each write it atomically
+deactivates the fired alerts, so an alert notifies once even with several
+workers. If a write fails, its alerts are reactivated in Mongo and fire
+again after the next reload.
+"""
+
+import os
+import uuid
+import bisect
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from authentication.repositories import (
+    NotificationRepository,
+    PriceAlertRepository,
+    notifications,
+    price_alerts,
+)
+
+PRICE_ALERT_QUEUE_SIZE = int(os.getenv("PRICE_ALERT_QUEUE_SIZE", "1024"))
+PRICE_ALERT_BATCH_SIZE = int(os.getenv("PRICE_ALERT_BATCH_SIZE", "500"))
+PRICE_ALERT_FLUSH_INTERVAL = float(os.getenv("PRICE_ALERT_FLUSH_INTERVAL", "2"))
+PRICE_ALERT_RELOAD_INTERVAL = float(os.getenv("PRICE_ALERT_RELOAD_INTERVAL", "300"))
+# Alerts converted to NumPy at a time while loading
+LOAD_CHUNK = 50000
+
+Route = Tuple[str, str]
+# (alert id, user id, origin, destination, target price, matched fare)
+FiredAlert = Tuple[str, str, str, str, float, float]
+
+
+def _columns(rows: List[Tuple[str, str, float, str, str]]) -> Dict[str, np.ndarray]:
+    origin, destination, target, alert_id, user_id = zip(*rows) if rows else ((),) * 5
+    return {
+        "origin": np.asarray(origin, dtype="U8"),
+        "destination": np.asarray(destination, dtype="U8"),
+        "target": np.asarray(target, dtype=np.float32),
+        # ASCII ids as bytes: a quarter of the size of NumPy unicode
+        "alert_id": np.asarray([value.encode() for value in alert_id], dtype="S"),
+        "user_id": np.asarray([value.encode() for value in user_id], dtype="S")
+    }
+
+
+class AlertIndex:
+    """Active alerts per route, ascending by target price"""
+
+    def __init__(self, chunks: Iterable[Dict[str, np.ndarray]] = ()):
+        chunks = [chunk for chunk in chunks if len(chunk["target"])]
+        if chunks:
+            columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        else:
+            columns = _columns([])
+        order = np.lexsort((columns["target"], columns["destination"], columns["origin"]))
+        origin, destination = columns["origin"][order], columns["destination"][order]
+        self.target = columns["target"][order]
+        self.alert_id = columns["alert_id"][order]
+        self.user_id = columns["user_id"][order]
+
+        boundary = np.ones(len(order), dtype=bool)
+        boundary[1:] = (origin[1:] != origin[:-1]) | (destination[1:] != destination[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(order))
+        # Route -> [start, end) of its unfired alerts; firing moves ``end`` down
+        self._slices: Dict[Route, List[int]] = {
+            (str(origin[start]), str(destination[start])): [int(start), int(end)]
+            for start, end in zip(starts, ends)
+        }
+        # Alerts added since the build, per route: sorted (target, alert id, user id)
+        self._added: Dict[Route, List[Tuple[float, str, str]]] = {}
+        self._count = len(order)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, route: Route) -> bool:
+        return route in self._slices or route in self._added
+
+    @property
+    def nbytes(self) -> int:
+        return self.target.nbytes + self.alert_id.nbytes + self.user_id.nbytes
+
+    def add(self, alert_id: str, user_id: str, origin: str, destination: str, target: float):
+        bisect.insort(self._added.setdefault((origin, destination), []), (target, alert_id, user_id))
+        self._count += 1
+
+    def match(self, origin: str, destination: str, price: float) -> List[FiredAlert]:
+        """Remove and return every alert of the route whose target is at or above ``price``"""
+        route = (origin, destination)
+        fired: List[FiredAlert] = []
+        bounds = self._slices.get(route)
+        if bounds is not None:
+            start, end = bounds
+            cut = start + int(np.searchsorted(self.target[start:end], price, side="left"))
+            fired.extend(
+                (self.alert_id[i].decode(), self.user_id[i].decode(), origin, destination, float(self.target[i]), price)
+                for i in range(cut, end)
+            )
+            bounds[1] = cut
+            if cut == start:
+                del self._slices[route]
+        added = self._added.get(route)
+        if added:
+            cut = bisect.bisect_left(added, (price,))
+            fired.extend(
+                (alert_id, user_id, origin, destination, target, price) for target, alert_id, user_id in added[cut:]
+            )
+            del added[cut:]
+            if not added:
+                del self._added[route]
+        self._count -= len(fired)
+        return fired
+
+
+def _route(origin: str, destination: str) -> Route:
+    return origin.upper(), destination.upper()
+
+
+def _message(fired: FiredAlert) -> str:
+    _, _, origin, destination, target, price = fired
+    return (
+        f"Fares from {origin} to {destination} dropped to INR {price:,.0f}, "
+        f"at or below your target of INR {target:,.0f}."
+    )
+
+
+class PriceAlertMatcher:
+    """Matches fresh fares against active alerts and writes PRICE_DROP notifications"""
+
+    def __init__(
+        self,
+        alerts: PriceAlertRepository = price_alerts,
+        notifications: NotificationRepository = notifications,
+        queue_size: int = PRICE_ALERT_QUEUE_SIZE,
+        batch_size: int = PRICE_ALERT_BATCH_SIZE,
+        flush_interval: float = PRICE_ALERT_FLUSH_INTERVAL,
+        reload_interval: float = PRICE_ALERT_RELOAD_INTERVAL
+    ):
+        self.alerts = alerts
+        self.notifications = notifications
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reload_interval = reload_interval
+        self.index = AlertIndex()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Lowest fare seen per queued route; a route is queued at most once
+        self._pending: Dict[Route, float] = {}
+        self._fired: List[FiredAlert] = []
+        # Alerts added while a reload is reading Mongo, replayed into the new index
+        self._added_during_load: Optional[List[Tuple[str, str, str, str, float]]] = None
+        self._matcher: Optional[asyncio.Task] = None
+        self._reloader: Optional[asyncio.Task] = None
+        self.observed = 0
+        self.coalesced = 0
+        self.shed = 0
+        self.triggered = 0
+        self.notified = 0
+        self.invalid_alerts = 0
+        self.write_errors = 0
+        self.load_errors = 0
+
+    # ==================== INDEX ====================
+
+    async def load(self) -> int:
+        """Rebuild the index from the active alerts in Mongo; returns how many were loaded"""
+        self._added_during_load = []
+        try:
+            chunks, rows, invalid = [], [], 0
+            async for alert in self.alerts.active(LOAD_CHUNK):
+                try:
+                    target = float(alert["targetPrice"])
+                except (KeyError, TypeError, ValueError):
+                    invalid += 1
+                    continue
+                rows.append((
+                    str(alert["origin"]).upper(), str(alert["destination"]).upper(),
+                    target, str(alert["_id"]), str(alert["userId"])
+                ))
+                if len(rows) >= LOAD_CHUNK:
+                    chunks.append(_columns(rows))
+                    rows = []
+            chunks.append(_columns(rows))
+            index = await asyncio.to_thread(AlertIndex, chunks)
+            for added in self._added_during_load:
+                index.add(*added)
+        finally:
+            added, self._added_during_load = self._added_during_load, None
+        self.index = index
+        self.invalid_alerts = invalid
+        return len(index)
+
+    def add(self, alert_id: Any, user_id: str, origin: str, destination: str, target_price: float):
+        """Start matching an alert just stored in Mongo, without waiting for the next reload"""
+        origin, destination = _route(origin, destination)
+        alert = (str(alert_id), str(user_id), origin, destination, float(target_price))
+        self.index.add(*alert)
+        if self._added_during_load is not None:
+            self._added_during_load.append(alert)
+
+    # ==================== MATCHING ====================
+
+    def observe(self, origin: str, destination: str, prices: Iterable[float]) -> bool:
+        """Queue the lowest of ``prices`` for matching; False when shed because the queue is full"""
+        prices = list(prices)
+        route = _route(origin, destination)
+        if not prices or route not in self.index:
+            return True
+        price = min(prices)
+        self.observed += 1
+        if route in self._pending:
+            self._pending[route] = min(self._pending[route], price)
+            self.coalesced += 1
+            return True
+        try:
+            self._queue.put_nowait(route)
+        except asyncio.QueueFull:
+            self.shed += 1
+            return False
+        self._pending[route] = price
+        return True
+
+    def start(self):
+        """Load the alerts and start matching (call from the running event loop)"""
+        if self._matcher is None:
+            self._reloader = asyncio.ensure_future(self._reload_loop())
+            self._matcher = asyncio.ensure_future(self._match_loop())
+
+    async def stop(self):
+        """Stop both tasks, match what is queued and write the remaining notifications"""
+        for task in (self._reloader, self._matcher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._reloader = self._matcher = None
+        await self.drain()
+
+    async def drain(self):
+        """Match every queued route and write all pending notifications"""
+        while not self._queue.empty():
+            self._match(self._queue.get_nowait())
+        while self._fired:
+            await self.flush()
+
+    def _match(self, route: Route):
+        fired = self.index.match(*route, self._pending.pop(route))
+        self.triggered += len(fired)
+        self._fired.extend(fired)
+
+    async def _reload_loop(self):
+        while True:
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"Price alert load error: {e}")
+                self.load_errors += 1
+            await asyncio.sleep(self.reload_interval)
+
+    async def _match_loop(self):
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        while True:
+            try:
+                timeout = max(last_flush + self.flush_interval - loop.time(), 0)
+                self._match(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                pass
+            # Awaiting the writes here is the backpressure: while Mongo is slow the queue fills
+            while len(self._fired) >= self.batch_size:
+                await self.flush()
+            # Fired alerts wait at most one interval, however busy the queue is
+            if loop.time() - last_flush >= self.flush_interval:
+                await self.flush()
+                last_flush = loop.time()
+
+    async def flush(self) -> int:
+        """Claim and notify up to one batch of fired alerts; returns notifications written"""
+        if not self._fired:
+            return 0
+        batch, self._fired = self._fired[:self.batch_size], self._fired[self.batch_size:]
+        claim = uuid.uuid4().hex
+        try:
+            claimed = await self.alerts.claim(list({fired[0] for fired in batch}), claim)
+        except Exception as e:
+            # Nothing was deactivated for sure; the next reload re-arms these alerts
+            print(f"Price alert claim error: {e}")
+            self.write_errors += 1
+            return 0
+        to_notify = {str(alert["_id"]) for alert in claimed}
+        now = datetime.utcnow()
+        documents = []
+        for fired in batch:
+            # An alert fired twice (old index during a reload) is notified once
+            if fired[0] in to_notify:
+                to_notify.discard(fired[0])
+                documents.append({
+                    "userId": fired[1], "type": "PRICE_DROP", "message": _message(fired), "isRead": False, "createdAt": now
+                })
+        try:
+            await self.notifications.insert_many(documents)
+        except Exception as e:
+            print(f"Price alert notification error: {e}")
+            self.write_errors += 1
+            try:
+                await self.alerts.release(claim)
+            except Exception as e:
+                print(f"Price alert release error: {e}")
+            return 0
+        self.notified += len(documents)
+        return len(documents)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_alerts": len(self.index),
+            "index_bytes": self.index.nbytes,
+            "queued_routes": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "observed": self.observed,
+            "coalesced": self.coalesced,
+            "shed": self.shed,
+            "triggered": self.triggered,
+            "pending_notifications": len(self._fired),
+            "notified": self.notified,
+            "invalid_alerts": self.invalid_alerts,
+            "write_errors": self.write_errors,
+            "load_errors": self.load_errors
+        }
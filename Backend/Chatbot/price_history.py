@@ -0,0 +1,433 @@
+"""
+Price-history store and "will it get cheaper?" forecasts
+
+Every fresh flight-offers response is appended as raw observations
+(origin, destination, departure day, observed day, price). ``record`` only
+appends to an in-memory buffer. A background task writes the buffer every
+PRICE_HISTORY_FLUSH_INTERVAL seconds as one columnar chunk file, in a
+worker thread:
+
+    data/price_history/raw/<observed day>/chunk-<ns>.npz
+    data/price_history/rollups.npz
+
+Observations are bucketed by the day they were observed. Only today's
+bucket is open. After each flush its raw rows are re-aggregated, vectorised
+with NumPy, into one rollup row per (route, departure day, observed day):
+count, min, mean and the PERCENTILES. When the day changes, the bucket is
+closed and its rollups are merged into ``rollups.npz``.
+
+Several workers can share the directory. Each writes its own chunks, and
+closing a day holds an exclusive lock on ``rollups.lock`` while it
+re-reads every worker's chunks for that day and merges them into the
+rollups on disk. Closing a day twice gives the same rows, so whichever
+worker closes last includes everything written by then.
+
+Stats and forecasts read only the rollups, never raw rows. A forecast runs
+Holt's linear exponential smoothing over the daily minimum fare of one
+departure date. The resulting trend answers whether the fare is likely to
+drop before departure.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Runtime data, kept out of the versioned datasets
+PRICE_HISTORY_DIR = Path(
+    os.getenv("PRICE_HISTORY_DIR", Path(__file__).resolve().parents[2] / "data" / "price_history")
+)
+PRICE_HISTORY_FLUSH_INTERVAL = float(os.getenv("PRICE_HISTORY_FLUSH_INTERVAL", "10"))
+# Observations buffered between flushes before new ones are dropped
+PRICE_HISTORY_MAX_PENDING = int(os.getenv("PRICE_HISTORY_MAX_PENDING", "100000"))
+
+PERCENTILES = (25, 50, 75)
+RAW_COLUMNS = ("origin", "destination", "departure", "observed", "price")
+ROLLUP_COLUMNS = ("origin", "destination", "departure", "observed", "count", "min", "mean") + tuple(
+    f"p{q}" for q in PERCENTILES
+)
+
+# Holt smoothing of the daily minimum fare
+FORECAST_ALPHA = 0.5
+FORECAST_BETA = 0.3
+FORECAST_HORIZON_DAYS = 7
+MOVING_AVERAGE_DAYS = 7
+MIN_OBSERVATION_DAYS = 3
+# Relative change over the horizon that counts as a trend rather than noise
+TREND_THRESHOLD = 0.03
+
+
+def _empty(columns: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    dtypes = {"origin": "U8", "destination": "U8", "departure": np.int32, "observed": np.int32, "count": np.int32}
+    return {column: np.empty(0, dtype=dtypes.get(column, np.float32)) for column in columns}
+
+
+def _concat(parts: List[Dict[str, np.ndarray]], columns: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    parts = [part for part in parts if len(part[columns[0]])]
+    if not parts:
+        return _empty(columns)
+    return {column: np.concatenate([part[column] for part in parts]) for column in columns}
+
+
+def _group_starts(*keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal keys in already sorted columns"""
+    n = len(keys[0])
+    boundary = np.zeros(n, dtype=bool)
+    if n:
+        boundary[0] = True
+        for key in keys:
+            boundary[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(boundary)
+
+
+def rollup(raw: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per (origin, destination, departure, observed) count/min/mean/percentiles of raw rows"""
+    price = raw["price"]
+    if not len(price):
+        return _empty(ROLLUP_COLUMNS)
+    order = np.lexsort((price, raw["observed"], raw["departure"], raw["destination"], raw["origin"]))
+    origin, destination = raw["origin"][order], raw["destination"][order]
+    departure, observed, price = raw["departure"][order], raw["observed"][order], price[order].astype(np.float64)
+
+    starts = _group_starts(origin, destination, departure, observed)
+    counts = np.diff(np.append(starts, len(price)))
+    result = {
+        "origin": origin[starts],
+        "destination": destination[starts],
+        "departure": departure[starts],
+        "observed": observed[starts],
+        "count": counts.astype(np.int32),
+        # Prices are sorted within each group, so the first is the minimum
+        "min": price[starts].astype(np.float32),
+        "mean": (np.add.reduceat(price, starts) / counts).astype(np.float32)
+    }
+    for q in PERCENTILES:
+        # Linear interpolation between the two nearest ranks of each group
+        position = q / 100 * (counts - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        low_price, high_price = price[starts + lower], price[starts + upper]
+        result[f"p{q}"] = (low_price + (high_price - low_price) * (position - lower)).astype(np.float32)
+    return result
+
+
+def _sort_rollups(rollups: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    order = np.lexsort((rollups["observed"], rollups["departure"], rollups["destination"], rollups["origin"]))
+    return {column: values[order] for column, values in rollups.items()}
+
+
+@contextmanager
+def _exclusive_lock(path: Path):
+    """Exclusive advisory lock on ``path`` held across processes"""
+    with open(path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def holt(series: np.ndarray, alpha: float = FORECAST_ALPHA, beta: float = FORECAST_BETA) -> Tuple[float, float]:
+    """Level and per-step trend after Holt's linear exponential smoothing"""
+    level = float(series[0])
+    trend = float(series[1] - series[0]) if len(series) > 1 else 0.0
+    for value in series[1:]:
+        previous = level
+        level = alpha * float(value) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+    return level, trend
+
+
+def offer_prices(data: Dict[str, Any]) -> List[float]:
+    """Fares in a flight-offers payload (Amadeus ``data[].price`` or our ``flights[].price``)"""
+    prices = []
+    for offer in data.get("flights") or data.get("data") or []:
+        price = offer.get("price") if isinstance(offer, dict) else None
+        if isinstance(price, dict):
+            price = price.get("grandTotal") or price.get("total")
+        try:
+            prices.append(float(price))
+        except (TypeError, ValueError):
+            continue
+    return prices
+
+
+class PriceHistory:
+    """Append-only fare observations with day-bucketed, precomputed rollups"""
+
+    def __init__(
+        self,
+        directory: Path = PRICE_HISTORY_DIR,
+        flush_interval: float = PRICE_HISTORY_FLUSH_INTERVAL,
+        max_pending: int = PRICE_HISTORY_MAX_PENDING
+    ):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, list] = {column: [] for column in RAW_COLUMNS}
+        self._loaded = False
+        # Serialises disk loads and batch writes (worker thread) against each other
+        self._lock = threading.Lock()
+        self._open_day: Optional[int] = None
+        self._open_raw = _empty(RAW_COLUMNS)
+        self._closed = _empty(ROLLUP_COLUMNS)
+        # Closed + open-bucket rollups, sorted by route/departure/observed, and each route's slice
+        self._rollups = _empty(ROLLUP_COLUMNS)
+        self._route_slices: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    # ==================== WRITE PATH ====================
+
+    def record(
+        self, origin: str, destination: str, departure_date: str, prices: Iterable[float],
+        observed: Optional[date] = None
+    ):
+        """Buffer fares seen for one route/departure; O(len(prices)), never touches disk"""
+        prices = list(prices)
+        if not prices:
+            return
+        if len(self._pending["price"]) + len(prices) > self.max_pending:
+            self.dropped += len(prices)
+            return
+        departure = date.fromisoformat(departure_date).toordinal()
+        observed_day = (observed or date.today()).toordinal()
+        self._pending["origin"].extend([origin.upper()] * len(prices))
+        self._pending["destination"].extend([destination.upper()] * len(prices))
+        self._pending["departure"].extend([departure] * len(prices))
+        self._pending["observed"].extend([observed_day] * len(prices))
+        self._pending["price"].extend(prices)
+        self.recorded += len(prices)
+
+    def start(self):
+        """Start the background writer (call from the running event loop)"""
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_loop())
+
+    async def stop(self):
+        """Stop the writer and flush what is still buffered"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        await self.flush()
+
+    async def _write_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Write buffered observations as one chunk and refresh the rollups; False on error"""
+        if not self._pending["price"]:
+            return True
+        pending, self._pending = self._pending, {column: [] for column in RAW_COLUMNS}
+        batch = {
+            "origin": np.asarray(pending["origin"], dtype="U8"),
+            "destination": np.asarray(pending["destination"], dtype="U8"),
+            "departure": np.asarray(pending["departure"], dtype=np.int32),
+            "observed": np.asarray(pending["observed"], dtype=np.int32),
+            "price": np.asarray(pending["price"], dtype=np.float32)
+        }
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+        except Exception as e:
+            print(f"Price history flush error: {e}")
+            self.flush_errors += 1
+            return False
+        self.flushes += 1
+        return True
+
+    def _raw_dir(self, day: int) -> Path:
+        return self.directory / "raw" / date.fromordinal(day).isoformat()
+
+    def _write_batch(self, batch: Dict[str, np.ndarray]):
+        self.load()
+        with self._lock:
+            self._append(batch)
+
+    def _append(self, batch: Dict[str, np.ndarray]):
+        for day in np.unique(batch["observed"]):
+            day = int(day)
+            rows = {column: values[batch["observed"] == day] for column, values in batch.items()}
+            if self._open_day is not None and day > self._open_day:
+                self._close_open_day()
+            if self._open_day is None or day > self._open_day:
+                self._open_day = day
+            # Late rows (clock skew, a flush spanning midnight) land in the open bucket
+            rows["observed"][:] = self._open_day
+
+            chunk_dir = self._raw_dir(self._open_day)
+            chunk_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(chunk_dir / f"chunk-{time.time_ns()}.npz", **rows)
+            self._open_raw = _concat([self._open_raw, rows], RAW_COLUMNS)
+        self._publish()
+
+    def _read_rollups(self) -> Dict[str, np.ndarray]:
+        path = self.directory / "rollups.npz"
+        if not path.exists():
+            return _empty(ROLLUP_COLUMNS)
+        with np.load(path) as stored:
+            return {column: stored[column] for column in ROLLUP_COLUMNS}
+
+    def _read_raw_day(self, day: int) -> Dict[str, np.ndarray]:
+        """Every worker's chunks for one observed day"""
+        chunks = []
+        for chunk in sorted(self._raw_dir(day).glob("chunk-*.npz")):
+            with np.load(chunk) as stored:
+                chunks.append({column: stored[column] for column in RAW_COLUMNS})
+        return _concat(chunks, RAW_COLUMNS)
+
+    def _close_open_day(self):
+        """Roll the open day up from all chunks on disk and merge it into rollups.npz"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with _exclusive_lock(self.directory / "rollups.lock"):
+            # Other workers may have closed days (this one included) since we last read the file
+            stored = self._read_rollups()
+            kept = {column: values[stored["observed"] != self._open_day] for column, values in stored.items()}
+            self._closed = _concat([kept, rollup(self._read_raw_day(self._open_day))], ROLLUP_COLUMNS)
+            temporary = self.directory / f"rollups.{os.getpid()}.tmp.npz"
+            np.savez(temporary, **self._closed)
+            os.replace(temporary, self.directory / "rollups.npz")
+        self._open_raw = _empty(RAW_COLUMNS)
+
+    def _publish(self):
+        """Swap in closed + open rollups and the per-route index (readers see old or new, never partial)"""
+        rollups = _sort_rollups(_concat([self._closed, rollup(self._open_raw)], ROLLUP_COLUMNS))
+        starts = _group_starts(rollups["origin"], rollups["destination"])
+        ends = np.append(starts[1:], len(rollups["origin"]))
+        route_slices = {
+            (str(rollups["origin"][start]), str(rollups["destination"][start])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+        self._rollups, self._route_slices = rollups, route_slices
+
+    def load(self):
+        """Read rollups and raw chunks from disk once; raw days after the last rollup are replayed"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self):
+        self._closed = self._read_rollups()
+        last_closed = int(self._closed["observed"].max()) if len(self._closed["observed"]) else 0
+
+        raw_root = self.directory / "raw"
+        days = sorted(
+            date.fromisoformat(entry.name).toordinal() for entry in raw_root.iterdir() if entry.is_dir()
+        ) if raw_root.exists() else []
+        for day in (d for d in days if d > last_closed):
+            if self._open_day is not None:
+                self._close_open_day()
+            self._open_raw = self._read_raw_day(day)
+            self._open_day = day
+        self._publish()
+
+    # ==================== READ PATH ====================
+
+    def _route_rows(self, origin: str, destination: str, departure_date: Optional[str]) -> Dict[str, np.ndarray]:
+        if not self._loaded:
+            self.load()
+        rollups = self._rollups
+        start, end = self._route_slices.get((origin.upper(), destination.upper()), (0, 0))
+        if departure_date is not None:
+            departure = date.fromisoformat(departure_date).toordinal()
+            departures = rollups["departure"][start:end]
+            start, end = (
+                start + int(np.searchsorted(departures, departure, side="left")),
+                start + int(np.searchsorted(departures, departure, side="right"))
+            )
+        return {column: values[start:end] for column, values in rollups.items()}
+
+    def daily_stats(self, origin: str, destination: str, departure_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rollup rows of a route (optionally one departure date), by departure then observed day"""
+        rows = self._route_rows(origin, destination, departure_date)
+        return [
+            {
+                "departure_date": date.fromordinal(int(rows["departure"][i])).isoformat(),
+                "observed_date": date.fromordinal(int(rows["observed"][i])).isoformat(),
+                "observations": int(rows["count"][i]),
+                "min": round(float(rows["min"][i]), 2),
+                "mean": round(float(rows["mean"][i]), 2),
+                **{f"p{q}": round(float(rows[f"p{q}"][i]), 2) for q in PERCENTILES}
+            }
+            for i in range(len(rows["count"]))
+        ]
+
+    def forecast(self, origin: str, destination: str, departure_date: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """Whether the minimum fare for a departure date is likely to drop, from its daily rollups"""
+        rows = self._route_rows(origin, destination, departure_date)
+        series = rows["min"].astype(np.float64)
+        result: Dict[str, Any] = {
+            "origin": origin.upper(),
+            "destination": destination.upper(),
+            "departure_date": departure_date,
+            "observation_days": len(series)
+        }
+        if len(series) < MIN_OBSERVATION_DAYS:
+            result.update({"outlook": "insufficient_data", "advice": "Not enough price history for this date yet"})
+            if len(series):
+                result["latest_min_price"] = round(float(series[-1]), 2)
+            return result
+
+        level, trend = holt(series)
+        days_left = date.fromisoformat(departure_date).toordinal() - (today or date.today()).toordinal()
+        horizon = max(1, min(FORECAST_HORIZON_DAYS, days_left))
+        latest = float(series[-1])
+        predicted = max(0.0, level + trend * horizon)
+        change = (predicted - latest) / latest if latest else 0.0
+        if change <= -TREND_THRESHOLD:
+            outlook, advice = "likely_cheaper", "Prices are trending down; waiting may pay off"
+        elif change >= TREND_THRESHOLD:
+            outlook, advice = "likely_pricier", "Prices are trending up; book soon"
+        else:
+            outlook, advice = "stable", "No clear trend; book when convenient"
+        result.update({
+            "latest_min_price": round(latest, 2),
+            "moving_average": round(float(series[-MOVING_AVERAGE_DAYS:].mean()), 2),
+            "forecast_min_price": round(predicted, 2),
+            "forecast_horizon_days": horizon,
+            "trend_per_day": round(trend, 2),
+            "expected_change_pct": round(change * 100, 1),
+            "outlook": outlook,
+            "advice": advice
+        })
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recorded": self.recorded,
+            "pending": len(self._pending["price"]),
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "routes": len(self._route_slices),
+            "rollup_rows": len(self._rollups["count"])
+        }
@@ -0,0 +1,293 @@
+"""
+Rate limiting and circuit breaking for upstream APIs (Amadeus, Groq)
+
+Every upstream call goes through ``Upstream.attempt()``:
+
+- a token bucket, refilled at the provider's quota, spaces calls out. A
+  call waits at most UPSTREAM_MAX_WAIT seconds for its token; if the
+  backlog is longer it is refused, so the caller falls back at once
+  instead of queueing behind the quota.
+- a circuit breaker counts consecutive failures. After
+  BREAKER_FAILURE_THRESHOLD of them it opens. While open, calls are
+  refused without touching the network, so an outage costs milliseconds
+  rather than a timeout per request. After BREAKER_RECOVERY_TIME seconds
+  it is half-open: up to BREAKER_HALF_OPEN_PROBES calls go through. A
+  success closes the breaker; a failure opens it for another period.
+
+A refused call raises ``UpstreamUnavailable``, and callers serve their
+existing fallback (mock flights, mock recommendation).
+
+A ``Deadline`` is the end-to-end budget of one request. It is created by
+the route handler and passed down, and each stage waits at most for the
+time that is left (``Deadline.run``). ``LatencyWindow`` keeps recent call
+latencies, and its p95 decides when a slow call is hedged.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+# Longest a call waits for a rate-limit token before falling back
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "1"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RECOVERY_TIME = float(os.getenv("BREAKER_RECOVERY_TIME", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+
+# Samples kept per LatencyWindow, and needed before it reports a p95
+LATENCY_WINDOW = 256
+LATENCY_MIN_SAMPLES = 20
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(Exception):
+    """The breaker is open or the rate limit would be exceeded; use the fallback"""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A stage ran out of the request's remaining time"""
+
+
+class Deadline:
+    """Monotonic end-to-end time budget of one request"""
+
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    async def run(self, awaitable: Awaitable[T], stage: str = "stage") -> T:
+        """Await within the remaining time; raises DeadlineExceeded (and cancels it) when out of time"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(f"no time left for {stage}")
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{stage} exceeded the request deadline") from None
+
+
+class LatencyWindow:
+    """Recent latencies of one kind of call, with a cached p95"""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._p95: Optional[float] = None
+        self._stale = 0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self._stale += 1
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of the window, None until ``min_samples`` calls were seen"""
+        if len(self._samples) < self.min_samples:
+            return None
+        # Re-sorting a few hundred floats is cheap, but not needed on every call
+        if self._p95 is None or self._stale >= 16:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self._stale = 0
+        return self._p95
+
+
+class TokenBucket:
+    """``rate`` tokens per second, up to ``burst`` saved; a rate of 0 disables limiting"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token; returns the seconds until it is due, or None if that exceeds ``max_wait``
+
+        Tokens may be reserved ahead (the balance goes negative), so waiting
+        callers are spaced ``1 / rate`` apart.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probes -> closed"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_time: float = BREAKER_RECOVERY_TIME,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_probes = half_open_probes
+        self._open = False
+        self._opened_at = 0.0
+        self._probes = 0
+        self.consecutive_failures = 0
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if not self._open:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.recovery_time:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; a half-open admission takes a probe slot"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes < self.half_open_probes:
+            self._probes += 1
+            return True
+        return False
+
+    def release(self):
+        """Give back a probe slot of a call that ended without an outcome"""
+        self._probes = max(0, self._probes - 1)
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self._open:
+            self._open = False
+            self._probes = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        reopen = self._open and self.state == self.HALF_OPEN
+        if reopen or (not self._open and self.consecutive_failures >= self.failure_threshold):
+            self._open = True
+            self._opened_at = time.monotonic()
+            self._probes = 0
+            self.opens += 1
+
+    def retry_in(self) -> float:
+        """Seconds until the next half-open probe (0 unless open)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_time - (time.monotonic() - self._opened_at))
+
+
+class Attempt:
+    """Outcome of one upstream call; exceptions fail it, ``fail()`` marks other failures"""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+class Upstream:
+    """Rate limiter + circuit breaker of one upstream API"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_wait: float = UPSTREAM_MAX_WAIT,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.rate_limited = 0
+
+    async def admit(self):
+        """Wait for a rate-limit token; raises UpstreamUnavailable instead of calling"""
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable(f"{self.name} circuit open")
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            self.breaker.release()
+            self.rate_limited += 1
+            raise UpstreamUnavailable(f"{self.name} rate limit reached")
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                self.breaker.release()
+                raise
+
+    @asynccontextmanager
+    async def attempt(self) -> AsyncIterator[Attempt]:
+        """Admit one call and record its outcome: an exception or ``fail()`` is a failure
+
+        DeadlineExceeded is not: the caller's deadline ran out, which is no
+        verdict on the upstream, so the call is dropped like a cancelled one.
+        """
+        await self.admit()
+        self.calls += 1
+        attempt = Attempt()
+        try:
+            yield attempt
+        except DeadlineExceeded:
+            # The request ran out of its own budget: a slow upstream shows up as its own timeout
+            self.breaker.release()
+            raise
+        except Exception:
+            attempt.fail()
+            self._record(attempt)
+            raise
+        except BaseException:
+            # Cancelled, or the consuming stream was closed: says nothing about the upstream
+            self.breaker.release()
+            raise
+        self._record(attempt)
+
+    def _record(self, attempt: Attempt):
+        if attempt.failed:
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "opens": self.breaker.opens,
+            "retry_in": round(self.breaker.retry_in(), 1),
+            "calls": self.calls,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "rate_limited": self.rate_limited,
+            "rate_per_second": self.bucket.rate
+        }
+
@@ -3,12 +3,33 @@ FastAPI routes for Groq Travel Assistant
 Minimal routes file - all logic in chatbot.py
 """
 
-from fastapi import APIRouter, HTTPException
+import json
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-from .chatbot import get_travel_recommendation, chat_with_assistant, get_available_cities
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from routes.json_responses import JSONBytesResponse, dumps
+from .gazetteer import AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT
+from .flexible_dates import FLEX_MAX_DAYS
+from .chatbot import (
+    get_travel_recommendation,
+    chat_with_assistant,
+    stream_travel_recommendation,
+    stream_chat_with_assistant,
+    get_available_cities,
+    autocomplete_cities,
+    get_cache_stats,
+    get_conversation_history,
+    get_price_history,
+    get_price_forecast,
+    get_flight_calendar,
+    get_upstream_status,
+    chat_deadline
+)
 
-app = APIRouter(prefix="/chat", tags=["Travel Assistant"])
+# Endpoints here return plain dicts: encode them with orjson
+app = APIRouter(prefix="/chat", tags=["Travel Assistant"], default_response_class=JSONBytesResponse)
 
 # ==================== REQUEST MODELS ====================
 
@@ -16,46 +37,156 @@ class RecommendationRequest(BaseModel):
     source: str
     destination: str
     query: Optional[str] = "What's the best option?"
+    departure_date: Optional[date] = None  # default: a week from today
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None  # omit to start a new conversation
+
+# ==================== SERVER-SENT EVENTS ====================
+
+async def _sse(events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def departure_iso(departure_date: Optional[date]) -> Optional[str]:
+    """ISO string of a requested departure date; 400 if it is in the past"""
+    if departure_date is None:
+        return None
+    if departure_date < date.today():
+        raise HTTPException(status_code=400, detail="departure_date must be today or later")
+    return departure_date.isoformat()
 
 # ==================== ENDPOINTS ====================
 
 @app.post("/recommend")
-async def get_recommendation(request: RecommendationRequest):
-    """Get travel recommendation for source->destination route"""
-    result = get_travel_recommendation(
+async def get_recommendation(request: RecommendationRequest, response: Response):
+    """Get travel recommendation for source->destination route
+
+    The `X-Served-By` header names the path that answered: `fast_path`
+    (ranked without the LLM), `groq_ai` or `mock_recommendation`.
+    """
+    # The latency budget starts here and is shared by the flight search and the LLM
+    deadline = chat_deadline()
+    result = await get_travel_recommendation(
         source=request.source,
         destination=request.destination,
-        query=request.query
+        query=request.query,
+        departure_date=departure_iso(request.departure_date),
+        deadline=deadline
     )
     if result["status"] == "error":
         raise HTTPException(status_code=400, detail=result["message"])
+    response.headers["X-Served-By"] = result["source"]
     return result["data"]
 
+@app.post("/recommend/stream")
+async def stream_recommendation(request: RecommendationRequest):
+    """Stream a recommendation over SSE
+
+    Events: `route` (cities, airport codes) right away, `flights` (ranked),
+    `reason` deltas as the LLM writes recommendation_reason, the full
+    `recommendation`, then `done` with the serving path (or `error`).
+    """
+    return sse_response(stream_travel_recommendation(
+        source=request.source,
+        destination=request.destination,
+        query=request.query,
+        departure_date=departure_iso(request.departure_date),
+        deadline=chat_deadline()
+    ))
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """Multi-turn conversation endpoint - extracts source/destination from message"""
-    result = chat_with_assistant(request.message)
+    result = await chat_with_assistant(request.message, request.session_id, chat_deadline())
     return result
 
+@app.post("/chat/stream")
+async def stream_chat(request: ChatRequest):
+    """Streaming chat over SSE: `session`, then the /recommend/stream events or one `clarification`"""
+    return sse_response(stream_chat_with_assistant(request.message, request.session_id, chat_deadline()))
+
+@app.get("/history/{session_id}")
+async def conversation_history(session_id: str):
+    """Recent messages of a chat session"""
+    return {"session_id": session_id, "messages": get_conversation_history(session_id)}
+
 @app.get("/cities")
 async def list_cities():
     """Get list of available cities"""
     return get_available_cities()
 
+@app.get("/cities/autocomplete")
+async def city_autocomplete(
+    q: str = Query(..., min_length=1, description="City name, alias or IATA code prefix"),
+    limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=MAX_AUTOCOMPLETE_LIMIT)
+):
+    """Cities/airports matching a prefix, ranked by route connectivity"""
+    return autocomplete_cities(q, limit)
+
+@app.get("/flights/{origin}/{destination}")
+async def flight_search(
+    origin: str,
+    destination: str,
+    departure_date: Optional[date] = None,
+    flex_days: int = Query(0, ge=0, le=FLEX_MAX_DAYS, description="Also search this many days either side"),
+    adults: int = Query(1, ge=1, le=9)
+):
+    """Flights for a date, or a ±flex_days window, with the cheapest fare per day"""
+    return await get_flight_calendar(origin, destination, departure_iso(departure_date), flex_days, adults)
+
+@app.get("/prices/{origin}/{destination}")
+async def route_price_history(origin: str, destination: str, departure_date: Optional[date] = None):
+    """Daily fare rollups of a route (optionally one departure date)"""
+    return get_price_history(origin, destination, departure_date.isoformat() if departure_date else None)
+
+@app.get("/prices/{origin}/{destination}/forecast")
+async def price_forecast(origin: str, destination: str, departure_date: date):
+    """Will the fare for this departure date get cheaper?"""
+    return get_price_forecast(origin, destination, departure_date.isoformat())
+
+@app.get("/stats")
+async def cache_stats():
+    """Cache hit/miss/eviction counters"""
+    return get_cache_stats()
+
+@app.get("/upstreams")
+async def upstream_status():
+    """Circuit-breaker state (closed / open / half_open) and rate-limit counters of Amadeus and Groq"""
+    return get_upstream_status()
+
+# Static: encoded once at import
+HEALTH_BODY = dumps({
+    "status": "healthy",
+    "service": "Groq Travel Assistant",
+    "llm": "mixtral-8x7b-32768",
+    "endpoints": [
+        "POST /api/chat/recommend - Get flight recommendation",
+        "POST /api/chat/recommend/stream - Streamed recommendation (SSE)",
+        "POST /api/chat/chat - Chat interface",
+        "POST /api/chat/chat/stream - Streamed chat (SSE)",
+        "GET /api/chat/history/{session_id} - Conversation history",
+        "GET /api/chat/cities - Available cities",
+        "GET /api/chat/cities/autocomplete?q= - City/airport prefix search",
+        "GET /api/chat/flights/{origin}/{destination}?departure_date=&flex_days= - Flexible-date flight calendar",
+        "GET /api/chat/prices/{origin}/{destination} - Daily fare rollups",
+        "GET /api/chat/prices/{origin}/{destination}/forecast?departure_date= - Will it get cheaper?",
+        "GET /api/chat/stats - Cache counters",
+        "GET /api/chat/upstreams - Amadeus/Groq circuit breakers",
+        "GET /api/chat/health - This endpoint"
+    ]
+})
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "Groq Travel Assistant",
-        "llm": "mixtral-8x7b-32768",
-        "endpoints": [
-            "POST /api/chat/recommend - Get flight recommendation",
-            "POST /api/chat/chat - Chat interface",
-            "GET /api/chat/cities - Available cities",
-            "GET /api/chat/health - This endpoint"
-        ]
-    }
+    return JSONBytesResponse(HEALTH_BODY)
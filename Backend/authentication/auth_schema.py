@@ -1,5 +1,6 @@
 # schemas/auth.py
 from pydantic import BaseModel, EmailStr
+from typing import Optional
 
 class SignupSchema(BaseModel):
     name: str
@@ -13,3 +14,7 @@ class LoginSchema(BaseModel):
 class TokenResponseSchema(BaseModel):
     accessToken: str
     tokenType: str = "bearer"
+    refreshToken: Optional[str] = None
+
+class RefreshSchema(BaseModel):
+    refreshToken: str
@@ -1,21 +1,176 @@
 # core/deps.py
+"""
+Bearer-token dependency with a verified-token cache
+
+Clients reuse one access token for thousands of calls, so the HS256
+signature is verified once per token. The decoded claims are cached in an
+LRU keyed by the token's SHA-256, bounded to JWT_CACHE_MAX_ENTRIES. A cached
+token is served until its ``exp``, then dropped.
+
+Access tokens issued at login carry the id (``sid``) of their refresh-token
+session in ``sessions_collection``. Logging out revokes that session. Its id
+then sits in an in-memory revocation set, checked on every request (hit or
+miss). The set is reloaded from Mongo every JWT_REVOCATION_REFRESH seconds,
+so revocations from other workers also apply. It only needs sessions
+revoked within the last ACCESS_TOKEN_EXPIRE_MINUTES, since older access
+tokens have expired anyway.
+"""
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 import os
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from .jwt_utils import token_digest
+from .repositories import SessionRepository, sessions
+
 load_dotenv()
 
 # Load JWT settings from environment
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
+JWT_REVOCATION_REFRESH = float(os.getenv("JWT_REVOCATION_REFRESH", "30"))
 
 security = HTTPBearer()
 
-def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload["userId"]
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+
+class TokenCache:
+    """LRU of verified token claims keyed by token digest, honouring ``exp``"""
+
+    def __init__(self, max_entries: int = JWT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        claims, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def set(self, digest: str, claims: Dict[str, Any]):
+        self._entries[digest] = (claims, float(claims.get("exp", float("inf"))))
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+class RevocationList:
+    """Session ids revoked within the access-token lifetime, synced from Mongo"""
+
+    def __init__(
+        self,
+        repository: SessionRepository = sessions,
+        window: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_interval: float = JWT_REVOCATION_REFRESH
+    ):
+        self.repository = repository
+        self.window = window
+        self.refresh_interval = refresh_interval
+        self._revoked: Dict[str, float] = {}  # session id -> when we learned of it
+        self._refresher: Optional[asyncio.Task] = None
+        self.refresh_errors = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    async def revoke(self, session_id: str):
+        await self.repository.revoke(session_id)
+        self._revoked[session_id] = time.time()
+
+    async def refresh(self):
+        """Merge in sessions revoked by any worker and forget ones past the window"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.window)
+        revoked = await self.repository.revoked_since(cutoff)
+        now = time.time()
+        for session_id in revoked:
+            self._revoked.setdefault(session_id, now)
+        for session_id, seen in list(self._revoked.items()):
+            if now - seen > self.window:
+                del self._revoked[session_id]
+
+    def start(self):
+        """Start the periodic refresh (call from the running event loop)"""
+        if self._refresher is None:
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Token revocation refresh error: {e}")
+                self.refresh_errors += 1
+            await asyncio.sleep(self.refresh_interval)
+
+
+token_cache = TokenCache()
+revoked_sessions = RevocationList()
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """Claims of a valid, unrevoked access token; raises HTTPException(401) otherwise"""
+    digest = token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.set(digest, claims)
+    if claims.get("sid") in revoked_sessions:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return claims
+
+
+async def get_current_claims(token: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    return verify_token(token.credentials)
+
+
+async def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)):
+    # async: a cache hit is a dict lookup, not worth a threadpool hop
+    return verify_token(token.credentials)["userId"]
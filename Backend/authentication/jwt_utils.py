@@ -1,7 +1,10 @@
 # core/jwt.py
 from datetime import datetime, timedelta
 from jose import jwt
+import hashlib
 import os
+import secrets
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,9 +12,25 @@ load_dotenv()
 # Load JWT settings from environment
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
 def create_access_token(data: dict, expires_minutes: int):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def token_digest(token: str) -> str:
+    """SHA-256 of a token, so raw tokens are never stored or used as keys"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def create_refresh_token(session_id: str) -> str:
+    """Opaque "<session id>.<random secret>" token; only its digest is stored"""
+    return f"{session_id}.{secrets.token_urlsafe(32)}"
+
+def parse_refresh_token(token: str) -> Optional[Tuple[str, str]]:
+    """(session id, digest of the whole token), or None if malformed"""
+    session_id, _, secret = token.partition(".")
+    if not session_id or not secret:
+        return None
+    return session_id, token_digest(token)
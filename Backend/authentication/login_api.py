@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
 import os
+import uuid
 
-from .auth_schema import LoginSchema, TokenResponseSchema
-from .password_utils import verify_password
-from .jwt_utils import create_access_token
-from .mongo_connection import users_collection
+from .auth_schema import LoginSchema, RefreshSchema, TokenResponseSchema
+from .password_utils import hash_pool, verify_and_update_password
+from .jwt_utils import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token,
+    create_refresh_token,
+    parse_refresh_token,
+    token_digest
+)
+from .jwt_protected import get_current_claims, revoked_sessions, token_cache
+from .repositories import sessions, users
 
 app = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -14,20 +22,75 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 
 
 @app.post("/login", response_model=TokenResponseSchema)
-def login(data: LoginSchema):
-    user = users_collection.find_one({"email": data.email})
+async def login(data: LoginSchema):
+    user = await users.find_by_email(data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not user or not verify_password(data.password, user["passwordHash"]):
+    # bcrypt runs on the dedicated hash pool, not the shared threadpool
+    valid, new_hash = await verify_and_update_password(data.password, user["passwordHash"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    users_collection.update_one(
-        {"_id": user["_id"]},
-        {"$set": {"lastLogin": datetime.utcnow()}}
+    # new_hash is set when the stored hash used other cost parameters
+    await users.record_login(user["_id"], new_hash)
+
+    session_id = uuid.uuid4().hex
+    refresh_token = create_refresh_token(session_id)
+    await sessions.create_refresh_session(
+        session_id, str(user["_id"]), token_digest(refresh_token),
+        datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+    token = create_access_token(
+        data={"userId": str(user["_id"]), "sid": session_id},
+        expires_minutes=ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+
+    return {"accessToken": token, "tokenType": "bearer", "refreshToken": refresh_token}
+
+
+@app.post("/refresh", response_model=TokenResponseSchema)
+async def refresh(data: RefreshSchema):
+    """Trade a refresh token for a new access token; the refresh token is rotated"""
+    parsed = parse_refresh_token(data.refreshToken)
+    if parsed is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    session_id, digest = parsed
+
+    refresh_token = create_refresh_token(session_id)
+    session = await sessions.rotate_refresh(
+        session_id, digest, token_digest(refresh_token),
+        datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     )
+    if session is None:
+        # A live session whose token no longer matches means an already-rotated
+        # token was replayed: whoever holds it may have stolen it, so end the session
+        current = await sessions.get(session_id)
+        if current is not None and current["refreshToken"] != digest and current.get("revokedAt") is None:
+            await revoked_sessions.revoke(session_id)
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
 
     token = create_access_token(
-        data={"userId": str(user["_id"])},
+        data={"userId": session["userId"], "sid": session_id},
         expires_minutes=ACCESS_TOKEN_EXPIRE_MINUTES
     )
+    return {"accessToken": token, "tokenType": "bearer", "refreshToken": refresh_token}
+
+
+@app.post("/logout")
+async def logout(claims: dict = Depends(get_current_claims)):
+    """Revoke the session: its refresh token and every access token issued for it"""
+    if claims.get("sid"):
+        await revoked_sessions.revoke(claims["sid"])
+    return {"message": "Logged out"}
+
 
-    return {"accessToken": token, "tokenType": "bearer"}
+@app.get("/stats")
+async def auth_stats():
+    """Password-hash pool load, token cache and revocation counters"""
+    return {
+        "hash_pool": hash_pool.stats(),
+        "token_cache": token_cache.stats(),
+        "revoked_sessions": len(revoked_sessions)
+    }
@@ -1,8 +1,62 @@
 # db/mongo.py
-from pymongo import MongoClient
+"""
+MongoDB clients
 
-client = MongoClient("mongodb://localhost:27017")
-db = client["airport_llm"]
+Two clients share the MONGODB_URL / MONGODB_DB settings and pool options:
+
+- ``client`` (sync PyMongo) for work already off the event loop, such as the
+  conversation write-behind running in a worker thread
+- ``get_async_database()`` (PyMongo async) for request handlers, through the
+  repositories in ``authentication.repositories``
+
+Neither connects until first use, so importing this module never blocks.
+"""
+import os
+import asyncio
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+
+load_dotenv()
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+MONGODB_DB = os.getenv("MONGODB_DB", "airport_llm")
+
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "60000")),
+    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+    "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+}
+
+client = MongoClient(MONGODB_URL, connect=False, **POOL_OPTIONS)
+db = client[MONGODB_DB]
 
 users_collection = db["users"]
 sessions_collection = db["sessions"]
+# Chat transcripts, kept apart from the refresh-token sessions
+conversations_collection = db["conversations"]
+
+_async_client: Optional[AsyncMongoClient] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_database():
+    """Async database handle, with the client created on first use in the running event loop"""
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = AsyncMongoClient(MONGODB_URL, **POOL_OPTIONS)
+        _async_loop = loop
+    return _async_client[MONGODB_DB]
+
+
+async def close_async_client():
+    """Close the async client's pool (call on app shutdown)"""
+    global _async_client, _async_loop
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = _async_loop = None
@@ -1,10 +1,162 @@
 # core/security.py
-from passlib.context import CryptContext
+"""
+Password hashing on a dedicated, bounded worker pool
+
+bcrypt costs ~250 ms of CPU per hash at 12 rounds. Running it inline in
+sync handlers ties up FastAPI's shared threadpool, so a login burst starves
+every other sync route. Hashes run on their own HASH_POOL_WORKERS threads
+instead (bcrypt releases the GIL while hashing). At most HASH_QUEUE_LIMIT
+further jobs may wait for a worker; past that, requests are rejected with
+503 + Retry-After rather than queueing without bound.
+
+Hashes use BCRYPT_ROUNDS. A stored hash with a different cost is replaced
+on the next successful login (see verify_and_update_password).
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "32"))
+# Queue waits kept for the percentiles in stats()
+QUEUE_WAIT_SAMPLES = 1000
+
+# bcrypt only reads the first 72 bytes (passlib truncated the same way)
+BCRYPT_MAX_BYTES = 72
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(BCRYPT_ROUNDS)).decode("ascii")
+
 
 def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode("ascii"))
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost parameter of a "$2b$12$..." hash"""
+    parts = hashed.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def verify_and_rehash(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new hash if the stored one uses other cost parameters)"""
+    if not verify_password(password, hashed):
+        return False, None
+    return True, hash_password(password) if needs_rehash(hashed) else None
+
+
+class HashPoolSaturated(HTTPException):
+    """Every worker is busy and the wait queue is full"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Authentication is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
+class HashPool:
+    """Size-limited thread pool for password hashing with admission control"""
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._queue_waits: deque = deque(maxlen=QUEUE_WAIT_SAMPLES)
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run ``func(*args)`` on the pool; raises HashPoolSaturated instead of queueing past the limit"""
+        if self._in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HashPoolSaturated()
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            return time.perf_counter() - submitted_at, func(*args)
+
+        # The slot is freed when the job itself ends: a cancelled caller doesn't
+        # stop a hash that is already running on a worker
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self.executor.submit(job)
+        except BaseException:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+        queue_wait, result = await asyncio.wrap_future(future)
+        self._queue_waits.append(queue_wait)
+        self.completed += 1
+        return result
+
+    def _job_done(self, future: Optional[Future]):
+        # Runs on the worker thread (or wherever the future was cancelled)
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._queue_waits)
+
+        def percentile(fraction: float) -> float:
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "queue_wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+        }
+
+
+hash_pool = HashPool()
+
+
+async def hash_password_async(password: str) -> str:
+    return await hash_pool.run(hash_password, password)
+
+
+async def verify_and_update_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Pooled verify_and_rehash"""
+    return await hash_pool.run(verify_and_rehash, password, hashed)
@@ -0,0 +1,296 @@
+"""
+Async repositories over the MongoDB collections described in ``schemas/``
+
+Routers call these instead of touching collections, so no request handler
+blocks the event loop on the database. Each repository takes a database
+handle; by default it uses ``get_async_database()`` from the running loop.
+A sync handle such as ``mongomock.MongoClient().db`` also works. Its calls
+simply return immediately, which is what the tests use when no mongod is
+running.
+
+``ensure_indexes`` creates every index in ``INDEXES``. It is idempotent and
+runs once at startup.
+"""
+
+import inspect
+import itertools
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from .mongo_connection import get_async_database
+
+USERS = "users"
+SESSIONS = "sessions"
+CONVERSATIONS = "conversations"
+SEARCHES = "searches"
+FLIGHT_RESULTS = "flight_results"
+PRICE_HISTORY = "price_history"
+PRICE_ALERTS = "price_alerts"
+NOTIFICATIONS = "notifications"
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    USERS: [IndexModel([("email", ASCENDING)], unique=True, name="email_unique")],
+    SESSIONS: [
+        IndexModel([("userId", ASCENDING)], name="user"),
+        # Refresh-token sessions disappear once expired
+        IndexModel([("expiresAt", ASCENDING)], expireAfterSeconds=0, name="expires_ttl"),
+        IndexModel([("revokedAt", ASCENDING)], name="revoked"),
+    ],
+    CONVERSATIONS: [IndexModel([("updatedAt", DESCENDING)], name="updated")],
+    SEARCHES: [
+        IndexModel([("origin", ASCENDING), ("destination", ASCENDING), ("departureDate", ASCENDING)], name="route_date"),
+        IndexModel([("userId", ASCENDING), ("searchedAt", DESCENDING)], name="user_recent"),
+    ],
+    FLIGHT_RESULTS: [
+        IndexModel([("origin", ASCENDING), ("destination", ASCENDING), ("departureDate", ASCENDING)], name="route_date"),
+        IndexModel([("searchId", ASCENDING)], name="search"),
+    ],
+    PRICE_HISTORY: [
+        IndexModel(
+            [("origin", ASCENDING), ("destination", ASCENDING), ("date", ASCENDING), ("recordedAt", ASCENDING)],
+            name="route_date_recorded"
+        ),
+    ],
+    PRICE_ALERTS: [
+        IndexModel([("origin", ASCENDING), ("destination", ASCENDING), ("isActive", ASCENDING)], name="route_active"),
+        IndexModel([("userId", ASCENDING)], name="user"),
+        # Full reloads of the alert matcher read only active alerts
+        IndexModel([("isActive", ASCENDING)], name="active"),
+        IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+    ],
+    NOTIFICATIONS: [IndexModel([("userId", ASCENDING), ("isRead", ASCENDING), ("createdAt", DESCENDING)], name="user_unread")],
+}
+
+
+async def _resolve(result: Any) -> Any:
+    """Await async driver results; sync handles (mongomock) return values directly"""
+    return await result if inspect.isawaitable(result) else result
+
+
+async def _to_list(cursor: Any, length: Optional[int]) -> List[Dict[str, Any]]:
+    if inspect.iscoroutinefunction(getattr(cursor, "to_list", None)):
+        return await cursor.to_list(length)
+    return list(itertools.islice(cursor, length))
+
+
+async def _iterate(cursor: Any) -> AsyncIterator[Dict[str, Any]]:
+    """Stream documents from an async or sync cursor without materialising them"""
+    if hasattr(cursor, "__aiter__"):
+        async for document in cursor:
+            yield document
+    else:
+        for document in cursor:
+            yield document
+
+
+def _as_object_id(value: Any) -> Any:
+    """String ids handed back from in-memory indexes, as the ObjectId Mongo generated"""
+    return ObjectId(value) if isinstance(value, str) and ObjectId.is_valid(value) else value
+
+
+def _as_datetime(day: date) -> datetime:
+    """BSON has no date type; store calendar dates as midnight datetimes"""
+    return day if isinstance(day, datetime) else datetime(day.year, day.month, day.day)
+
+
+async def ensure_indexes(database=None) -> Dict[str, List[str]]:
+    """Create all INDEXES; returns the index names per collection"""
+    database = database if database is not None else get_async_database()
+    created = {}
+    for collection, indexes in INDEXES.items():
+        created[collection] = await _resolve(database[collection].create_indexes(indexes))
+    return created
+
+
+class Repository:
+    collection_name: str
+
+    def __init__(self, database=None):
+        self._database = database
+
+    @property
+    def collection(self):
+        database = self._database if self._database is not None else get_async_database()
+        return database[self.collection_name]
+
+
+class UserRepository(Repository):
+    collection_name = USERS
+
+    async def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return await _resolve(self.collection.find_one({"email": email}))
+
+    async def create(self, user: Dict[str, Any]) -> Any:
+        """Insert a user; raises DuplicateKeyError if the email is taken"""
+        result = await _resolve(self.collection.insert_one(user))
+        return result.inserted_id
+
+    async def record_login(self, user_id: Any, password_hash: Optional[str] = None):
+        update: Dict[str, Any] = {"lastLogin": datetime.utcnow()}
+        if password_hash:
+            update["passwordHash"] = password_hash
+        await _resolve(self.collection.update_one({"_id": user_id}, {"$set": update}))
+
+
+class SessionRepository(Repository):
+    collection_name = SESSIONS
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await _resolve(self.collection.find_one({"_id": session_id}))
+
+    async def for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return await _to_list(self.collection.find({"userId": user_id}).limit(limit), limit)
+
+    async def create_refresh_session(self, session_id: str, user_id: str, refresh_digest: str, expires_at: datetime):
+        """SessionSchema document; refreshToken holds the token's digest, not the token"""
+        await _resolve(self.collection.insert_one({
+            "_id": session_id,
+            "userId": user_id,
+            "refreshToken": refresh_digest,
+            "expiresAt": expires_at,
+            "createdAt": datetime.utcnow(),
+            "revokedAt": None
+        }))
+
+    async def rotate_refresh(
+        self, session_id: str, old_digest: str, new_digest: str, expires_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """Swap in a new refresh token if ``old_digest`` is current, unexpired and unrevoked
+
+        Atomic, so a refresh token can be redeemed once; returns the session or None.
+        """
+        return await _resolve(self.collection.find_one_and_update(
+            {
+                "_id": session_id,
+                "refreshToken": old_digest,
+                "revokedAt": None,
+                "expiresAt": {"$gt": datetime.utcnow()}
+            },
+            {"$set": {"refreshToken": new_digest, "expiresAt": expires_at}}
+        ))
+
+    async def revoke(self, session_id: str):
+        await _resolve(self.collection.update_one({"_id": session_id}, {"$set": {"revokedAt": datetime.utcnow()}}))
+
+    async def revoked_since(self, cutoff: datetime) -> List[str]:
+        """Ids of sessions revoked after ``cutoff``"""
+        cursor = self.collection.find({"revokedAt": {"$gte": cutoff}}, {"_id": 1})
+        return [session["_id"] for session in await _to_list(cursor, None)]
+
+
+class SearchRepository(Repository):
+    collection_name = SEARCHES
+
+    async def record(
+        self, user_id: str, origin: str, destination: str, departure_date: date, return_date: Optional[date] = None
+    ) -> Any:
+        result = await _resolve(self.collection.insert_one({
+            "userId": user_id,
+            "origin": origin,
+            "destination": destination,
+            "departureDate": _as_datetime(departure_date),
+            "returnDate": _as_datetime(return_date) if return_date else None,
+            "searchedAt": datetime.utcnow()
+        }))
+        return result.inserted_id
+
+    async def recent_for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({"userId": user_id}).sort("searchedAt", DESCENDING).limit(limit)
+        return await _to_list(cursor, limit)
+
+
+class PriceHistoryRepository(Repository):
+    collection_name = PRICE_HISTORY
+
+    async def record(
+        self, origin: str, destination: str, day: date, price: float, recorded_at: Optional[datetime] = None
+    ):
+        """PriceHistorySchema document (price is stored as a string, as in the schema)"""
+        await _resolve(self.collection.insert_one({
+            "origin": origin,
+            "destination": destination,
+            "date": _as_datetime(day),
+            "price": str(price),
+            "recordedAt": recorded_at or datetime.utcnow()
+        }))
+
+    async def history(
+        self, origin: str, destination: str, day: Optional[date] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Observations for a route (optionally one departure date), oldest first"""
+        query: Dict[str, Any] = {"origin": origin, "destination": destination}
+        if day is not None:
+            query["date"] = _as_datetime(day)
+        cursor = self.collection.find(query).sort([("date", ASCENDING), ("recordedAt", ASCENDING)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return await _to_list(cursor, limit)
+
+
+class PriceAlertRepository(Repository):
+    collection_name = PRICE_ALERTS
+
+    async def create(self, user_id: str, origin: str, destination: str, target_price: float) -> Any:
+        """PriceAlertSchema document (targetPrice is stored as a string, as in the schema)"""
+        result = await _resolve(self.collection.insert_one({
+            "userId": user_id,
+            "origin": origin.upper(),
+            "destination": destination.upper(),
+            "targetPrice": str(target_price),
+            "isActive": True,
+            "createdAt": datetime.utcnow()
+        }))
+        return result.inserted_id
+
+    def active(self, batch_size: int = 10000) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every active alert, only the fields the matcher needs"""
+        cursor = self.collection.find(
+            {"isActive": True},
+            {"userId": 1, "origin": 1, "destination": 1, "targetPrice": 1},
+            batch_size=batch_size
+        )
+        return _iterate(cursor)
+
+    async def claim(self, alert_ids: List[str], claim: str) -> List[Dict[str, Any]]:
+        """Deactivate still-active alerts and return those this ``claim`` deactivated
+
+        The conditional update makes each alert fire once, even when several
+        workers match the same price.
+        """
+        ids = [_as_object_id(alert_id) for alert_id in alert_ids]
+        await _resolve(self.collection.update_many(
+            {"_id": {"$in": ids}, "isActive": True},
+            {"$set": {"isActive": False, "triggeredAt": datetime.utcnow(), "claim": claim}}
+        ))
+        cursor = self.collection.find({"_id": {"$in": ids}, "claim": claim}, {"userId": 1, "targetPrice": 1})
+        return await _to_list(cursor, None)
+
+    async def release(self, claim: str):
+        """Reactivate the alerts of a claim whose notifications could not be written"""
+        await _resolve(self.collection.update_many(
+            {"claim": claim},
+            {"$set": {"isActive": True}, "$unset": {"claim": "", "triggeredAt": ""}}
+        ))
+
+
+class NotificationRepository(Repository):
+    collection_name = NOTIFICATIONS
+
+    async def insert_many(self, notifications: List[Dict[str, Any]]):
+        if notifications:
+            await _resolve(self.collection.insert_many(notifications, ordered=False))
+
+    async def unread_for_user(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({"userId": user_id, "isRead": False}).sort("createdAt", DESCENDING).limit(limit)
+        return await _to_list(cursor, limit)
+
+
+users = UserRepository()
+sessions = SessionRepository()
+searches = SearchRepository()
+price_history = PriceHistoryRepository()
+price_alerts = PriceAlertRepository()
+notifications = NotificationRepository()
@@ -2,27 +2,32 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
-from .mongo_connection import users_collection
+from .repositories import users
 from .auth_schema import SignupSchema
-from .password_utils import hash_password
+from .password_utils import hash_password_async
 
 app = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @app.post("/signup")
-def signup(data: SignupSchema):
-    if users_collection.find_one({"email": data.email}):
+async def signup(data: SignupSchema):
+    if await users.find_by_email(data.email):
         raise HTTPException(status_code=400, detail="Email already exists")
 
     user = {
         "name": data.name,
         "email": data.email,
-        "passwordHash": hash_password(data.password),
+        "passwordHash": await hash_password_async(data.password),
         "isPremium": False,
         "createdAt": datetime.utcnow(),
         "lastLogin": None
     }
 
-    users_collection.insert_one(user)
+    try:
+        await users.create(user)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same email (unique index)
+        raise HTTPException(status_code=400, detail="Email already exists")
     return {"message": "Signup successful"}
@@ -0,0 +1,389 @@
+"""
+Micro-benchmarks and an in-process load test of the API
+
+Micro-benchmarks time the hot helpers per call:
+- parse_duration_to_minutes and determine_best_options
+- route-graph lookups, a multi-leg search and a catalogue page
+- chat route extraction
+- access-token checks: a cached verify_token against a full jwt.decode
+
+The load test drives POST /api/routes/recommend, /api/chat/chat and
+/api/auth/login through the ASGI app in this process, with no server and no
+network. Amadeus is an httpx MockTransport, Groq a stub chain (each with a
+configurable latency), and Mongo is mongomock (or a throwaway database on
+the mongod at MONGODB_URL). Each scenario reports throughput and
+p50/p95/p99.
+
+``--save`` writes the results to a JSON baseline. Later runs are compared
+against it, and a metric more than ``--tolerance`` worse than the baseline
+fails the run.
+
+Run with: python benchmark_api.py [--concurrency 16] [--requests 200] [--save]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from jose import jwt
+
+# Logins sign real tokens; they never leave this process
+os.environ.setdefault("SECRET_KEY", "benchmark-" + uuid.uuid4().hex)
+
+import main
+from authentication import login_api
+from authentication.jwt_protected import ALGORITHM, SECRET_KEY, verify_token
+from authentication.jwt_utils import create_access_token
+from authentication.password_utils import hash_password, hash_pool
+from authentication.repositories import SessionRepository, UserRepository
+from Chatbot import chatbot
+from Chatbot.chatbot import AmadeusClient, extract_route, get_city_matcher, travel_assistant
+from Chatbot.resilience import Upstream
+from routes.itinerary_search import get_itinerary_search
+from routes.route_catalog import get_route_catalog
+from routes.route_graph import get_route_graph, parse_duration_to_minutes
+from routes.route_recommendations import determine_best_options
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+SCENARIOS = ("routes_recommend", "chat", "login")
+
+# Direct pairs in the datasets, plus one connection for the multi-leg search
+ROUTE_PAIRS = [("Delhi", "Nagpur"), ("Mumbai", "Bangalore"), ("Bangalore", "Hyderabad"), ("Nagpur", "Delhi")]
+CHAT_MESSAGES = [
+    "cheapest flight from Delhi to Mumbai",
+    "Which flight should I take from Bangalore to Chennai?",
+    "fastest way from Kolkata to Pune",
+    "I want to fly from Hyderabad to Delhi, what do you suggest?",
+    "hello, can you help me plan a trip?"
+]
+LOGIN_USERS = 8
+LOGIN_PASSWORD = "benchmark-password"
+
+
+def per_call(function: Callable[[], Any], repeat: int) -> float:
+    """Microseconds per call, best of three rounds"""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1e6
+
+
+def micro_benchmarks() -> Dict[str, float]:
+    graph = get_route_graph()
+    search = get_itinerary_search()
+    catalog = get_route_catalog()
+    get_city_matcher()
+    delhi, nagpur = graph.city_id("delhi"), graph.city_id("nagpur")
+    hyderabad, mumbai = graph.city_id("hyderabad"), graph.city_id("mumbai")
+    names = [graph.city_names[i] for i in range(0, len(graph.city_names), max(1, len(graph.city_names) // 100))]
+    modes = {
+        "plane": {"duration": "2 hours", "price": 5200, "comfort_level": "Standard"},
+        "train": {"duration": "16 hours 30 min", "price": 1400, "comfort_level": "Standard"},
+        "bus": {"duration": "20 hours", "price": 800, "comfort_level": "Budget"}
+    }
+
+    token = create_access_token({"userId": "benchmark", "sid": "benchmark"}, expires_minutes=60)
+
+    cases: List[Tuple[str, Callable[[], Any], int]] = [
+        ("parse_duration_to_minutes", lambda: parse_duration_to_minutes("16 hours 30 min"), 20000),
+        ("determine_best_options", lambda: determine_best_options(modes), 20000),
+        ("graph.city_id", lambda: graph.city_id("Delhi"), 20000),
+        ("graph.edges_between", lambda: graph.edges_between(delhi, nagpur), 20000),
+        ("graph.city_ids (100 names)", lambda: graph.city_ids(names), 2000),
+        ("itinerary search (multi-leg)", lambda: search.search(hyderabad, mumbai, metric="time"), 200),
+        ("route catalogue page", lambda: catalog.page(catalog.select(mode="train", max_distance=500), 0, 50), 2000),
+        ("extract_route", lambda: extract_route("Which flight should I take from Bangalore to Chennai?"), 5000),
+        ("jwt.decode (no cache)", lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), 5000),
+        ("verify_token (cached)", lambda: verify_token(token), 20000)
+    ]
+    results = {}
+    for name, function, repeat in cases:
+        results[name] = round(per_call(function, repeat), 2)
+        print(f"   {name:32} {results[name]:10.2f} µs")
+    return results
+
+
+class StubChain:
+    """Stands in for the Groq chain: answers after ``latency`` seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def ainvoke(self, inputs: Dict[str, str]) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {
+            "source_city": inputs["source_city"],
+            "destination_city": inputs["destination_city"],
+            "source_airport": "STB",
+            "destination_airport": "STB",
+            "best_flight": {},
+            "all_flights": [],
+            "recommendation_reason": "stub"
+        }
+
+
+def stub_amadeus(latency: float) -> AmadeusClient:
+    """Amadeus client answering from an in-process transport after ``latency`` seconds"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.method == "POST":
+            return httpx.Response(200, json={"access_token": "stub-token", "expires_in": 1799})
+        seed = sum(map(ord, request.url.params.get("destinationLocationCode", "")))
+        return httpx.Response(200, json={"flights": [
+            {
+                "id": f"STUB{i}", "airline": "Stub Air", "departure": f"{6 + 3 * i:02d}:00",
+                "arrival": f"{8 + 3 * i:02d}:15", "duration": "2h 15m", "price": 3000 + (seed * 37 + i * 450) % 4000
+            }
+            for i in range(5)
+        ]})
+
+    return AmadeusClient(
+        "stub", "stub", base_url="https://amadeus.stub",
+        transport=httpx.MockTransport(handler), upstream=Upstream("amadeus", 0, 1)
+    )
+
+
+def install_stubs(database, amadeus_latency: float, groq_latency: float) -> StubChain:
+    """Point the app at the stubs (process-wide; this script is the only user)"""
+    chain = StubChain(groq_latency)
+    travel_assistant.amadeus = stub_amadeus(amadeus_latency)
+    chatbot.get_chain = lambda: chain
+    # No rate limit: the stubs have no quota to protect
+    chatbot.groq_upstream = Upstream("groq", 0, 1)
+    login_api.users = UserRepository(database)
+    login_api.sessions = SessionRepository(database)
+    return chain
+
+
+def percentiles(latencies: np.ndarray) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Tuple[str, str, Optional[Dict[str, Any]]]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Send ``requests`` requests from ``concurrency`` workers; throughput and latency percentiles"""
+    latencies = np.zeros(requests)
+    statuses: Counter = Counter()
+    issued = 0
+
+    async def worker():
+        nonlocal issued
+        while issued < requests:
+            index = issued
+            issued += 1
+            method, path, body = make_request(index)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies[index] = time.perf_counter() - started
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        **percentiles(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+
+def recommend_request(index: int) -> Tuple[str, str, Dict[str, Any]]:
+    if index % 5 == 4:
+        body = {"source": "Hyderabad", "destination": "Mumbai", "search_mode": "multi_leg"}
+    else:
+        source, destination = ROUTE_PAIRS[index % len(ROUTE_PAIRS)]
+        body = {"source": source, "destination": destination}
+    return "POST", "/api/routes/recommend", body
+
+
+def chat_request(index: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/api/chat/chat", {"message": CHAT_MESSAGES[index % len(CHAT_MESSAGES)]}
+
+
+def login_request(index: int) -> Tuple[str, str, Dict[str, Any]]:
+    return "POST", "/api/auth/login", {
+        "email": f"bench{index % LOGIN_USERS}@example.com", "password": LOGIN_PASSWORD
+    }
+
+
+REQUESTS = {"routes_recommend": recommend_request, "chat": chat_request, "login": login_request}
+
+
+async def load_test(database, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    chain = install_stubs(database, args.amadeus_latency, args.groq_latency)
+    if "login" in args.scenarios:
+        users = login_api.users
+        stored_hash = hash_password(LOGIN_PASSWORD)
+        for i in range(LOGIN_USERS):
+            await users.create({
+                "name": f"Bench {i}", "email": f"bench{i}@example.com",
+                "passwordHash": stored_hash, "lastLogin": None
+            })
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for scenario in args.scenarios:
+            make_request = REQUESTS[scenario]
+            # Warm caches, connection pools and the threadpool; not measured
+            await drive(client, make_request, min(args.warmup, args.requests), args.concurrency)
+            results[scenario] = r = await drive(client, make_request, args.requests, args.concurrency)
+            print(
+                f"   {scenario:18} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   "
+                f"p95 {r['p95_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms   errors {r['errors']}"
+            )
+    await travel_assistant.amadeus.aclose()
+    print(f"   stub LLM calls: {chain.calls}; hash pool: {hash_pool.stats()['completed']} hashes")
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics more than ``tolerance`` worse than the baseline"""
+    regressions = []
+    for name, micros in current["micro"].items():
+        before = baseline.get("micro", {}).get(name)
+        if before and micros > before * (1 + tolerance):
+            regressions.append(f"{name}: {before:.2f} → {micros:.2f} µs")
+    for scenario, result in current["load"].items():
+        before = baseline.get("load", {}).get(scenario)
+        if not before:
+            continue
+        if (before["requests"], before["concurrency"]) != (result["requests"], result["concurrency"]):
+            print(f"   {scenario}: baseline ran {before['requests']} requests at concurrency "
+                  f"{before['concurrency']}, not compared")
+            continue
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{scenario} throughput: {before['throughput_rps']} → {result['throughput_rps']} req/s")
+        for key in ("p95_ms", "p99_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{scenario} {key[:3]}: {before[key]} → {result[key]} ms")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{scenario} errors: {before['errors']} → {result['errors']}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--amadeus-latency", type=float, default=0.05, help="Stub Amadeus response time (s)")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="Stub Groq response time (s)")
+    parser.add_argument("--skip-micro", action="store_true", help="Only run the load test")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against / save to")
+    parser.add_argument("--save", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def run_benchmarks(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    print("=" * 70)
+    print("API BENCHMARKS")
+    print("=" * 70)
+
+    # What the lifespan would load before serving
+    get_route_catalog()
+    get_city_matcher()
+
+    print("\n1. Micro-benchmarks (per call)")
+    print("-" * 70)
+    micro = {} if args.skip_micro else micro_benchmarks()
+
+    print(f"\n2. Load test ({args.requests} requests per scenario, concurrency {args.concurrency})")
+    print("-" * 70)
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+
+    if mongomock is not None:
+        print("   mongo: mongomock")
+        load = asyncio.run(load_test(mongomock.MongoClient()["benchmark_airport_llm"], args))
+    else:
+        from pymongo import AsyncMongoClient
+        from authentication.mongo_connection import MONGODB_URL
+
+        async def against_mongod():
+            client = AsyncMongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
+            name = f"benchmark_airport_llm_{uuid.uuid4().hex[:8]}"
+            try:
+                return await load_test(client[name], args)
+            finally:
+                await client.drop_database(name)
+                await client.close()
+
+        print(f"   mongo: mongod at {MONGODB_URL}")
+        load = asyncio.run(against_mongod())
+    hash_pool.shutdown()
+
+    current = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "micro": micro,
+        "load": load
+    }
+
+    print("\n3. Baseline")
+    print("-" * 70)
+    regressions: List[str] = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"   compared with {args.baseline} ({baseline.get('created')}), tolerance {args.tolerance:.0%}")
+        regressions = compare(current, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"   ⚠️  {regression}")
+        if not regressions:
+            print("   no regressions")
+    else:
+        print(f"   no baseline at {args.baseline}; run with --save to record one")
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"   saved baseline to {args.baseline}")
+
+    assert not regressions, f"{len(regressions)} regression(s) against the baseline"
+    for scenario, result in load.items():
+        assert result["errors"] == 0, f"{scenario}: {result['status_codes']}"
+
+    print("\n" + "=" * 70)
+    print("✅ Benchmarks complete!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        run_benchmarks()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
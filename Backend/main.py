@@ -1,4 +1,6 @@
 # main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -11,6 +13,50 @@ from authentication.login_api import app as login_router
 from authentication.signup_api import app as signup_router
 from routes.route_recommendations import app as route_router
 from Chatbot.routes import app as chat_router
+from routes.route_graph import get_route_graph
+from routes.json_responses import JSONBytesResponse, dumps
+from Chatbot.chatbot import alert_matcher, amadeus, get_city_matcher, price_history, travel_assistant
+from authentication.password_utils import hash_pool
+from authentication.mongo_connection import close_async_client
+from authentication.repositories import ensure_indexes
+from authentication.jwt_protected import revoked_sessions
+
+
+async def bootstrap_indexes():
+    """Create Mongo indexes without holding up startup when the database is down"""
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        print(f"Mongo index bootstrap failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load shared data once per worker before serving requests"""
+    # Parse the flight/train datasets up front so the first request doesn't pay for it
+    # (the /available-routes catalogue is built from the graph on first use)
+    get_route_graph()
+    # Airport gazetteer + compiled city matcher used by chat and autocomplete
+    get_city_matcher()
+    # Write chat sessions to Mongo in the background
+    travel_assistant.conversations.start()
+    # Append fetched fares to the price-history store in batches
+    price_history.start()
+    # Load active price alerts and match fresh fares against them
+    alert_matcher.start()
+    index_bootstrap = asyncio.ensure_future(bootstrap_indexes())
+    # Keep the access-token revocation set in sync with other workers
+    revoked_sessions.start()
+    yield
+    index_bootstrap.cancel()
+    await revoked_sessions.stop()
+    await travel_assistant.conversations.stop()
+    await price_history.stop()
+    await alert_matcher.stop()
+    # Release the pooled keep-alive connections to Amadeus
+    await amadeus.aclose()
+    hash_pool.shutdown()
+    await close_async_client()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -18,7 +64,8 @@ app = FastAPI(
     description="Complete Travel Management System with AI Chatbot and Route Recommendations",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -42,76 +89,83 @@ app.include_router(route_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 
 
-@app.get("/")
-def home():
-    """Welcome endpoint with API documentation"""
-    return {
-        "message": "Welcome to TechTonic Travel API v2.0",
-        "description": "Your AI-powered travel companion for finding the best routes and recommendations",
-        "version": "2.0.0",
-        "api_sections": {
-            "authentication": {
-                "signup": "POST /api/auth/signup",
-                "login": "POST /api/auth/login"
-            },
-            "travel_routes": {
-                "get_recommendations": "POST /api/routes/recommend",
-                "available_routes": "GET /api/routes/available-routes"
-            },
-            "chatbot_basic": {
-                "create_session": "POST /api/chat/session/create",
-                "send_message": "POST /api/chat/message",
-                "get_history": "GET /api/chat/session/{session_id}/history",
-                "user_sessions": "GET /api/chat/user/{user_id}/sessions"
-            },
-            "chatbot_ai_powered": {
-                "ai_recommendation": "POST /api/chat/ai/recommendation?source=Delhi&destination=Nagpur",
-                "ai_chat": "POST /api/chat/ai/chat (with source and destination in message)"
-            },
-            "status": {
-                "health_check": "GET /api/chat/health"
-            }
+# Static bodies of / and /health, encoded once at import
+API_INDEX_BODY = dumps({
+    "message": "Welcome to TechTonic Travel API v2.0",
+    "description": "Your AI-powered travel companion for finding the best routes and recommendations",
+    "version": "2.0.0",
+    "api_sections": {
+        "authentication": {
+            "signup": "POST /api/auth/signup",
+            "login": "POST /api/auth/login"
+        },
+        "travel_routes": {
+            "get_recommendations": "POST /api/routes/recommend",
+            "batch_recommendations": "POST /api/routes/recommend/batch",
+            "available_routes": "GET /api/routes/available-routes"
+        },
+        "chatbot_basic": {
+            "create_session": "POST /api/chat/session/create",
+            "send_message": "POST /api/chat/message",
+            "get_history": "GET /api/chat/session/{session_id}/history",
+            "user_sessions": "GET /api/chat/user/{user_id}/sessions"
         },
-        "features": [
-            "🔐 JWT Authentication (signup & login)",
-            "🗺️ Route recommendations with multiple transport modes",
-            "💬 AI-powered chatbot using LangChain",
-            "✈️ Real flight data from Amadeus API",
-            "🚂 Train and bus information",
-            "📍 Support for Delhi, Mumbai, Bangalore, Hyderabad, Nagpur, Pune, Kolkata, Chennai",
-            "💾 MongoDB integration for chat history",
-            "🔄 Multi-turn conversations"
-        ],
-        "quick_start": {
-            "step1": "Authentication: POST /api/auth/signup with name, email, password",
-            "step2": "Login: POST /api/auth/login to get access token",
-            "step3": "Chat Session: POST /api/chat/session/create with user_id",
-            "step4": "Ask Question: POST /api/chat/ai/chat with session_id and message like 'How do I go from Delhi to Nagpur?'",
-            "alternative": "Direct recommendation: POST /api/chat/ai/recommendation?source=Delhi&destination=Nagpur"
+        "chatbot_ai_powered": {
+            "ai_recommendation": "POST /api/chat/ai/recommendation?source=Delhi&destination=Nagpur",
+            "ai_chat": "POST /api/chat/ai/chat (with source and destination in message)"
         },
-        "documentation": {
-            "swagger_ui": "/docs",
-            "redoc": "/redoc",
-            "openapi": "/openapi.json"
+        "status": {
+            "health_check": "GET /api/chat/health"
         }
+    },
+    "features": [
+        "🔐 JWT Authentication (signup & login)",
+        "🗺️ Route recommendations with multiple transport modes",
+        "💬 AI-powered chatbot using LangChain",
+        "✈️ Real flight data from Amadeus API",
+        "🚂 Train and bus information",
+        "📍 Support for Delhi, Mumbai, Bangalore, Hyderabad, Nagpur, Pune, Kolkata, Chennai",
+        "💾 MongoDB integration for chat history",
+        "🔄 Multi-turn conversations"
+    ],
+    "quick_start": {
+        "step1": "Authentication: POST /api/auth/signup with name, email, password",
+        "step2": "Login: POST /api/auth/login to get access token",
+        "step3": "Chat Session: POST /api/chat/session/create with user_id",
+        "step4": "Ask Question: POST /api/chat/ai/chat with session_id and message like 'How do I go from Delhi to Nagpur?'",
+        "alternative": "Direct recommendation: POST /api/chat/ai/recommendation?source=Delhi&destination=Nagpur"
+    },
+    "documentation": {
+        "swagger_ui": "/docs",
+        "redoc": "/redoc",
+        "openapi": "/openapi.json"
     }
+})
+
+HEALTH_BODY = dumps({
+    "status": "operational",
+    "service": "TechTonic Travel API",
+    "components": {
+        "authentication": "✅ Active",
+        "route_recommendations": "✅ Active",
+        "chatbot_basic": "✅ Active",
+        "chatbot_ai": "✅ Active (LangChain + Amadeus)",
+        "database": "✅ MongoDB Connected"
+    },
+    "version": "2.0.0"
+})
+
+
+@app.get("/")
+def home():
+    """Welcome endpoint with API documentation"""
+    return JSONBytesResponse(API_INDEX_BODY)
 
 
 @app.get("/health")
 def health_check():
     """System health check"""
-    return {
-        "status": "operational",
-        "service": "TechTonic Travel API",
-        "components": {
-            "authentication": "✅ Active",
-            "route_recommendations": "✅ Active",
-            "chatbot_basic": "✅ Active",
-            "chatbot_ai": "✅ Active (LangChain + Amadeus)",
-            "database": "✅ MongoDB Connected"
-        },
-        "version": "2.0.0"
-    }
+    return JSONBytesResponse(HEALTH_BODY)
 
 
 if __name__ == "__main__":
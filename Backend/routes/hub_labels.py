@@ -0,0 +1,292 @@
+"""
+Hub-label distance oracle for the route graph.
+
+Labels are precomputed offline with pruned landmark labelling (PLL): every
+city gets an "out" label (hubs it can reach, with costs) and an "in" label
+(hubs that reach it). The cheapest s -> t cost is the best common hub of
+out(s) and in(t), found with one sorted-array intersection, so popular
+point-to-point queries need no graph search at all. Each label entry also
+stores the next/previous edge towards its hub, which is enough to unroll the
+full path leg by leg.
+
+Labels are written as ``.npy`` files under ``dataset/hub_labels/`` and
+loaded with ``mmap_mode="r"`` so every worker shares the same pages. A
+manifest records the CSV mtimes and a graph fingerprint; stale or missing
+labels are ignored and queries fall back to A*.
+
+Rebuild / inspect:
+    python -m routes.hub_labels build [--metric time --metric price ...]
+    python -m routes.hub_labels status
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from routes.route_graph import (
+    DATASET_DIR,
+    RouteGraph,
+    dataset_sources,
+    get_route_graph,
+    load_route_graph,
+    sources_changed,
+)
+
+HUB_LABEL_DIR = DATASET_DIR / "hub_labels"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+INF = math.inf
+
+
+def staleness_reason(manifest: Optional[Dict], graph: RouteGraph, dataset_dir: Path = DATASET_DIR) -> Optional[str]:
+    """Why a built index no longer matches the datasets, or None if it is current"""
+    if manifest is None:
+        return "not built"
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return "format version changed"
+    changed = sources_changed(manifest.get("sources", {}), dataset_dir)
+    if changed:
+        return f"{changed} changed since build"
+    if manifest.get("graph_fingerprint") != graph.fingerprint():
+        return "route graph changed since build"
+    return None
+
+
+def _pruned_labelling(
+    graph: RouteGraph,
+    weights: List[float],
+    order: List[int],
+) -> Tuple[List[List[Tuple[int, float, int]]], List[List[Tuple[int, float, int]]]]:
+    """
+    Pruned landmark labelling on a directed weighted graph.
+
+    Returns (out_labels, in_labels); entries are (hub rank, cost, edge) and are
+    appended in rank order, so each label is sorted by hub rank.
+    """
+    n = graph.num_cities
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+    sources = graph.edge_sources()
+    rev_edges = np.argsort(graph.targets, kind="stable")
+    rev_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph.targets, minlength=n), out=rev_offsets[1:])
+    rev_offsets = rev_offsets.tolist()
+    rev_sources = sources[rev_edges].tolist()
+    rev_edges = rev_edges.tolist()
+
+    out_labels: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+    in_labels: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+    hub_cost = [INF] * n  # by hub rank, for the current root
+
+    for rank, root in enumerate(order):
+        # Forward search fills in-labels (root reaches u); backward fills out-labels
+        for own, fill, forward in ((out_labels[root], in_labels, True), (in_labels[root], out_labels, False)):
+            for hub, cost, _ in own:
+                hub_cost[hub] = cost
+            dist = {root: 0.0}
+            via = {root: -1}
+            heap = [(0.0, root)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                # Prune if an earlier hub already covers root <-> u at this cost
+                if any(hub_cost[hub] + cost <= d for hub, cost, _ in fill[u]):
+                    continue
+                fill[u].append((rank, d, via[u]))
+                if forward:
+                    for e in range(offsets[u], offsets[u + 1]):
+                        v = targets[e]
+                        nd = d + weights[e]
+                        if nd < dist.get(v, INF):
+                            dist[v] = nd
+                            via[v] = e
+                            heapq.heappush(heap, (nd, v))
+                else:
+                    for i in range(rev_offsets[u], rev_offsets[u + 1]):
+                        e = rev_edges[i]
+                        v = rev_sources[i]
+                        nd = d + weights[e]
+                        if nd < dist.get(v, INF):
+                            dist[v] = nd
+                            via[v] = e
+                            heapq.heappush(heap, (nd, v))
+            for hub, _, _ in own:
+                hub_cost[hub] = INF
+
+    return out_labels, in_labels
+
+
+def _flatten(labels: List[List[Tuple[int, float, int]]]) -> Dict[str, np.ndarray]:
+    sizes = np.fromiter((len(label) for label in labels), dtype=np.int64, count=len(labels))
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    entries = [entry for label in labels for entry in label]
+    return {
+        "offsets": offsets,
+        "hubs": np.fromiter((e[0] for e in entries), dtype=np.int32, count=len(entries)),
+        "cost": np.fromiter((e[1] for e in entries), dtype=np.float64, count=len(entries)),
+        "edge": np.fromiter((e[2] for e in entries), dtype=np.int32, count=len(entries)),
+    }
+
+
+def build_hub_labels(
+    metrics: Optional[List[str]] = None,
+    directory: Path = HUB_LABEL_DIR,
+    dataset_dir: Path = DATASET_DIR,
+) -> Dict:
+    """Build labels for ``metrics`` from the CSV datasets and write them to ``directory``"""
+    # Imported here to avoid a cycle: the itinerary engine consults these labels
+    from routes.itinerary_search import METRICS, ItinerarySearch
+
+    metrics = list(metrics or METRICS)
+    graph = load_route_graph(dataset_dir)
+    search = ItinerarySearch(graph)
+
+    # Hubs in decreasing degree order: on this network it gives the smallest labels
+    degree = np.diff(graph.offsets) + np.bincount(graph.targets, minlength=graph.num_cities)
+    order = np.argsort(-degree, kind="stable")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Drop the manifest first so an interrupted build never passes for a current one
+    (directory / MANIFEST_FILE).unlink(missing_ok=True)
+    np.save(directory / "order.npy", order.astype(np.int32))
+
+    stats = {}
+    for metric in metrics:
+        started = time.perf_counter()
+        out_labels, in_labels = _pruned_labelling(graph, search.edge_weights(metric), order.tolist())
+        for side, labels in (("out", out_labels), ("in", in_labels)):
+            for name, array in _flatten(labels).items():
+                np.save(directory / f"{metric}.{side}_{name}.npy", array)
+        stats[metric] = {
+            "build_seconds": round(time.perf_counter() - started, 1),
+            "avg_out_label": round(sum(map(len, out_labels)) / graph.num_cities, 1),
+            "avg_in_label": round(sum(map(len, in_labels)) / graph.num_cities, 1),
+        }
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "metrics": metrics,
+        "sources": dataset_sources(dataset_dir),
+        "graph_fingerprint": graph.fingerprint(),
+        "num_cities": graph.num_cities,
+        "num_edges": graph.num_edges,
+        "built_at": time.time(),
+        "stats": stats,
+    }
+    tmp_path = directory / (MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, directory / MANIFEST_FILE)
+    return manifest
+
+
+def read_manifest(directory: Path = HUB_LABEL_DIR) -> Optional[Dict]:
+    path = Path(directory) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class HubLabels:
+    """Memory-mapped hub labels for one route graph"""
+
+    def __init__(self, graph: RouteGraph, directory: Path, metrics: List[str]):
+        self.graph = graph
+        self.metrics = set(metrics)
+        self._sources = graph.edge_sources()
+        self._order = np.load(Path(directory) / "order.npy", mmap_mode="r")
+        self._labels: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+        for metric in metrics:
+            for side in ("out", "in"):
+                self._labels[(metric, side)] = {
+                    name: np.load(Path(directory) / f"{metric}.{side}_{name}.npy", mmap_mode="r")
+                    for name in ("offsets", "hubs", "cost", "edge")
+                }
+
+    def _label(self, metric: str, side: str, city: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        arrays = self._labels[(metric, side)]
+        start, end = int(arrays["offsets"][city]), int(arrays["offsets"][city + 1])
+        return arrays["hubs"][start:end], arrays["cost"][start:end], arrays["edge"][start:end]
+
+    def _entry(self, metric: str, side: str, city: int, hub: int) -> int:
+        """Edge stored in ``city``'s label for ``hub`` (the label must contain it)"""
+        hubs, _, edges = self._label(metric, side, city)
+        return int(edges[np.searchsorted(hubs, hub)])
+
+    def distance(self, source: int, target: int, metric: str) -> Tuple[float, int]:
+        """(cheapest cost, hub rank) from source to target; cost is inf if unreachable"""
+        out_hubs, out_cost, _ = self._label(metric, "out", source)
+        in_hubs, in_cost, _ = self._label(metric, "in", target)
+        common, out_idx, in_idx = np.intersect1d(out_hubs, in_hubs, assume_unique=True, return_indices=True)
+        if not len(common):
+            return INF, -1
+        totals = out_cost[out_idx] + in_cost[in_idx]
+        best = int(np.argmin(totals))
+        return float(totals[best]), int(common[best])
+
+    def shortest_path(self, source: int, target: int, metric: str) -> Optional[Tuple[float, List[int]]]:
+        """(cost, edge indices) of a cheapest path, unrolled from label entries"""
+        cost, hub = self.distance(source, target, metric)
+        if hub < 0:
+            return None
+        hub_city = int(self._order[hub])
+        targets = self.graph.targets
+
+        edges = []
+        node = source
+        while node != hub_city:
+            edge = self._entry(metric, "out", node, hub)
+            edges.append(edge)
+            node = int(targets[edge])
+
+        tail = []
+        node = target
+        while node != hub_city:
+            edge = self._entry(metric, "in", node, hub)
+            tail.append(edge)
+            node = int(self._sources[edge])
+        edges.extend(reversed(tail))
+        return cost, edges
+
+
+def load_hub_labels(graph: RouteGraph, directory: Path = HUB_LABEL_DIR) -> Optional[HubLabels]:
+    """Open the label files if they exist and match ``graph``; None otherwise"""
+    manifest = read_manifest(directory)
+    reason = staleness_reason(manifest, graph)
+    if reason is not None:
+        if manifest is not None:
+            print(f"Hub labels ignored ({reason}). Rebuild with: python -m routes.hub_labels build")
+        return None
+    return HubLabels(graph, directory, manifest["metrics"])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or inspect the route graph hub-label index")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--metric", action="append", dest="metrics", help="Metric to build (repeatable, default: all)")
+    parser.add_argument("--output", type=Path, default=HUB_LABEL_DIR, help="Directory for the label files")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        manifest = build_hub_labels(args.metrics, args.output)
+        print(json.dumps(manifest["stats"], indent=2))
+        print(f"Hub labels written to {args.output}")
+    else:
+        reason = staleness_reason(read_manifest(args.output), get_route_graph())
+        print("Hub labels are up to date" if reason is None else f"Hub labels need a rebuild: {reason}")
+
+
+if __name__ == "__main__":
+    main()
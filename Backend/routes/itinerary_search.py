@@ -0,0 +1,452 @@
+"""
+Multi-leg, multimodal itinerary search over the route graph.
+
+Queries run A* on the CSR arrays of ``RouteGraph`` with a heap-based
+Dijkstra core. The dataset has no city coordinates, so instead of a
+great-circle heuristic we use ALT landmarks: shortest-path distances to and
+from a handful of landmark cities give admissible (and consistent) lower
+bounds through the triangle inequality. Landmark tables are built lazily,
+once per metric, and the per-query heuristic is a single NumPy reduction.
+
+Unconstrained point-to-point queries are served from the precomputed hub
+labels (see ``routes.hub_labels``) when they have been built and are current.
+
+K-best alternatives use an Eppstein-style sidetrack enumeration on top of a
+vectorised shortest-path tree, then get filtered to the Pareto front over
+travel time, estimated fare and number of transfers.
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from routes.hub_labels import HubLabels, load_hub_labels
+from routes.route_graph import MODES, MODE_IDS, RouteGraph, format_duration, get_route_graph
+
+# Metrics a search can optimise for
+METRICS = ("time", "distance", "price")
+
+# Connection buffer added per transfer when optimising for time (hours)
+TRANSFER_BUFFER_HR = 1.0
+
+NUM_LANDMARKS = 16
+
+# Cap on K-best enumeration work (candidate paths popped per requested result)
+MAX_EXPANSIONS_PER_PATH = 200
+
+INF = math.inf
+
+
+def _dijkstra_all(offsets: List[int], targets: List[int], weights: List[float], source: int) -> List[float]:
+    """One-to-all shortest path distances over CSR lists"""
+    dist = [INF] * (len(offsets) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+class ItinerarySearch:
+    """A* itinerary engine bound to one RouteGraph"""
+
+    def __init__(
+        self,
+        graph: RouteGraph,
+        num_landmarks: int = NUM_LANDMARKS,
+        hub_labels: Optional[HubLabels] = None,
+    ):
+        self.graph = graph
+        self.num_landmarks = min(num_landmarks, graph.num_cities)
+        # Precomputed oracle for unconstrained point-to-point queries, if built
+        self.hub_labels = hub_labels
+
+        # Plain Python lists: element access in the search loop is much faster than on ndarrays
+        self._offsets = graph.offsets.tolist()
+        self._targets = graph.targets.tolist()
+        self._sources = graph.edge_sources().tolist()
+        self._modes = graph.modes.tolist()
+
+        # Reverse CSR (incoming edges) for backward landmark searches
+        order = np.argsort(graph.targets, kind="stable")
+        counts = np.bincount(graph.targets, minlength=graph.num_cities)
+        rev_offsets = np.zeros(graph.num_cities + 1, dtype=np.int64)
+        np.cumsum(counts, out=rev_offsets[1:])
+        self._rev_edges = order.tolist()
+        self._rev_offsets = rev_offsets.tolist()
+        self._rev_sources = [self._sources[e] for e in self._rev_edges]
+
+        self._weights: Dict[str, List[float]] = {}
+        self._landmarks: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._weight_arrays: Dict[str, np.ndarray] = {}
+
+        # Cities with outgoing edges and where their CSR rows start, for row-wise reductions
+        self._source_array = graph.edge_sources()
+        self._nonempty_rows = np.flatnonzero(np.diff(graph.offsets) > 0)
+        self._row_starts = graph.offsets[self._nonempty_rows]
+
+    def edge_weights(self, metric: str) -> List[float]:
+        """Per-edge cost list for ``metric`` (cached)"""
+        if metric not in self._weights:
+            graph = self.graph
+            if metric == "time":
+                weights = graph.time_hr.astype(np.float64) + TRANSFER_BUFFER_HR
+            elif metric == "distance":
+                weights = graph.distance_km.astype(np.float64)
+            elif metric == "price":
+                weights = graph.price.astype(np.float64)
+            else:
+                raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+            self._weight_arrays[metric] = weights
+            self._weights[metric] = weights.tolist()
+        return self._weights[metric]
+
+    def landmark_tables(self, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(from_landmark, to_landmark) distance matrices of shape (L, N), built on first use"""
+        if metric not in self._landmarks:
+            weights = self.edge_weights(metric)
+            rev_weights = [weights[e] for e in self._rev_edges]
+
+            # Farthest-point selection, starting from the best connected city
+            first = int(np.argmax(np.diff(self.graph.offsets)))
+            landmarks = [first]
+            forward, backward = [], []
+            closest = np.full(self.graph.num_cities, INF)
+            while True:
+                lm = landmarks[-1]
+                fw = np.array(_dijkstra_all(self._offsets, self._targets, weights, lm))
+                bw = np.array(_dijkstra_all(self._rev_offsets, self._rev_sources, rev_weights, lm))
+                forward.append(fw)
+                backward.append(bw)
+                if len(landmarks) == self.num_landmarks:
+                    break
+                closest = np.minimum(closest, fw)
+                candidates = np.where(np.isinf(closest), -1.0, closest)
+                candidates[landmarks] = -1.0
+                landmarks.append(int(np.argmax(candidates)))
+
+            self._landmarks[metric] = (np.vstack(forward), np.vstack(backward))
+        return self._landmarks[metric]
+
+    def heuristic(self, metric: str, target: int) -> List[float]:
+        """ALT lower bound on the cost from every city to ``target``"""
+        forward, backward = self.landmark_tables(metric)
+        with np.errstate(invalid="ignore"):
+            # d(v, t) >= d(L, t) - d(L, v)  and  d(v, t) >= d(v, L) - d(t, L)
+            via_from = forward[:, target][:, None] - forward
+            via_to = backward - backward[:, target][:, None]
+        via_from[np.isinf(forward)] = 0.0
+        via_to[np.isinf(backward[:, target])] = 0.0
+        bound = np.maximum(via_from, via_to).max(axis=0)
+        return np.maximum(bound, 0.0).tolist()
+
+    def search(
+        self,
+        source: int,
+        target: int,
+        metric: str = "time",
+        max_transfers: Optional[int] = None,
+        modes: Optional[Iterable[str]] = None,
+    ) -> Optional[Tuple[float, List[int]]]:
+        """
+        Cheapest path from ``source`` to ``target``.
+
+        Returns (cost, edge indices) or None if the target is unreachable under
+        the given transfer/mode constraints. Unconstrained queries are answered
+        from the hub labels when they are available for ``metric``.
+        """
+        labels = self.hub_labels
+        if labels is not None and max_transfers is None and modes is None and metric in labels.metrics:
+            return labels.shortest_path(source, target, metric)
+
+        weights = self.edge_weights(metric)
+        h = self.heuristic(metric, target)
+        if h[source] == INF:
+            return None
+        return self._astar(
+            source, target, weights, h,
+            allowed=None if modes is None else {MODE_IDS[m] for m in modes},
+            max_legs=None if max_transfers is None else max_transfers + 1,
+        )
+
+    def k_shortest(
+        self,
+        source: int,
+        target: int,
+        k: int,
+        metric: str = "time",
+        max_transfers: Optional[int] = None,
+        modes: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[float, List[int]]]:
+        """
+        Up to ``k`` loopless paths in increasing cost order.
+
+        Eppstein-style enumeration: a shortest-path tree towards ``target`` is
+        built once, and every other path is the tree path plus a sequence of
+        "sidetrack" edges, each costing ``w(e) + h(head) - h(tail)`` extra. The
+        tree, the per-city sorted sidetrack lists and the candidate heap are
+        shared by all K iterations, so each further path costs a few heap
+        operations. With ``max_transfers`` the states are (city, legs left).
+        Paths that revisit a city are skipped.
+        """
+        weights = self.edge_weights(metric)
+        allowed = None if modes is None else {MODE_IDS[m] for m in modes}
+        max_legs = None if max_transfers is None else max_transfers + 1
+        costs, trees = self._cost_to_target(target, metric, allowed, max_legs)
+        top = len(costs) - 1
+        if costs[top][source] == INF:
+            return []
+
+        targets, sources, offsets, edge_modes = self._targets, self._sources, self._offsets, self._modes
+        layered = max_legs is not None
+        merged: Dict[Tuple[int, int], List[Tuple[float, int, int]]] = {}
+
+        def sidetracks(node: int, legs: int) -> List[Tuple[float, int, int]]:
+            """Sorted (extra cost, edge, legs) for every sidetrack on the tree path from (node, legs)"""
+            start, chain = (node, legs), []
+            while (node, legs) not in merged:
+                if node == target:
+                    merged[(node, legs)] = []
+                    break
+                chain.append((node, legs))
+                node = targets[trees[legs][node]]
+                legs = legs - 1 if layered else legs
+            for node, legs in reversed(chain):
+                tree_edge = trees[legs][node]
+                next_legs = legs - 1 if layered else legs
+                base, next_costs = costs[legs][node], costs[next_legs]
+                own = []
+                for e in range(offsets[node], offsets[node + 1]):
+                    if e == tree_edge or (allowed is not None and edge_modes[e] not in allowed):
+                        continue
+                    head_cost = next_costs[targets[e]]
+                    if head_cost != INF:
+                        own.append((weights[e] + head_cost - base, e, legs))
+                own.sort()
+                merged[(node, legs)] = list(heapq.merge(own, merged[(targets[tree_edge], next_legs)]))
+            return merged[start]
+
+        def expand(steps) -> List[int]:
+            """Edge list for a path given as a linked list of sidetracks"""
+            sequence = []
+            while steps is not None:
+                steps, e, legs = steps
+                sequence.append((e, legs))
+            edges, node, legs = [], source, top
+            for e, sidetrack_legs in reversed(sequence):
+                while node != sources[e] or legs != sidetrack_legs:
+                    edges.append(trees[legs][node])
+                    node = targets[edges[-1]]
+                    legs = legs - 1 if layered else legs
+                edges.append(e)
+                node = targets[e]
+                legs = legs - 1 if layered else legs
+            while node != target:
+                edges.append(trees[legs][node])
+                node = targets[edges[-1]]
+                legs = legs - 1 if layered else legs
+            return edges
+
+        found: List[Tuple[float, List[int]]] = []
+        # (cost, tie-break, sidetrack list, index in it, parent path)
+        heap: List[Tuple[float, int, list, int, Optional[tuple]]] = []
+        counter = 0
+        cost, steps = costs[top][source], None
+        expansions = 0
+        while True:
+            edges = expand(steps)
+            nodes = [source] + [targets[e] for e in edges]
+            if len(set(nodes)) == len(nodes):
+                found.append((cost, edges))
+                if len(found) == k:
+                    break
+
+            if steps is None:
+                options = sidetracks(source, top)
+            else:
+                options = sidetracks(targets[steps[1]], steps[2] - 1 if layered else steps[2])
+            if options:
+                counter += 1
+                heapq.heappush(heap, (cost + options[0][0], counter, options, 0, steps))
+
+            expansions += 1
+            if not heap or expansions > MAX_EXPANSIONS_PER_PATH * k:
+                break
+            cost, _, options, index, parent = heapq.heappop(heap)
+            if index + 1 < len(options):
+                counter += 1
+                heapq.heappush(heap, (cost - options[index][0] + options[index + 1][0], counter, options, index + 1, parent))
+            _, e, legs = options[index]
+            steps = (parent, e, legs)
+        return found
+
+    def _cost_to_target(
+        self,
+        target: int,
+        metric: str,
+        allowed: Optional[set],
+        max_legs: Optional[int],
+    ) -> Tuple[List[List[float]], List[List[int]]]:
+        """
+        Cost from every city to ``target`` and the first edge of a cheapest path
+        (-1 if none), by vectorised Bellman-Ford over the CSR arrays.
+
+        With ``max_legs`` the result has one layer per leg budget: ``costs[r]``
+        allows at most ``r`` more legs. Otherwise it is a single converged layer.
+        """
+        graph = self.graph
+        self.edge_weights(metric)
+        weights = self._weight_arrays[metric]
+        if allowed is not None:
+            weights = np.where(np.isin(graph.modes, list(allowed)), weights, INF)
+        heads, tails = graph.targets, self._source_array
+        rows, starts = self._nonempty_rows, self._row_starts
+
+        def relax(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            via = weights + cost[heads]
+            best = np.full(graph.num_cities, INF)
+            if len(starts):
+                best[rows] = np.minimum.reduceat(via, starts)
+            best[target] = 0.0
+            # First edge per city achieving its best cost
+            hits = np.flatnonzero((via == best[tails]) & np.isfinite(via))
+            cities, first = np.unique(tails[hits], return_index=True)
+            tree = np.full(graph.num_cities, -1, dtype=np.int64)
+            tree[cities] = hits[first]
+            tree[target] = -1
+            return best, tree
+
+        cost = np.full(graph.num_cities, INF)
+        cost[target] = 0.0
+        costs, trees = [cost], [np.full(graph.num_cities, -1, dtype=np.int64)]
+        if max_legs is None:
+            while True:
+                best, tree = relax(cost)
+                if np.array_equal(best, cost):
+                    return [best.tolist()], [tree.tolist()]
+                cost = best
+        for _ in range(max_legs):
+            cost, tree = relax(cost)
+            costs.append(cost)
+            trees.append(tree)
+        return [c.tolist() for c in costs], [t.tolist() for t in trees]
+
+    def _astar(
+        self,
+        source: int,
+        target: int,
+        weights: List[float],
+        h: List[float],
+        allowed: Optional[set] = None,
+        max_legs: Optional[int] = None,
+    ) -> Optional[Tuple[float, List[int]]]:
+        offsets, targets, edge_modes = self._offsets, self._targets, self._modes
+        # Track the number of legs per label only when it is constrained
+        layers = 1 if max_legs is None else max_legs + 1
+
+        best: Dict[int, List[float]] = {source: [0.0] + [INF] * (layers - 1)}
+        parent: Dict[Tuple[int, int], Tuple[int, int, int]] = {}
+        heap = [(h[source], 0.0, source, 0)]
+
+        while heap:
+            _, g, u, legs = heapq.heappop(heap)
+            if u == target:
+                return g, self._unwind(parent, u, legs)
+            if g > best[u][legs]:
+                continue
+            next_legs = 0 if max_legs is None else legs + 1
+            if max_legs is not None and next_legs > max_legs:
+                continue
+            for e in range(offsets[u], offsets[u + 1]):
+                if allowed is not None and edge_modes[e] not in allowed:
+                    continue
+                v = targets[e]
+                hv = h[v]
+                if hv == INF:
+                    continue
+                ng = g + weights[e]
+                row = best.get(v)
+                if row is None:
+                    row = best[v] = [INF] * layers
+                # Dominated if reached at least as cheaply with no more legs
+                if (row[0] if layers == 1 else min(row[:next_legs + 1])) <= ng:
+                    continue
+                row[next_legs] = ng
+                parent[(v, next_legs)] = (u, legs, e)
+                heapq.heappush(heap, (ng + hv, ng, v, next_legs))
+        return None
+
+    @staticmethod
+    def _unwind(parent: Dict, node: int, legs: int) -> List[int]:
+        edges = []
+        while (node, legs) in parent:
+            node, legs, edge = parent[(node, legs)]
+            edges.append(edge)
+        edges.reverse()
+        return edges
+
+    def build_itinerary(self, edges: Sequence[int]) -> Dict:
+        """Response-ready itinerary dict for a path of edge indices"""
+        graph = self.graph
+        legs = []
+        total_hours = TRANSFER_BUFFER_HR * max(len(edges) - 1, 0)
+        for edge in edges:
+            hours = float(graph.time_hr[edge])
+            total_hours += hours
+            legs.append({
+                "mode": MODES[graph.modes[edge]],
+                "source": graph.city_names[self._sources[edge]],
+                "destination": graph.city_names[graph.targets[edge]],
+                "duration": format_duration(hours),
+                "distance": round(float(graph.distance_km[edge]), 1),
+                "price": round(float(graph.price[edge])),
+                "availability": int(graph.daily_services[edge])
+            })
+        return {
+            "legs": legs,
+            "total_duration": format_duration(total_hours),
+            "total_hours": round(total_hours, 2),
+            "total_distance": round(sum(leg["distance"] for leg in legs), 1),
+            "total_price": sum(leg["price"] for leg in legs),
+            "transfers": max(len(legs) - 1, 0)
+        }
+
+
+def pareto_front(itineraries: List[Dict]) -> List[Dict]:
+    """Itineraries not dominated on (total_hours, total_price, transfers), input order kept"""
+    def criteria(itinerary: Dict) -> Tuple[float, float, int]:
+        return itinerary["total_hours"], itinerary["total_price"], itinerary["transfers"]
+
+    front = []
+    for candidate in itineraries:
+        c = criteria(candidate)
+        dominated = any(
+            all(o <= x for o, x in zip(criteria(other), c)) and criteria(other) != c
+            for other in itineraries
+        )
+        if not dominated and all(criteria(kept) != c for kept in front):
+            front.append(candidate)
+    return front
+
+
+# Shared engine, rebuilt if the route graph is reloaded
+itinerary_search: Optional[ItinerarySearch] = None
+
+
+def get_itinerary_search() -> ItinerarySearch:
+    """Get or create the itinerary engine for the current route graph"""
+    global itinerary_search
+    graph = get_route_graph()
+    if itinerary_search is None or itinerary_search.graph is not graph:
+        itinerary_search = ItinerarySearch(graph, hub_labels=load_hub_labels(graph))
+    return itinerary_search
@@ -0,0 +1,94 @@
+"""
+Fast JSON responses for hot endpoints
+
+FastAPI's default path for a returned object:
+- a response model is validated again, dumped to a dict, and encoded by
+  JSONResponse (``json.dumps``);
+- plain dicts and lists are first walked by ``jsonable_encoder``.
+
+Our handlers build their results themselves, so that work is redundant.
+What this module offers:
+
+- ``dumps``: orjson encoding. It handles numpy values, and any type orjson
+  does not know (models, ObjectId, sets) is passed through
+  ``jsonable_encoder``.
+- ``JSONBytesResponse``: a response class encoding with ``dumps``. Bytes
+  are sent as they are, so a body built ahead of time costs nothing per
+  request.
+- ``TrustedJSONRoute``: a route class. A model returned by the endpoint is
+  serialised once by pydantic, straight to bytes, with no re-validation.
+  Dicts and lists go to ``dumps``. The declared ``response_model`` still
+  documents the endpoint in OpenAPI.
+"""
+
+import functools
+import inspect
+from typing import Any, Callable
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not serialise natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    return jsonable_encoder(value)
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes of ``content``"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class JSONBytesResponse(Response):
+    """JSON response encoded by orjson; a bytes body is sent as it is"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def render_result(result: Any) -> Any:
+    """Response for a trusted endpoint result; Responses pass through"""
+    if isinstance(result, Response):
+        return result
+    if isinstance(result, BaseModel):
+        return JSONBytesResponse(result.model_dump_json(by_alias=True).encode("utf-8"))
+    return JSONBytesResponse(dumps(result))
+
+
+def trusted(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap ``endpoint`` so its result is rendered by ``render_result`` (same signature)"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            return render_result(await endpoint(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        return render_result(endpoint(*args, **kwargs))
+    return wrapper
+
+
+class TrustedJSONRoute(APIRoute):
+    """APIRoute whose endpoint results are serialised once, without re-validation
+
+    Only for endpoints that build their results themselves. A
+    ``response_model`` is used for the docs but not enforced, and
+    ``response_model_include``/``exclude`` options are not applied. Headers
+    set on an injected ``Response`` are dropped, so such endpoints should
+    return a Response of their own.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, trusted(endpoint), **kwargs)
@@ -0,0 +1,151 @@
+"""
+Materialised route catalogue behind ``GET /routes/available-routes``
+
+Built once per graph, on the first request. There is one row per (source, destination) pair, in
+CSR order, i.e. grouped by source. A row holds the shortest distance over
+all modes and a bitmask of the modes serving the pair. Each row is
+serialised to JSON bytes up front, so a response is a ``b",".join`` of
+preselected rows. The unfiltered list is one prebuilt body.
+
+Filters use indexes built alongside:
+- source: a contiguous row range found by binary search on the sorted
+  source ids
+- mode: the sorted rows served by that mode
+- distance: rows sorted by distance, with the bounds found by binary search
+
+Every response carries an ETag derived from the graph fingerprint and the
+query. A client sending it back in ``If-None-Match`` gets a 304 before any
+row is touched.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from routes.route_graph import MODES, RouteGraph, get_route_graph
+
+
+class RouteCatalog:
+    """Pre-sorted, pre-serialised (source, destination) route list with filter indexes"""
+
+    def __init__(self, graph: RouteGraph):
+        self.graph = graph
+        self.version = graph.fingerprint()[:16]
+
+        pair_keys = graph.pair_keys()
+        starts = np.flatnonzero(np.diff(pair_keys, prepend=-1))
+        self.source_ids = graph.edge_sources()[starts]
+        self.distances = np.round(np.minimum.reduceat(graph.distance_km, starts).astype(np.float64), 1) \
+            if len(starts) else np.empty(0)
+        self.mode_bits = np.bitwise_or.reduceat(np.left_shift(1, graph.modes.astype(np.int64)), starts) \
+            if len(starts) else np.empty(0, dtype=np.int64)
+
+        self.mode_rows: Dict[str, np.ndarray] = {
+            mode: np.flatnonzero(self.mode_bits & (1 << mode_id)) for mode_id, mode in enumerate(MODES)
+        }
+        self.distance_order = np.argsort(self.distances, kind="stable")
+        self.sorted_distances = self.distances[self.distance_order]
+
+        names = [name.title() for name in graph.city_names]
+        targets = graph.targets[starts].tolist()
+        self.rows: List[bytes] = [
+            json.dumps({
+                "source": names[source],
+                "destination": names[target],
+                "distance_km": distance,
+                "modes": [mode for mode_id, mode in enumerate(MODES) if bits & (1 << mode_id)]
+            }, ensure_ascii=False).encode("utf-8")
+            for source, target, distance, bits in zip(
+                self.source_ids.tolist(), targets, self.distances.tolist(), self.mode_bits.tolist()
+            )
+        ]
+        self._full_body = self._body(len(self.rows), 0, self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def etag(self, **query) -> str:
+        """Strong ETag of the response to ``query`` (None values ignored)"""
+        canonical = "&".join(f"{key}={value}" for key, value in sorted(query.items()) if value is not None)
+        return '"' + hashlib.sha1(f"{self.version}?{canonical}".encode()).hexdigest()[:24] + '"'
+
+    def select(
+        self,
+        mode: Optional[str] = None,
+        source: Optional[str] = None,
+        min_distance: Optional[float] = None,
+        max_distance: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """Matching row numbers in catalogue order; None means every row
+
+        The first filter applied reads its index, and the ones after it mask
+        the (already few) remaining rows.
+        """
+        rows: Optional[np.ndarray] = None
+        if source is not None:
+            source_id = self.graph.city_id(source)
+            if source_id is None:
+                return np.empty(0, dtype=np.int64)
+            rows = np.arange(
+                np.searchsorted(self.source_ids, source_id, side="left"),
+                np.searchsorted(self.source_ids, source_id, side="right")
+            )
+        if mode is not None:
+            if rows is None:
+                rows = self.mode_rows[mode]
+            else:
+                rows = rows[(self.mode_bits[rows] & (1 << MODES.index(mode))) != 0]
+        if min_distance is not None or max_distance is not None:
+            low = -np.inf if min_distance is None else min_distance
+            high = np.inf if max_distance is None else max_distance
+            if rows is None:
+                rows = np.sort(self.distance_order[
+                    np.searchsorted(self.sorted_distances, low, side="left"):
+                    np.searchsorted(self.sorted_distances, high, side="right")
+                ])
+            else:
+                distances = self.distances[rows]
+                rows = rows[(distances >= low) & (distances <= high)]
+        return rows
+
+    def page(self, rows: Optional[np.ndarray], offset: int = 0, limit: Optional[int] = None) -> bytes:
+        """JSON body of rows ``[offset, offset + limit)`` of a selection"""
+        if rows is None and offset == 0 and limit is None:
+            return self._full_body
+        total = len(self.rows) if rows is None else len(rows)
+        end = total if limit is None else min(total, offset + limit)
+        if rows is None:
+            chosen = self.rows[offset:end]
+        else:
+            chosen = [self.rows[row] for row in rows[offset:end].tolist()]
+        return self._body(total, offset, chosen)
+
+    @staticmethod
+    def _body(total: int, offset: int, rows: List[bytes]) -> bytes:
+        header = f'{{"total_routes":{total},"offset":{offset},"count":{len(rows)},"routes":['.encode()
+        return header + b",".join(rows) + b"]}"
+
+
+_catalog: Optional[Tuple[RouteGraph, RouteCatalog]] = None
+_catalog_lock = threading.Lock()
+
+
+def get_route_catalog() -> RouteCatalog:
+    """Catalogue of the shared route graph, built on first use
+
+    Not built at startup: only ``/available-routes`` needs it, and workers
+    booting from the route snapshot shouldn't pay its ~0.2s up front.
+    Concurrent first requests (sync handlers run in threads) build it once.
+    """
+    global _catalog
+    graph = get_route_graph()
+    catalog = _catalog
+    if catalog is None or catalog[0] is not graph:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog[0] is not graph:
+                catalog = _catalog = (graph, RouteCatalog(graph))
+    return catalog[1]
@@ -0,0 +1,521 @@
+"""
+Route graph built from the flight and train datasets in ``dataset/``.
+
+Both CSVs are parsed once into array-backed CSR (compressed sparse row)
+storage: city names are interned to integer ids, the outgoing edges of city
+``u`` live in ``offsets[u]:offsets[u + 1]`` and every per-edge attribute is a
+flat NumPy column (float32 distance/time/price, small ints for mode and
+daily services). Neighbour lookups are O(degree) and memory grows with the
+number of edges only, not with per-route dict overhead.
+
+Parsing the CSVs takes a few hundred milliseconds, so the finished graph can
+also be written as a versioned columnar snapshot (one ``.npy`` file per
+column plus the city string table) under ``dataset/route_snapshot/``.
+Workers load it with ``mmap_mode="r"`` and share the page cache instead of
+each holding a parsed copy; the CSVs are only parsed when the snapshot is
+missing or older than the datasets.
+
+Rebuild / inspect:
+    python -m routes.route_graph snapshot
+    python -m routes.route_graph status
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Repository-level dataset folder (Backend/../dataset), overridable for deployments
+DATASET_DIR = Path(
+    os.getenv("ROUTE_DATASET_DIR", Path(__file__).resolve().parents[2] / "dataset")
+)
+FLIGHT_ROUTES_CSV = "india_flight_routes.csv"
+TRAIN_ROUTES_CSV = "india_train_routes.csv"
+
+SNAPSHOT_DIR = DATASET_DIR / "route_snapshot"
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COLUMNS = ("offsets", "targets", "modes", "distance_km", "time_hr", "price", "daily_services")
+
+# Transport modes, stored per edge as a uint8 index into this tuple
+MODES = ("plane", "train", "bus")
+MODE_IDS = {mode: idx for idx, mode in enumerate(MODES)}
+
+COMFORT_BY_MODE = {
+    "plane": "Standard",
+    "train": "Standard",
+    "bus": "Budget"
+}
+
+# Fare model (base fare, fare per km in INR) used when a dataset edge has no price
+FARE_MODEL = {
+    "plane": (1500.0, 1.5),
+    "train": (150.0, 1.0),
+    "bus": (100.0, 0.5)
+}
+
+# Hand-maintained routes for major cities. The CSV datasets only carry
+# anonymised cities and no bus services, so these are merged into the graph.
+CURATED_ROUTES = {
+    ("delhi", "nagpur"): {
+        "distance_km": 1365,
+        "modes": {
+            "plane": {
+                "duration": "2 hours",
+                "price": 3500,
+                "availability": 8,
+                "comfort_level": "Standard"
+            },
+            "train": {
+                "duration": "18 hours",
+                "price": 1500,
+                "availability": 6,
+                "comfort_level": "Standard"
+            },
+            "bus": {
+                "duration": "20 hours",
+                "price": 800,
+                "availability": 12,
+                "comfort_level": "Budget"
+            }
+        }
+    },
+    ("mumbai", "bangalore"): {
+        "distance_km": 981,
+        "modes": {
+            "plane": {
+                "duration": "1.5 hours",
+                "price": 3000,
+                "availability": 12,
+                "comfort_level": "Standard"
+            },
+            "train": {
+                "duration": "16 hours",
+                "price": 1200,
+                "availability": 5,
+                "comfort_level": "Standard"
+            },
+            "bus": {
+                "duration": "18 hours",
+                "price": 600,
+                "availability": 10,
+                "comfort_level": "Budget"
+            }
+        }
+    },
+    ("bangalore", "hyderabad"): {
+        "distance_km": 586,
+        "modes": {
+            "plane": {
+                "duration": "1 hour",
+                "price": 2500,
+                "availability": 6,
+                "comfort_level": "Standard"
+            },
+            "train": {
+                "duration": "12 hours",
+                "price": 800,
+                "availability": 4,
+                "comfort_level": "Standard"
+            },
+            "bus": {
+                "duration": "8 hours",
+                "price": 400,
+                "availability": 15,
+                "comfort_level": "Budget"
+            }
+        }
+    }
+}
+
+
+def normalize_location(location: str) -> str:
+    """Normalize location name for graph lookup"""
+    return location.lower().strip()
+
+
+def parse_duration_to_minutes(duration_str: str) -> int:
+    """Convert duration string (e.g. "2 hours 30 min") to minutes"""
+    parts = duration_str.split()
+    total_minutes = 0
+    i = 0
+    while i < len(parts):
+        try:
+            value = float(parts[i])
+            unit = parts[i + 1].lower()
+
+            if 'hour' in unit:
+                total_minutes += int(value * 60)
+            elif 'min' in unit:
+                total_minutes += int(value)
+
+            i += 2
+        except (ValueError, IndexError):
+            i += 1
+
+    return total_minutes
+
+
+def format_duration(hours: float) -> str:
+    """Format a duration in hours the way route responses expect (e.g. "2 hours 30 min")"""
+    total_minutes = int(round(hours * 60))
+    whole_hours, minutes = divmod(total_minutes, 60)
+    parts = []
+    if whole_hours:
+        parts.append(f"{whole_hours} hour{'s' if whole_hours != 1 else ''}")
+    if minutes or not parts:
+        parts.append(f"{minutes} min")
+    return " ".join(parts)
+
+
+def estimate_fare(distance_km, mode: str):
+    """Estimate a fare in INR from distance; works on scalars and NumPy arrays"""
+    base, per_km = FARE_MODEL[mode]
+    return base + per_km * distance_km
+
+
+class RouteGraph:
+    """Directed multimodal route graph in CSR layout"""
+
+    def __init__(
+        self,
+        city_names: List[str],
+        offsets: np.ndarray,
+        targets: np.ndarray,
+        modes: np.ndarray,
+        distance_km: np.ndarray,
+        time_hr: np.ndarray,
+        price: np.ndarray,
+        daily_services: np.ndarray,
+    ):
+        self.city_names = city_names
+        self.city_index = {normalize_location(name): idx for idx, name in enumerate(city_names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.modes = modes
+        self.distance_km = distance_km
+        self.time_hr = time_hr
+        self.price = price
+        self.daily_services = daily_services
+
+        # Built on first use by the vectorised lookups below
+        self._pair_keys: Optional[np.ndarray] = None
+        self._sorted_names: Optional[np.ndarray] = None
+        self._sorted_name_ids: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_edges(
+        cls,
+        city_names: List[str],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        modes: np.ndarray,
+        distance_km: np.ndarray,
+        time_hr: np.ndarray,
+        price: np.ndarray,
+        daily_services: np.ndarray,
+    ) -> "RouteGraph":
+        """Build CSR arrays from parallel edge columns (any order)"""
+        order = np.lexsort((modes, targets, sources))
+        sources = sources[order]
+        counts = np.bincount(sources, minlength=len(city_names))
+        offsets = np.zeros(len(city_names) + 1, dtype=np.int32)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            city_names=city_names,
+            offsets=offsets,
+            targets=targets[order].astype(np.int32, copy=False),
+            modes=modes[order].astype(np.uint8, copy=False),
+            distance_km=distance_km[order].astype(np.float32, copy=False),
+            time_hr=time_hr[order].astype(np.float32, copy=False),
+            price=price[order].astype(np.float32, copy=False),
+            daily_services=daily_services[order].astype(np.int16, copy=False),
+        )
+
+    @property
+    def num_cities(self) -> int:
+        return len(self.city_names)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def city_id(self, name: str) -> Optional[int]:
+        """Interned id for a city name, or None if the city is unknown"""
+        return self.city_index.get(normalize_location(name))
+
+    def out_edges(self, city: int) -> range:
+        """Edge indices leaving ``city``"""
+        return range(int(self.offsets[city]), int(self.offsets[city + 1]))
+
+    def edges_between(self, source: int, destination: int) -> np.ndarray:
+        """Edge indices from ``source`` to ``destination`` (one per mode), O(degree)"""
+        start, end = int(self.offsets[source]), int(self.offsets[source + 1])
+        return np.flatnonzero(self.targets[start:end] == destination) + start
+
+    def city_ids(self, names: Sequence[str]) -> np.ndarray:
+        """Vectorised city_id: interned ids for many names, -1 where unknown"""
+        if self._sorted_names is None:
+            index_names = np.asarray(list(self.city_index), dtype=np.str_)
+            order = np.argsort(index_names)
+            self._sorted_names = index_names[order]
+            self._sorted_name_ids = np.fromiter(self.city_index.values(), dtype=np.int64)[order]
+        queries = np.char.strip(np.char.lower(np.asarray(names, dtype=np.str_)))
+        if not len(self._sorted_names) or not len(queries):
+            return np.full(len(queries), -1, dtype=np.int64)
+        positions = np.searchsorted(self._sorted_names, queries)
+        positions = np.minimum(positions, len(self._sorted_names) - 1)
+        found = self._sorted_names[positions] == queries
+        return np.where(found, self._sorted_name_ids[positions], -1)
+
+    def pair_keys(self) -> np.ndarray:
+        """``source * num_cities + target`` of every edge; sorted, since CSR rows are"""
+        if self._pair_keys is None:
+            self._pair_keys = self.edge_sources().astype(np.int64) * self.num_cities + self.targets
+        return self._pair_keys
+
+    def edges_between_many(self, sources: np.ndarray, destinations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Half-open edge ranges ``[start, end)`` for many (source, destination) pairs at once
+
+        Pairs with an unknown city (id -1) get an empty range.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        destinations = np.asarray(destinations, dtype=np.int64)
+        query_keys = sources * self.num_cities + destinations
+        pair_keys = self.pair_keys()
+        starts = np.searchsorted(pair_keys, query_keys, side="left")
+        ends = np.searchsorted(pair_keys, query_keys, side="right")
+        unknown = (sources < 0) | (destinations < 0)
+        return starts, np.where(unknown, starts, ends)
+
+    def edge_sources(self) -> np.ndarray:
+        """Source city of every edge, expanded from the CSR offsets"""
+        return np.repeat(
+            np.arange(self.num_cities, dtype=np.int32), np.diff(self.offsets)
+        )
+
+    def mode_name(self, edge: int) -> str:
+        return MODES[self.modes[edge]]
+
+    def fingerprint(self) -> str:
+        """Content hash of the graph, used to detect stale derived indexes"""
+        digest = hashlib.sha1()
+        digest.update("\n".join(self.city_names).encode("utf-8"))
+        for column in SNAPSHOT_COLUMNS:
+            digest.update(np.ascontiguousarray(getattr(self, column)).tobytes())
+        return digest.hexdigest()
+
+
+def dataset_sources(dataset_dir: Path = DATASET_DIR) -> Dict[str, Dict[str, float]]:
+    """mtime/size of the CSVs a derived file was built from"""
+    sources = {}
+    for filename in (FLIGHT_ROUTES_CSV, TRAIN_ROUTES_CSV):
+        path = Path(dataset_dir) / filename
+        if path.exists():
+            stat = path.stat()
+            sources[filename] = {"mtime": stat.st_mtime, "size": stat.st_size}
+    return sources
+
+
+def sources_changed(recorded: Dict, dataset_dir: Path = DATASET_DIR) -> Optional[str]:
+    """Name of a dataset CSV that changed since ``recorded`` was taken, if any"""
+    current_sources = dataset_sources(dataset_dir)
+    for filename in set(current_sources) | set(recorded):
+        current, previous = current_sources.get(filename), recorded.get(filename)
+        if current is None or previous is None:
+            return filename
+        if current["mtime"] > previous["mtime"] or current["size"] != previous["size"]:
+            return filename
+    return None
+
+
+def curated_routes_digest(curated_routes: Optional[Dict] = None) -> str:
+    """Hash of the curated routes, which are merged into every snapshot"""
+    if curated_routes is None:
+        curated_routes = CURATED_ROUTES
+    payload = json.dumps(
+        [[list(key), value] for key, value in sorted(curated_routes.items())], sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _read_dataset(
+    path: Path, services_column: str, time_column: str
+) -> Iterable[Tuple[str, str, float, float, int]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield (
+                row["from_city"],
+                row["to_city"],
+                float(row["distance_km"]),
+                float(row[time_column]),
+                int(row[services_column]),
+            )
+
+
+def load_route_graph(
+    dataset_dir: Path = DATASET_DIR,
+    curated_routes: Optional[Dict] = None,
+) -> RouteGraph:
+    """Parse the flight and train CSVs (plus curated routes) into a RouteGraph"""
+    if curated_routes is None:
+        curated_routes = CURATED_ROUTES
+
+    names: Dict[str, str] = {}
+    sources: List[str] = []
+    targets: List[str] = []
+    modes: List[int] = []
+    distances: List[float] = []
+    times: List[float] = []
+    prices: List[float] = []
+    services: List[int] = []
+
+    def add_edge(src, dst, mode, distance, hours, price, per_day):
+        for name in (src, dst):
+            names.setdefault(normalize_location(name), name)
+        sources.append(normalize_location(src))
+        targets.append(normalize_location(dst))
+        modes.append(MODE_IDS[mode])
+        distances.append(distance)
+        times.append(hours)
+        prices.append(price)
+        services.append(per_day)
+
+    datasets = (
+        (FLIGHT_ROUTES_CSV, "plane", "flights_per_day", "flight_time_hr"),
+        (TRAIN_ROUTES_CSV, "train", "trains_per_day", "travel_time_hr"),
+    )
+    for filename, mode, services_column, time_column in datasets:
+        path = Path(dataset_dir) / filename
+        if not path.exists():
+            continue
+        for src, dst, distance, hours, per_day in _read_dataset(path, services_column, time_column):
+            add_edge(src, dst, mode, distance, hours, estimate_fare(distance, mode), per_day)
+
+    # Curated routes are served in both directions
+    for (src, dst), route in curated_routes.items():
+        for mode, mode_data in route["modes"].items():
+            for a, b in ((src, dst), (dst, src)):
+                add_edge(
+                    a.title(), b.title(), mode, route["distance_km"],
+                    parse_duration_to_minutes(mode_data["duration"]) / 60,
+                    mode_data["price"], mode_data["availability"],
+                )
+
+    # Intern in sorted order so CSR rows (and anything derived from them) are name-sorted
+    keys = sorted(names)
+    key_to_id = {key: idx for idx, key in enumerate(keys)}
+
+    return RouteGraph.from_edges(
+        city_names=[names[key] for key in keys],
+        sources=np.fromiter((key_to_id[k] for k in sources), dtype=np.int32, count=len(sources)),
+        targets=np.fromiter((key_to_id[k] for k in targets), dtype=np.int32, count=len(targets)),
+        modes=np.asarray(modes, dtype=np.uint8),
+        distance_km=np.asarray(distances, dtype=np.float32),
+        time_hr=np.asarray(times, dtype=np.float32),
+        price=np.asarray(prices, dtype=np.float32),
+        daily_services=np.asarray(services, dtype=np.int16),
+    )
+
+
+def write_snapshot(
+    graph: RouteGraph,
+    directory: Path = SNAPSHOT_DIR,
+    dataset_dir: Path = DATASET_DIR,
+) -> Dict:
+    """Write ``graph`` as a columnar snapshot; the manifest is written last"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Drop the manifest first so no worker maps a half-written snapshot
+    (directory / SNAPSHOT_MANIFEST).unlink(missing_ok=True)
+
+    np.save(directory / "cities.npy", np.asarray(graph.city_names, dtype=np.str_))
+    for column in SNAPSHOT_COLUMNS:
+        np.save(directory / f"{column}.npy", np.ascontiguousarray(getattr(graph, column)))
+
+    manifest = {
+        "format_version": SNAPSHOT_VERSION,
+        "sources": dataset_sources(dataset_dir),
+        "curated_routes": curated_routes_digest(),
+        "graph_fingerprint": graph.fingerprint(),
+        "num_cities": graph.num_cities,
+        "num_edges": graph.num_edges,
+    }
+    tmp_path = directory / (SNAPSHOT_MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, directory / SNAPSHOT_MANIFEST)
+    return manifest
+
+
+def read_snapshot_manifest(directory: Path = SNAPSHOT_DIR) -> Optional[Dict]:
+    path = Path(directory) / SNAPSHOT_MANIFEST
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def snapshot_staleness(manifest: Optional[Dict], dataset_dir: Path = DATASET_DIR) -> Optional[str]:
+    """Why a snapshot can't be used, or None if it matches the datasets"""
+    if manifest is None:
+        return "not built"
+    if manifest.get("format_version") != SNAPSHOT_VERSION:
+        return "format version changed"
+    changed = sources_changed(manifest.get("sources", {}), dataset_dir)
+    if changed:
+        return f"{changed} changed since snapshot"
+    if manifest.get("curated_routes") != curated_routes_digest():
+        return "curated routes changed since snapshot"
+    return None
+
+
+def load_snapshot(directory: Path = SNAPSHOT_DIR, dataset_dir: Path = DATASET_DIR) -> Optional[RouteGraph]:
+    """Memory-map a current snapshot, or None if it is missing or stale"""
+    manifest = read_snapshot_manifest(directory)
+    reason = snapshot_staleness(manifest, dataset_dir)
+    if reason is not None:
+        if manifest is not None:
+            print(f"Route snapshot ignored ({reason}). Rebuild with: python -m routes.route_graph snapshot")
+        return None
+    columns = {
+        column: np.load(Path(directory) / f"{column}.npy", mmap_mode="r")
+        for column in SNAPSHOT_COLUMNS
+    }
+    city_names = np.load(Path(directory) / "cities.npy").tolist()
+    return RouteGraph(city_names=city_names, **columns)
+
+
+# Loaded lazily (or at app startup) and shared by every request
+route_graph: Optional[RouteGraph] = None
+
+
+def get_route_graph() -> RouteGraph:
+    """Get or load the shared route graph, preferring the binary snapshot"""
+    global route_graph
+    if route_graph is None:
+        route_graph = load_snapshot() or load_route_graph()
+    return route_graph
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or inspect the route graph snapshot")
+    parser.add_argument("command", choices=["snapshot", "status"])
+    parser.add_argument("--output", type=Path, default=SNAPSHOT_DIR, help="Directory for the snapshot files")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        manifest = write_snapshot(load_route_graph(), args.output)
+        print(f"Snapshot of {manifest['num_cities']} cities / {manifest['num_edges']} edges written to {args.output}")
+    else:
+        reason = snapshot_staleness(read_snapshot_manifest(args.output))
+        print("Route snapshot is up to date" if reason is None else f"Route snapshot needs a rebuild: {reason}")
+
+
+if __name__ == "__main__":
+    main()
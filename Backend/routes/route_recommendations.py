@@ -1,100 +1,55 @@
-from fastapi import APIRouter, HTTPException
-from schemas.route import RouteRecommendationRequest, RouteRecommendationResponse, TransportOption
-from typing import Dict, List
-
-app = APIRouter(prefix="/routes", tags=["Routes"])
-
-# Sample route data (in production, this would come from a database or external API)
-ROUTE_DATABASE = {
-    ("delhi", "nagpur"): {
-        "distance_km": 1365,
-        "modes": {
-            "plane": {
-                "duration": "2 hours",
-                "price": 3500,
-                "availability": 8,
-                "comfort_level": "Standard"
-            },
-            "train": {
-                "duration": "18 hours",
-                "price": 1500,
-                "availability": 6,
-                "comfort_level": "Standard"
-            },
-            "bus": {
-                "duration": "20 hours",
-                "price": 800,
-                "availability": 12,
-                "comfort_level": "Budget"
-            }
-        }
-    },
-    ("mumbai", "bangalore"): {
-        "distance_km": 981,
-        "modes": {
-            "plane": {
-                "duration": "1.5 hours",
-                "price": 3000,
-                "availability": 12,
-                "comfort_level": "Standard"
-            },
-            "train": {
-                "duration": "16 hours",
-                "price": 1200,
-                "availability": 5,
-                "comfort_level": "Standard"
-            },
-            "bus": {
-                "duration": "18 hours",
-                "price": 600,
-                "availability": 10,
-                "comfort_level": "Budget"
-            }
-        }
-    },
-    ("bangalore", "hyderabad"): {
-        "distance_km": 586,
-        "modes": {
-            "plane": {
-                "duration": "1 hour",
-                "price": 2500,
-                "availability": 6,
-                "comfort_level": "Standard"
-            },
-            "train": {
-                "duration": "12 hours",
-                "price": 800,
-                "availability": 4,
-                "comfort_level": "Standard"
-            },
-            "bus": {
-                "duration": "8 hours",
-                "price": 400,
-                "availability": 15,
-                "comfort_level": "Budget"
-            }
-        }
-    }
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from schemas.route import Itinerary, RouteRecommendationRequest, RouteRecommendationResponse, TransportOption
+from routes.json_responses import TrustedJSONRoute
+from routes.route_catalog import get_route_catalog
+from routes.itinerary_search import METRICS, get_itinerary_search, pareto_front
+from routes.route_graph import (
+    COMFORT_BY_MODE,
+    MODES,
+    format_duration,
+    get_route_graph,
+    normalize_location,
+    parse_duration_to_minutes,
+)
+from typing import Dict, List, Optional
+import numpy as np
+
+# Handlers build their responses themselves: serialise them once, no re-validation
+app = APIRouter(prefix="/routes", tags=["Routes"], route_class=TrustedJSONRoute)
+
+# Upper bound on alternatives a k_best search may ask for
+MAX_ITINERARIES = 20
+
+# Upper bound on pairs in one /recommend/batch call
+MAX_BATCH_SIZE = 1000
+
+# Upper bound on the page size of /available-routes
+MAX_ROUTES_PAGE = 1000
+
+# (low, high) multipliers of the base price quoted as the estimated range
+PRICE_RANGE_FACTORS = {
+    "plane": (0.7, 1.4),
+    "train": (0.5, 1.6),
+    "bus": (0.6, 1.5)
 }
+DEFAULT_PRICE_RANGE_FACTORS = (0.8, 1.5)
 
+COMFORT_SCORES = {
+    "Premium": 3,
+    "Standard": 2,
+    "Budget": 1
+}
 
-def normalize_location(location: str) -> str:
-    """Normalize location name for database lookup"""
-    return location.lower().strip()
+# The same tables indexed by mode id, for the batch path
+PRICE_RANGE_BY_MODE_ID = np.array([PRICE_RANGE_FACTORS[mode] for mode in MODES])
+COMFORT_SCORE_BY_MODE_ID = np.array([COMFORT_SCORES[COMFORT_BY_MODE[mode]] for mode in MODES])
 
 
 def get_estimated_price_range(price: float, mode: str) -> str:
     """Generate estimated price range based on mode and base price"""
-    ranges = {
-        "plane": (price * 0.7, price * 1.4),
-        "train": (price * 0.5, price * 1.6),
-        "bus": (price * 0.6, price * 1.5)
-    }
-    
-    if mode in ranges:
-        min_price, max_price = ranges[mode]
-        return f"₹{int(min_price)}-{int(max_price)}"
-    return f"₹{int(price * 0.8)}-{int(price * 1.5)}"
+    low, high = PRICE_RANGE_FACTORS.get(mode, DEFAULT_PRICE_RANGE_FACTORS)
+    return f"₹{int(price * low)}-{int(price * high)}"
 
 
 def determine_best_options(modes: Dict) -> Dict[str, str]:
@@ -106,27 +61,6 @@ def determine_best_options(modes: Dict) -> Dict[str, str]:
         mode: modes[mode]['duration'] for mode in modes
     }
     
-    def parse_duration_to_minutes(duration_str: str) -> int:
-        """Convert duration string to minutes for comparison"""
-        parts = duration_str.split()
-        total_minutes = 0
-        i = 0
-        while i < len(parts):
-            try:
-                value = float(parts[i])
-                unit = parts[i + 1].lower()
-                
-                if 'hour' in unit:
-                    total_minutes += int(value * 60)
-                elif 'min' in unit:
-                    total_minutes += int(value)
-                
-                i += 2
-            except (ValueError, IndexError):
-                i += 1
-        
-        return total_minutes
-    
     fastest_mode = min(durations.keys(), 
                       key=lambda x: parse_duration_to_minutes(durations[x]))
     best_options["fastest"] = f"{fastest_mode} ({durations[fastest_mode]})"
@@ -136,18 +70,116 @@ def determine_best_options(modes: Dict) -> Dict[str, str]:
     best_options["cheapest"] = f"{cheapest_mode} (₹{modes[cheapest_mode]['price']})"
     
     # Most Comfort
-    comfort_scores = {
-        "Premium": 3,
-        "Standard": 2,
-        "Budget": 1
-    }
     most_comfort_mode = max(modes.keys(), 
-                            key=lambda x: comfort_scores.get(modes[x]['comfort_level'], 0))
+                            key=lambda x: COMFORT_SCORES.get(modes[x]['comfort_level'], 0))
     best_options["comfort"] = f"{most_comfort_mode} ({modes[most_comfort_mode]['comfort_level']})"
     
     return best_options
 
 
+def travel_date_in_past(request: RouteRecommendationRequest) -> bool:
+    return request.travel_date is not None and request.travel_date < date.today()
+
+
+def check_travel_date(request: RouteRecommendationRequest):
+    """The datasets list daily services, so any date from today on is valid"""
+    if travel_date_in_past(request):
+        raise HTTPException(status_code=400, detail="travel_date must be today or later")
+
+
+def route_not_found_detail(request: RouteRecommendationRequest) -> str:
+    return (
+        f"Route from {request.source} to {request.destination} not found. Try popular routes like "
+        "Delhi-Nagpur, Mumbai-Bangalore, etc., or search_mode='multi_leg' for connections."
+    )
+
+
+def describe_itinerary(itinerary: Itinerary) -> str:
+    """One-line summary of an itinerary for best_for"""
+    route_summary = " → ".join(leg.mode for leg in itinerary.legs)
+    return (
+        f"{route_summary} ({itinerary.total_duration}, ₹{int(itinerary.total_price)}, "
+        f"{itinerary.transfers} transfer{'s' if itinerary.transfers != 1 else ''})"
+    )
+
+
+def recommend_itineraries(request: RouteRecommendationRequest) -> RouteRecommendationResponse:
+    """
+    Multi-leg search, possibly with transfers.
+
+    ``multi_leg`` returns the best itinerary for the requested metric; ``k_best``
+    returns up to ``max_itineraries`` alternatives filtered to the Pareto front
+    over time, fare and transfers.
+    """
+    if request.optimize not in METRICS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid optimize value '{request.optimize}'. Use one of: {', '.join(METRICS)}"
+        )
+    if request.allowed_modes is not None and not set(request.allowed_modes) <= set(MODES):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid allowed_modes. Use any of: {', '.join(MODES)}"
+        )
+    if request.max_transfers is not None and request.max_transfers < 0:
+        raise HTTPException(status_code=400, detail="max_transfers must be 0 or greater")
+    if not 1 <= request.max_itineraries <= MAX_ITINERARIES:
+        raise HTTPException(status_code=400, detail=f"max_itineraries must be between 1 and {MAX_ITINERARIES}")
+
+    search = get_itinerary_search()
+    source_id = search.graph.city_id(request.source)
+    destination_id = search.graph.city_id(request.destination)
+
+    paths = []
+    if source_id is not None and destination_id is not None:
+        if request.search_mode == "k_best":
+            paths = search.k_shortest(
+                source_id,
+                destination_id,
+                k=request.max_itineraries,
+                metric=request.optimize,
+                max_transfers=request.max_transfers,
+                modes=request.allowed_modes
+            )
+        else:
+            result = search.search(
+                source_id,
+                destination_id,
+                metric=request.optimize,
+                max_transfers=request.max_transfers,
+                modes=request.allowed_modes
+            )
+            paths = [result] if result else []
+    if not paths:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No itinerary from {request.source} to {request.destination} with the given constraints."
+        )
+
+    if request.search_mode == "k_best":
+        front = pareto_front([search.build_itinerary(edges) for _, edges in paths])
+        itineraries = [Itinerary(**itinerary) for itinerary in front]
+        best_for = {
+            "fastest": describe_itinerary(min(itineraries, key=lambda x: x.total_hours)),
+            "cheapest": describe_itinerary(min(itineraries, key=lambda x: x.total_price)),
+            "fewest_transfers": describe_itinerary(min(itineraries, key=lambda x: (x.transfers, x.total_hours)))
+        }
+    else:
+        itineraries = [Itinerary(**search.build_itinerary(paths[0][1]))]
+        preference = {"time": "fastest", "distance": "shortest", "price": "cheapest"}[request.optimize]
+        best_for = {preference: describe_itinerary(itineraries[0])}
+
+    return RouteRecommendationResponse(
+        source=request.source,
+        destination=request.destination,
+        travel_date=request.travel_date,
+        distance_km=itineraries[0].total_distance,
+        travel_modes=[],
+        best_for=best_for,
+        itineraries=itineraries
+    )
+
+
 @app.post("/recommend", response_model=RouteRecommendationResponse)
 def recommend_routes(request: RouteRecommendationRequest):
     """
@@ -156,42 +188,64 @@ def recommend_routes(request: RouteRecommendationRequest):
     **Parameters:**
     - `source`: Starting location (e.g., "Delhi")
     - `destination`: Ending location (e.g., "Nagpur")
-    - `travel_date`: Optional travel date (e.g., "2026-02-15")
+    - `travel_date`: Optional travel date (e.g., "2026-02-15"); 400 if it is in the past
     - `preferences`: Optional list of preferences (e.g., ["fastest", "cheapest", "comfort"])
+    - `search_mode`: "direct" (default), "multi_leg" for itineraries with transfers,
+      or "k_best" for Pareto-optimal alternatives (fastest / cheapest / fewest transfers)
+    - `optimize`, `max_transfers`, `allowed_modes`, `max_itineraries`: itinerary search options
     
     **Returns:**
     - List of transport options (plane, train, bus) with detailed information
     - Best options for different preferences
+    - `itineraries` with every leg listed (multi_leg and k_best only)
     """
-    
-    source = normalize_location(request.source)
-    destination = normalize_location(request.destination)
-    
-    # Look up route (check both directions)
-    route_key = (source, destination)
-    reverse_route_key = (destination, source)
-    
-    route_data = None
-    if route_key in ROUTE_DATABASE:
-        route_data = ROUTE_DATABASE[route_key]
-    elif reverse_route_key in ROUTE_DATABASE:
-        route_data = ROUTE_DATABASE[reverse_route_key]
-    else:
+    check_travel_date(request)
+    if request.search_mode in ("multi_leg", "k_best"):
+        return recommend_itineraries(request)
+    if request.search_mode != "direct":
         raise HTTPException(
-            status_code=404,
-            detail=f"Route from {request.source} to {request.destination} not found. Try popular routes like Delhi-Nagpur, Mumbai-Bangalore, etc."
+            status_code=400,
+            detail=f"Invalid search_mode '{request.search_mode}'. Use 'direct', 'multi_leg' or 'k_best'"
         )
-    
+
+    graph = get_route_graph()
+    source_id = graph.city_id(request.source)
+    destination_id = graph.city_id(request.destination)
+
+    # Look up route (check both directions)
+    edges = np.empty(0, dtype=np.intp)
+    if source_id is not None and destination_id is not None:
+        edges = graph.edges_between(source_id, destination_id)
+        if not len(edges):
+            edges = graph.edges_between(destination_id, source_id)
+
+    if not len(edges):
+        raise HTTPException(status_code=404, detail=route_not_found_detail(request))
+
+    # Collapse edges to one entry per mode (keep the cheapest service)
+    modes_dict: Dict[str, Dict] = {}
+    for edge in edges.tolist():
+        mode_name = MODES[graph.modes[edge]]
+        price = round(float(graph.price[edge]))
+        if mode_name in modes_dict and modes_dict[mode_name]["price"] <= price:
+            continue
+        modes_dict[mode_name] = {
+            "duration": format_duration(float(graph.time_hr[edge])),
+            "price": price,
+            "distance_km": round(float(graph.distance_km[edge]), 1),
+            "availability": int(graph.daily_services[edge]),
+            "comfort_level": COMFORT_BY_MODE[mode_name]
+        }
+
     # Build transport options
     transport_options: List[TransportOption] = []
-    modes_dict = route_data["modes"]
-    
+
     for mode_name, mode_data in modes_dict.items():
         option = TransportOption(
             mode=mode_name,
             duration=mode_data["duration"],
             price=mode_data["price"],
-            distance=route_data["distance_km"],
+            distance=mode_data["distance_km"],
             availability=mode_data["availability"],
             comfort_level=mode_data["comfort_level"],
             estimated_cost_range=get_estimated_price_range(mode_data["price"], mode_name)
@@ -207,24 +261,192 @@ def recommend_routes(request: RouteRecommendationRequest):
     return RouteRecommendationResponse(
         source=request.source,
         destination=request.destination,
-        distance_km=route_data["distance_km"],
+        travel_date=request.travel_date,
+        distance_km=min(mode["distance_km"] for mode in modes_dict.values()),
         travel_modes=transport_options,
         best_for=best_for
     )
 
 
-@app.get("/available-routes")
-def get_available_routes():
-    """Get list of all available routes in the system"""
-    routes = []
-    for (source, destination) in ROUTE_DATABASE.keys():
-        routes.append({
-            "source": source.title(),
-            "destination": destination.title(),
-            "distance_km": ROUTE_DATABASE[(source, destination)]["distance_km"]
-        })
-    
+def first_per_group(groups: np.ndarray, *keys: np.ndarray) -> np.ndarray:
+    """Row index of the smallest row per group, ordered by ``keys`` (earlier rows win ties)"""
+    order = np.lexsort((np.arange(len(groups)),) + keys[::-1] + (groups,))
+    sorted_groups = groups[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    return order[is_first]
+
+
+def recommend_direct_batch(requests: List[RouteRecommendationRequest]) -> List[Dict]:
+    """
+    Direct route lookups for many pairs at once.
+
+    City ids, edge ranges, the cheapest service per mode, price ranges and the
+    best_for picks are array operations over every pair; Python only assembles
+    the output rows. Each item is ``{"status_code": 200, "result": ...}`` or
+    ``{"status_code": 404, "detail": ...}``, in input order.
+    """
+    graph = get_route_graph()
+    num_requests = len(requests)
+    source_ids = graph.city_ids([request.source for request in requests])
+    destination_ids = graph.city_ids([request.destination for request in requests])
+
+    # Look up routes (check both directions)
+    starts, ends = graph.edges_between_many(source_ids, destination_ids)
+    reverse_starts, reverse_ends = graph.edges_between_many(destination_ids, source_ids)
+    use_reverse = starts == ends
+    starts = np.where(use_reverse, reverse_starts, starts)
+    ends = np.where(use_reverse, reverse_ends, ends)
+
+    # One row per (request, edge)
+    counts = ends - starts
+    group_starts = np.cumsum(counts) - counts
+    rows = np.repeat(np.arange(num_requests), counts)
+    edges = np.arange(counts.sum()) + np.repeat(starts - group_starts, counts)
+    modes = graph.modes[edges].astype(np.int64)
+    prices = np.rint(graph.price[edges].astype(np.float64))
+
+    # Collapse to one row per (request, mode), keeping the cheapest service
+    order = np.lexsort((edges, prices, modes, rows))
+    rows, modes, prices, edges = rows[order], modes[order], prices[order], edges[order]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (rows[1:] != rows[:-1]) | (modes[1:] != modes[:-1])
+    rows, modes, prices, edges = rows[keep], modes[keep], prices[keep], edges[keep]
+
+    minutes = np.rint(graph.time_hr[edges].astype(np.float64) * 60)
+    distances = np.round(graph.distance_km[edges].astype(np.float64), 1)
+    range_low = np.trunc(prices * PRICE_RANGE_BY_MODE_ID[modes, 0])
+    range_high = np.trunc(prices * PRICE_RANGE_BY_MODE_ID[modes, 1])
+
+    # Best options: rows are in mode order within a request, as in determine_best_options
+    fastest = first_per_group(rows, minutes)
+    cheapest = first_per_group(rows, prices)
+    most_comfort = first_per_group(rows, -COMFORT_SCORE_BY_MODE_ID[modes])
+
+    # Transport options sorted by price (cheapest first), plus the pair distance
+    by_price = np.lexsort((np.arange(len(rows)), prices, rows))
+    found, found_starts = np.unique(rows[by_price], return_index=True)
+    pair_distances = np.minimum.reduceat(distances[by_price], found_starts) if len(found) else distances
+
+    mode_names = [MODES[mode] for mode in modes.tolist()]
+    durations = [format_duration(hours) for hours in graph.time_hr[edges].tolist()]
+    # Whole rupees as ints, as /recommend serialises them
+    prices_list = prices.astype(np.int64).tolist()
+    distances_list = distances.tolist()
+    availability = graph.daily_services[edges].tolist()
+    cost_ranges = [f"₹{int(low)}-{int(high)}" for low, high in zip(range_low.tolist(), range_high.tolist())]
+    by_price_list = by_price.tolist()
+    found_ends = np.append(found_starts[1:], len(by_price)).tolist()
+
+    results: List[Optional[Dict]] = [None] * num_requests
+    for request_index, start, end, distance, fast, cheap, comfort in zip(
+        found.tolist(), found_starts.tolist(), found_ends, pair_distances.tolist(),
+        fastest.tolist(), cheapest.tolist(), most_comfort.tolist()
+    ):
+        request = requests[request_index]
+        travel_modes = []
+        for row in by_price_list[start:end]:
+            travel_modes.append({
+                "mode": mode_names[row],
+                "duration": durations[row],
+                "price": prices_list[row],
+                "distance": distances_list[row],
+                "availability": availability[row],
+                "comfort_level": COMFORT_BY_MODE[mode_names[row]],
+                "estimated_cost_range": cost_ranges[row]
+            })
+        results[request_index] = {
+            "status_code": 200,
+            "result": {
+                "source": request.source,
+                "destination": request.destination,
+                "travel_date": request.travel_date,
+                "distance_km": distance,
+                "travel_modes": travel_modes,
+                "best_for": {
+                    "fastest": f"{mode_names[fast]} ({durations[fast]})",
+                    "cheapest": f"{mode_names[cheap]} (₹{prices_list[cheap]})",
+                    "comfort": f"{mode_names[comfort]} ({COMFORT_BY_MODE[mode_names[comfort]]})"
+                },
+                "itineraries": None
+            }
+        }
+    return [
+        result if result is not None else {"status_code": 404, "detail": route_not_found_detail(request)}
+        for request, result in zip(requests, results)
+    ]
+
+
+@app.post("/recommend/batch")
+def recommend_routes_batch(requests: List[RouteRecommendationRequest]):
+    """
+    Resolve many route recommendation requests in one call.
+
+    **Body:** a JSON list of `/recommend` request objects (at most 1000).
+
+    **Returns:**
+    - `results` in input order; each item is `{"status_code": 200, "result": {...}}`
+      with the `/recommend` response, or `{"status_code": 4xx, "detail": "..."}`
+      so one unknown pair doesn't fail the whole batch
+
+    Direct lookups are resolved together as array operations; multi_leg and
+    k_best requests run one search each.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} requests per batch")
+
+    results: List[Optional[Dict]] = [None] * len(requests)
+    # Past travel dates fall through to recommend_routes, which reports the 400
+    direct = [
+        i for i, request in enumerate(requests)
+        if request.search_mode == "direct" and not travel_date_in_past(request)
+    ]
+    for i, item in zip(direct, recommend_direct_batch([requests[i] for i in direct])):
+        results[i] = item
+
+    for i, request in enumerate(requests):
+        if results[i] is not None:
+            continue
+        try:
+            results[i] = {"status_code": 200, "result": recommend_routes(request).model_dump()}
+        except HTTPException as e:
+            results[i] = {"status_code": e.status_code, "detail": e.detail}
+
     return {
-        "total_routes": len(routes),
-        "routes": sorted(routes, key=lambda x: x["source"])
+        "total": len(results),
+        "results": results
     }
+
+
+@app.get("/available-routes")
+def get_available_routes(
+    request: Request,
+    mode: Optional[str] = Query(None, description="Only pairs served by this mode (plane, train, bus)"),
+    source: Optional[str] = Query(None, description="Only routes leaving this city"),
+    min_distance: Optional[float] = Query(None, ge=0, description="Shortest distance (km), inclusive"),
+    max_distance: Optional[float] = Query(None, ge=0, description="Longest distance (km), inclusive"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_ROUTES_PAGE, description="Page size; omit for every match")
+):
+    """Get list of all available routes in the system, optionally filtered and paginated
+
+    Served from the precomputed route catalogue; send the ETag back in
+    If-None-Match to get a 304 while the route data is unchanged.
+    """
+    if mode is not None and mode.lower() not in MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+    mode = mode.lower() if mode is not None else None
+    source = normalize_location(source) if source is not None else None
+
+    catalog = get_route_catalog()
+    etag = catalog.etag(
+        mode=mode, source=source, min_distance=min_distance, max_distance=max_distance,
+        offset=offset, limit=limit
+    )
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+
+    rows = catalog.select(mode=mode, source=source, min_distance=min_distance, max_distance=max_distance)
+    return Response(content=catalog.page(rows, offset, limit), media_type="application/json", headers=headers)
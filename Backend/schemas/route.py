@@ -1,3 +1,4 @@
+from datetime import date
 from pydantic import BaseModel
 from typing import List, Optional
 
@@ -6,28 +7,56 @@ class TransportOption(BaseModel):
     """Single transport mode option with details"""
     mode: str  # "train", "plane", "bus"
     duration: str  # e.g., "6 hours", "2 hours 30 min"
-    price: float  # in INR
+    price: int  # in INR, rounded to the rupee
     distance: float  # in km
     availability: int  # number of daily services
     comfort_level: str  # "Budget", "Standard", "Premium"
     estimated_cost_range: str  # e.g., "500-1500"
 
 
+class ItineraryLeg(BaseModel):
+    """One leg of a multi-leg itinerary"""
+    mode: str  # "plane", "train", "bus"
+    source: str
+    destination: str
+    duration: str  # e.g., "1 hour 35 min"
+    distance: float  # in km
+    price: float  # in INR (estimated)
+    availability: int  # number of daily services
+
+
+class Itinerary(BaseModel):
+    """Multi-leg journey found by the itinerary search"""
+    legs: List[ItineraryLeg]
+    total_duration: str  # includes connection buffers between legs
+    total_hours: float
+    total_distance: float  # in km
+    total_price: float  # in INR (estimated)
+    transfers: int
+
+
 class RouteRecommendationRequest(BaseModel):
     """Request model for route recommendations"""
     source: str  # e.g., "Delhi"
     destination: str  # e.g., "Nagpur"
-    travel_date: Optional[str] = None  # e.g., "2026-02-15"
+    travel_date: Optional[date] = None  # e.g., "2026-02-15"; must not be in the past
     preferences: Optional[List[str]] = None  # e.g., ["fastest", "cheapest", "comfort"]
+    search_mode: str = "direct"  # "direct" (single edge), "multi_leg" or "k_best" (itinerary search)
+    optimize: str = "time"  # itinerary search: "time", "distance" or "price"
+    max_transfers: Optional[int] = None  # itinerary search: None means unlimited
+    allowed_modes: Optional[List[str]] = None  # itinerary search: e.g., ["plane", "train"]
+    max_itineraries: int = 5  # k_best only: alternatives to consider (K)
 
 
 class RouteRecommendationResponse(BaseModel):
     """Response model with recommended routes"""
     source: str
     destination: str
+    travel_date: Optional[date] = None  # Echoed from the request
     distance_km: float
     travel_modes: List[TransportOption]  # List of train, plane, bus options
     best_for: dict  # Best options for different preferences
+    itineraries: Optional[List[Itinerary]] = None  # Set for multi_leg / k_best searches
     
     class Config:
         json_schema_extra = {
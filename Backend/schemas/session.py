@@ -7,3 +7,4 @@ class SessionSchema(MongoBase):
     refreshToken: str
     expiresAt: datetime
     createdAt: datetime
+    revokedAt: datetime | None = None
@@ -0,0 +1,345 @@
+"""
+Test the async Amadeus client against a local stub server
+Run with: python test_amadeus.py
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from Chatbot.chatbot import AmadeusClient, groq_upstream, travel_assistant
+from Chatbot.flight_cache import FlightCache, MemoryStore, SQLiteStore
+from Chatbot.resilience import CircuitBreaker, Deadline, DeadlineExceeded, Upstream, UpstreamUnavailable
+
+
+class StubAmadeus(BaseHTTPRequestHandler):
+    """Minimal token + flight-offers endpoints that count what they serve"""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    token_requests = 0
+    flight_requests = 0
+    client_ports = set()
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        StubAmadeus.token_requests += 1
+        StubAmadeus.client_ports.add(self.client_address[1])
+        time.sleep(0.2)  # slow token endpoint, so concurrent callers pile up
+        self._send_json({"access_token": "stub-token", "expires_in": 1799})
+
+    def do_GET(self):
+        StubAmadeus.flight_requests += 1
+        StubAmadeus.client_ports.add(self.client_address[1])
+        if self.headers.get("Authorization") != "Bearer stub-token":
+            self._send_json({"error": "unauthorized"}, status=401)
+            return
+        # Fares vary by day; the same flight is offered twice at different fares
+        day = int(parse_qs(urlparse(self.path).query)["departureDate"][0][-2:])
+        self._send_json({"flights": [
+            {"id": "STUB1", "airline": "Stub Air", "departure": "08:00", "price": 1234 + 10 * (day % 7)},
+            {"id": "STUB1", "airline": "Stub Air", "departure": "08:00", "price": 1500}
+        ]})
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def run_checks(base_url: str):
+    # No rate limit here: this checks pooling and coalescing, not the Amadeus quota
+    client = AmadeusClient("id", "secret", base_url=base_url, max_connections=8, upstream=Upstream("amadeus", 0, 1))
+
+    # 100 concurrent requests for different dates with no token yet -> a single token fetch
+    dates = [f"2026-03-{day:02d}" for day in range(1, 29)]
+    results = await asyncio.gather(*(
+        client.get_flights("DEL", "BOM", departure_date=dates[i % len(dates)], adults=1 + i // len(dates))
+        for i in range(100)
+    ))
+    print(f"   token fetches: client={client.token_fetches}, server={StubAmadeus.token_requests}")
+    print(f"   flight requests: {StubAmadeus.flight_requests} over {len(StubAmadeus.client_ports)} connections")
+    assert client.token_fetches == 1 and StubAmadeus.token_requests == 1
+    assert all(result["source"] == "amadeus" for result in results)
+    assert StubAmadeus.flight_requests == 100
+    assert len(StubAmadeus.client_ports) <= 8
+
+    # Same key again -> served from the flight cache; concurrent misses coalesce
+    await client.get_flights("DEL", "BOM", departure_date=dates[0])
+    await asyncio.gather(*(client.get_flights("BLR", "HYD") for _ in range(50)))
+    stats = client.cache.stats()
+    print(f"   flight cache: {stats['hits']} hits, {stats['misses']} misses, {stats['coalesced']} coalesced")
+    assert StubAmadeus.flight_requests == 101
+    assert stats["hits"] == 1 and stats["coalesced"] == 49
+    assert client.token_fetches == 1
+    await client.aclose()
+
+    # Expired entry -> served stale while one background refresh runs
+    stale_client = AmadeusClient("id", "secret", base_url=base_url, cache=FlightCache(MemoryStore(), ttl=0, stale_ttl=60))
+    await stale_client.get_flights("GOI", "CCU")
+    requests_before = StubAmadeus.flight_requests
+    result = await stale_client.get_flights("GOI", "CCU")
+    await asyncio.sleep(0.5)
+    print(f"   stale-while-revalidate: {stale_client.cache.stats()['stale_hits']} stale hit, "
+          f"{StubAmadeus.flight_requests - requests_before} background refresh")
+    assert result["source"] == "amadeus" and stale_client.cache.stale_hits == 1
+    assert StubAmadeus.flight_requests - requests_before == 1
+    await stale_client.aclose()
+
+    # ±3-day calendar: one upstream call per uncached day, duplicate offers merged
+    calendar_client = AmadeusClient("id", "secret", base_url=base_url)
+    center = date.today() + timedelta(days=30)
+    requests_before = StubAmadeus.flight_requests
+    await calendar_client.get_flights("DEL", "BOM", departure_date=center.isoformat())
+    result = await calendar_client.get_flight_calendar("DEL", "BOM", center.isoformat(), flex_days=3)
+    print(f"   flexible dates: {len(result['calendar'])} days, {result['upstream_calls']} upstream calls, "
+          f"cheapest {result['cheapest']['date']} at {result['cheapest']['min_price']:g}")
+    assert len(result["calendar"]) == 7 and result["upstream_calls"] == 6
+    assert StubAmadeus.flight_requests - requests_before == 7
+    assert result["total_offers"] == 7 and all(entry["offers"] == 1 for entry in result["calendar"])
+    assert result["cheapest"]["min_price"] == 1234 and result["offers"][0]["date"] == result["cheapest"]["date"]
+    again = await calendar_client.get_flight_calendar("DEL", "BOM", center.isoformat(), flex_days=3)
+    assert again["upstream_calls"] == 0
+    # The window never reaches into the past
+    today = await calendar_client.get_flight_calendar("DEL", "BOM", date.today().isoformat(), flex_days=2)
+    assert [entry["date"] for entry in today["calendar"]][0] == date.today().isoformat()
+    assert len(today["calendar"]) == 3
+    await calendar_client.aclose()
+
+    # No credentials -> mock fallback without touching the network
+    mock_client = AmadeusClient("", "", base_url=base_url)
+    result = await mock_client.get_flights("DEL", "BOM")
+    print(f"   without credentials: source={result['source']}")
+    assert result["source"] == "mock"
+
+    # Shared SQLite store: a second client (another worker) sees the first one's entry
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "flights.sqlite3")
+        first = AmadeusClient("id", "secret", base_url=base_url, cache=FlightCache(SQLiteStore(path)))
+        second = AmadeusClient("id", "secret", base_url=base_url, cache=FlightCache(SQLiteStore(path)))
+        await first.get_flights("DEL", "HYD")
+        result = await second.get_flights("DEL", "HYD")
+        print(f"   shared sqlite store: second worker hits={second.cache.hits}")
+        assert second.cache.hits == 1 and result["data"]["flights"][0]["id"] == "STUB1"
+        await first.aclose()
+        await second.aclose()
+
+        # Two caches on one file: one upstream fetch between them, and the file's
+        # lock held by another worker doesn't stall this worker's event loop
+        fetches = []
+
+        async def fetch():
+            fetches.append(1)
+            return {"flights": ["SHARED1"]}
+
+        worker_a, worker_b = FlightCache(SQLiteStore(path)), FlightCache(SQLiteStore(path))
+        assert await worker_a.get_or_fetch("DEL:GOI:2026-05-01:1", fetch) == {"flights": ["SHARED1"]}
+        assert await worker_b.get_or_fetch("DEL:GOI:2026-05-01:1", fetch) == {"flights": ["SHARED1"]}
+        assert len(fetches) == 1 and worker_a.misses == 1 and worker_b.hits == 1
+
+        other_worker = sqlite3.connect(path, isolation_level=None)
+        other_worker.execute("BEGIN IMMEDIATE")
+        asyncio.get_running_loop().call_later(0.3, other_worker.execute, "COMMIT")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        started = time.perf_counter()
+        assert await worker_b.get_or_fetch("DEL:GOI:2026-05-01:1", fetch) == {"flights": ["SHARED1"]}
+        waited = time.perf_counter() - started
+        ticking.cancel()
+        other_worker.close()
+        print(f"   two caches on one sqlite file: {len(fetches)} fetch; "
+              f"waited {waited:.2f}s on the lock while the loop ticked {ticks} times")
+        assert waited >= 0.25 and ticks >= 10 and worker_b.hits == 2
+
+    # Outage: after 3 timeouts the breaker opens and requests fall back without waiting
+    healthy = False
+
+    async def flaky(request: httpx.Request) -> httpx.Response:
+        if not healthy:
+            await asyncio.sleep(0.3)
+            raise httpx.ConnectTimeout("stub outage", request=request)
+        if request.method == "POST":
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        return httpx.Response(200, json={"flights": [{"id": "OK1", "price": 999}]})
+
+    breaker = CircuitBreaker(failure_threshold=3, recovery_time=0.5, half_open_probes=1)
+    outage_client = AmadeusClient(
+        "id", "secret", transport=httpx.MockTransport(flaky), upstream=Upstream("amadeus", 0, 1, breaker=breaker)
+    )
+    latencies = []
+    for day in range(1, 41):
+        started = time.perf_counter()
+        result = await outage_client.get_flights("DEL", "BOM", departure_date=f"2026-12-{day % 28 + 1:02d}")
+        latencies.append(time.perf_counter() - started)
+        assert result["source"] == "mock"
+    open_latencies = sorted(latencies[3:])
+    p99 = open_latencies[int(len(open_latencies) * 0.99) - 1]
+    print(f"   outage: first 3 calls {min(latencies[:3]):.2f}s+, then p99 {p99 * 1000:.2f} ms "
+          f"({outage_client.upstream.short_circuited} short-circuited, breaker {breaker.state})")
+    assert breaker.state == "open" and outage_client.upstream.short_circuited == 37 and p99 < 0.01
+
+    # Half-open: one probe after recovery_time; it succeeds, so the breaker closes
+    healthy = True
+    await asyncio.sleep(0.6)
+    assert breaker.state == "half_open"
+    result = await outage_client.get_flights("DEL", "BOM", departure_date="2026-12-30")
+    assert result["source"] == "amadeus" and breaker.state == "closed"
+    await outage_client.aclose()
+
+    # Token bucket: a concurrent burst beyond the quota is refused rather than queued past max_wait
+    limited = Upstream("limited", rate=10, burst=2, max_wait=0.25)
+
+    async def call() -> bool:
+        try:
+            async with limited.attempt():
+                return True
+        except UpstreamUnavailable:
+            return False
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(call() for _ in range(6)))
+    elapsed = time.perf_counter() - started
+    print(f"   rate limit 10/s, burst 2: {outcomes.count(True)} of 6 admitted within {elapsed * 1000:.0f} ms")
+    assert outcomes.count(True) == 4 and limited.rate_limited == 2 and 0.18 < elapsed < 0.3
+
+    # Hedging: once p95 is known, a request slower than it gets a second copy, and the fast copy wins
+    offer_calls = 0
+
+    async def tail_latency(request: httpx.Request) -> httpx.Response:
+        nonlocal offer_calls
+        if request.method == "POST":
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        offer_calls += 1
+        # Every 25th request stalls, the rest take 10 ms
+        await asyncio.sleep(1.0 if offer_calls % 25 == 0 else 0.01)
+        return httpx.Response(200, json={"flights": [{"id": "H1", "price": 999}]})
+
+    hedged_client = AmadeusClient(
+        "id", "secret", transport=httpx.MockTransport(tail_latency), upstream=Upstream("amadeus", 0, 1)
+    )
+    latencies = []
+    for day in range(48):
+        started = time.perf_counter()
+        await hedged_client.get_flights("DEL", "BOM", departure_date=(date.today() + timedelta(days=day)).isoformat())
+        latencies.append(time.perf_counter() - started)
+    hedges = hedged_client.hedge_stats()
+    print(f"   hedging: p95 {hedges['p95_ms']} ms, {hedges['hedges_sent']} hedges sent, {hedges['hedges_won']} won, "
+          f"slowest request {max(latencies[24:]) * 1000:.0f} ms")
+    # From request 21 on p95 is known, so the stalled 25th request is hedged
+    assert hedges["hedges_won"] >= 1 and max(latencies[24:]) < 0.5
+    await hedged_client.aclose()
+
+    # Deadline: the caller gets mock flights when time runs out; the fetch still fills the cache
+    async def slow(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, json={"access_token": "t", "expires_in": 1799})
+        await asyncio.sleep(0.3)
+        return httpx.Response(200, json={"flights": [{"id": "S1", "price": 999}]})
+
+    slow_client = AmadeusClient(
+        "id", "secret", transport=httpx.MockTransport(slow), upstream=Upstream("amadeus", 0, 1), hedging=False
+    )
+    started = time.perf_counter()
+    result = await slow_client.get_flights("DEL", "GOI", deadline=Deadline(0.1))
+    elapsed = time.perf_counter() - started
+    print(f"   deadline 100 ms against a 300 ms upstream: {result['source']} after {elapsed * 1000:.0f} ms")
+    assert result["source"] == "mock" and elapsed < 0.2 and slow_client.deadline_misses == 1
+    await asyncio.sleep(0.4)
+    assert (await slow_client.get_flights("DEL", "GOI", deadline=Deadline(0.1)))["source"] == "amadeus"
+    assert slow_client.upstream.failures == 0
+    await slow_client.aclose()
+
+    # The LLM call gets what is left of the deadline, and is skipped when too little is left
+    class SlowChain:
+        async def ainvoke(self, inputs):
+            await asyncio.sleep(3)
+            return {}
+
+    groq_failures = groq_upstream.failures
+    for budget in (0.5, 1.5):
+        started = time.perf_counter()
+        try:
+            await travel_assistant._invoke_llm(SlowChain(), {}, Deadline(budget))
+            raise AssertionError("LLM call outlived its deadline")
+        except DeadlineExceeded:
+            pass
+        elapsed = time.perf_counter() - started
+        # Below GROQ_MIN_BUDGET the call is not made at all
+        assert elapsed < 0.01 if budget < 1 else budget - 0.05 < elapsed < budget + 0.05
+    # Running out of the request's own time is no Groq failure
+    assert groq_upstream.failures == groq_failures and groq_upstream.breaker.consecutive_failures == 0
+    print("   LLM deadline: skipped with 0.5 s left, cut off at 1.5 s, breaker untouched")
+
+    # Only upstream errors and the upstream's own timeouts trip a breaker; a half-open probe
+    # cut short by the deadline gives its slot back
+    probed = Upstream("probed", 0, 1, breaker=CircuitBreaker(failure_threshold=1, recovery_time=0.05))
+    try:
+        async with probed.attempt():
+            raise asyncio.TimeoutError("upstream read timeout")
+    except asyncio.TimeoutError:
+        pass
+    assert probed.breaker.state == "open" and probed.failures == 1
+    await asyncio.sleep(0.06)
+    for _ in range(2):
+        try:
+            async with probed.attempt():
+                await Deadline(0.01).run(asyncio.sleep(1), "probe")
+        except DeadlineExceeded:
+            pass
+    assert probed.breaker.state == "half_open" and probed.failures == 1
+    async with probed.attempt():
+        pass
+    assert probed.breaker.state == "closed"
+
+    # Unreachable server -> mock fallback
+    down_client = AmadeusClient("id", "secret", base_url="http://127.0.0.1:9", timeout=1)
+    result = await down_client.get_flights("DEL", "BOM")
+    print(f"   server down: source={result['source']}")
+    assert result["source"] == "mock"
+    await down_client.aclose()
+
+
+def test_amadeus_client():
+    print("=" * 70)
+    print("AMADEUS CLIENT TEST (local stub server)")
+    print("=" * 70)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAmadeus)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(run_checks(f"http://127.0.0.1:{server.server_address[1]}"))
+    finally:
+        server.shutdown()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_amadeus_client()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
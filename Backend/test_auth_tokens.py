@@ -0,0 +1,190 @@
+"""
+Test access-token verification and refresh-token sessions: the verified
+token cache, revocation on logout, refresh rotation and reuse detection
+Uses mongomock when installed, otherwise the mongod at MONGODB_URL
+Run with: python test_auth_tokens.py
+"""
+
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("SECRET_KEY", "test-" + uuid.uuid4().hex)
+
+from fastapi import HTTPException
+
+import authentication.jwt_protected as jwt_protected
+import authentication.login_api as login_api
+from authentication.auth_schema import LoginSchema, RefreshSchema
+from authentication.jwt_protected import RevocationList, TokenCache, verify_token
+from authentication.jwt_utils import create_access_token, token_digest
+from authentication.password_utils import hash_password
+from authentication.repositories import SessionRepository, UserRepository
+
+PASSWORD = "s3cret-pass"
+
+
+def expect_401(call, detail: str):
+    try:
+        call()
+        raise AssertionError(f"expected 401 {detail!r}")
+    except HTTPException as e:
+        assert e.status_code == 401 and e.detail == detail, (e.status_code, e.detail)
+
+
+async def expect_401_async(awaitable, detail: str):
+    try:
+        await awaitable
+        raise AssertionError(f"expected 401 {detail!r}")
+    except HTTPException as e:
+        assert e.status_code == 401 and e.detail == detail, (e.status_code, e.detail)
+
+
+def check_token_cache():
+    cache = TokenCache(max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", {"userId": "u1", "exp": time.time() + 60})
+    cache.set("b", {"userId": "u2", "exp": time.time() + 60})
+    assert cache.get("a")["userId"] == "u1"
+    # "b" is now the least recently used
+    cache.set("c", {"userId": "u3", "exp": time.time() + 60})
+    assert cache.get("b") is None and cache.get("c")["userId"] == "u3"
+
+    # Expired claims are dropped on lookup
+    cache.set("d", {"userId": "u4", "exp": time.time() - 1})
+    assert cache.get("d") is None and len(cache) == 1
+
+    stats = cache.stats()
+    print(f"   token cache: {stats}")
+    assert stats["hits"] == 2 and stats["misses"] == 3 and stats["evictions"] == 2
+
+
+def check_verify_token():
+    jwt_protected.token_cache = TokenCache()
+    try:
+        token = create_access_token({"userId": "u1", "sid": "s-verify"}, expires_minutes=5)
+        assert verify_token(token)["userId"] == "u1"
+        assert verify_token(token)["userId"] == "u1"
+        assert jwt_protected.token_cache.hits == 1 and jwt_protected.token_cache.misses == 1
+
+        expect_401(lambda: verify_token(token + "x"), "Invalid token")
+        expect_401(lambda: verify_token("not-a-jwt"), "Invalid token")
+        expired = create_access_token({"userId": "u1", "sid": "s-verify"}, expires_minutes=-1)
+        expect_401(lambda: verify_token(expired), "Invalid token")
+        assert token_digest(expired) not in jwt_protected.token_cache._entries
+
+        # A cached token past its exp is re-verified, and rejected
+        jwt_protected.token_cache.set(token_digest(expired), {"userId": "u1", "exp": time.time() - 1})
+        expect_401(lambda: verify_token(expired), "Invalid token")
+        print(f"   verify_token: {jwt_protected.token_cache.stats()['hits']} cache hit, bad/expired tokens rejected")
+    finally:
+        jwt_protected.token_cache = login_api.token_cache
+
+
+async def check_sessions(database):
+    session_repository = SessionRepository(database)
+    revoked = RevocationList(session_repository)
+    originals = (login_api.users, login_api.sessions, login_api.revoked_sessions, jwt_protected.revoked_sessions)
+    login_api.users, login_api.sessions = UserRepository(database), session_repository
+    login_api.revoked_sessions = jwt_protected.revoked_sessions = revoked
+    try:
+        await login_api.users.create({
+            "name": "Meera", "email": "meera@example.com", "passwordHash": hash_password(PASSWORD), "lastLogin": None
+        })
+        tokens = await login_api.login(LoginSchema(email="meera@example.com", password=PASSWORD))
+        claims = verify_token(tokens["accessToken"])
+        session_id = claims["sid"]
+        stored = await session_repository.get(session_id)
+        # Only the digest of the refresh token is stored
+        assert stored["refreshToken"] == token_digest(tokens["refreshToken"]) and stored["revokedAt"] is None
+
+        # Rotation: the new refresh token works once, the old one no longer does
+        rotated = await login_api.refresh(RefreshSchema(refreshToken=tokens["refreshToken"]))
+        assert rotated["refreshToken"] != tokens["refreshToken"]
+        assert verify_token(rotated["accessToken"])["sid"] == session_id
+        again = await login_api.refresh(RefreshSchema(refreshToken=rotated["refreshToken"]))
+        await expect_401_async(login_api.refresh(RefreshSchema(refreshToken="malformed")), "Invalid refresh token")
+        print("   refresh tokens rotate on every use")
+
+        # Reuse detection: replaying a rotated token ends the session for everyone
+        await expect_401_async(
+            login_api.refresh(RefreshSchema(refreshToken=rotated["refreshToken"])), "Invalid refresh token"
+        )
+        assert session_id in revoked and (await session_repository.get(session_id))["revokedAt"] is not None
+        await expect_401_async(
+            login_api.refresh(RefreshSchema(refreshToken=again["refreshToken"])), "Invalid refresh token"
+        )
+        expect_401(lambda: verify_token(again["accessToken"]), "Token revoked")
+        print("   replayed refresh token revoked the session")
+
+        # Logout revokes the session's access tokens, cached or not, and its refresh token
+        tokens = await login_api.login(LoginSchema(email="meera@example.com", password=PASSWORD))
+        claims = verify_token(tokens["accessToken"])
+        await login_api.logout(claims)
+        expect_401(lambda: verify_token(tokens["accessToken"]), "Token revoked")
+        await expect_401_async(
+            login_api.refresh(RefreshSchema(refreshToken=tokens["refreshToken"])), "Invalid refresh token"
+        )
+
+        # Another worker learns of the revocation on its next refresh
+        other_worker = RevocationList(session_repository)
+        assert claims["sid"] not in other_worker
+        await other_worker.refresh()
+        assert claims["sid"] in other_worker and session_id in other_worker
+        print(f"   logout revoked the session; another worker sees {len(other_worker)} revoked sessions")
+    finally:
+        login_api.users, login_api.sessions, login_api.revoked_sessions, jwt_protected.revoked_sessions = originals
+
+
+def test_auth_tokens():
+    print("=" * 70)
+    print("AUTH TOKENS TEST")
+    print("=" * 70)
+
+    print("\n1. Token Cache")
+    print("-" * 70)
+    check_token_cache()
+
+    print("\n2. verify_token")
+    print("-" * 70)
+    check_verify_token()
+
+    print("\n3. Refresh Sessions and Revocation")
+    print("-" * 70)
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+
+    if mongomock is not None:
+        print("   backend: mongomock")
+        asyncio.run(check_sessions(mongomock.MongoClient()["test_airport_llm"]))
+    else:
+        from pymongo import AsyncMongoClient
+        from authentication.mongo_connection import MONGODB_URL
+
+        async def against_mongod():
+            client = AsyncMongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
+            name = f"test_airport_llm_{uuid.uuid4().hex[:8]}"
+            try:
+                await check_sessions(client[name])
+            finally:
+                await client.drop_database(name)
+                await client.close()
+
+        print(f"   backend: mongod at {MONGODB_URL}")
+        asyncio.run(against_mongod())
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_auth_tokens()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
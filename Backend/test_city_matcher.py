@@ -0,0 +1,128 @@
+"""
+Test city extraction from chat messages: cue words, stopovers, typos and
+same-city input
+Run with: python test_city_matcher.py
+"""
+
+from Chatbot.city_matcher import BKTree, CityMatcher, osa_distance
+
+ALIASES = {
+    "delhi": "Delhi", "new delhi": "Delhi", "dilli": "Delhi",
+    "mumbai": "Mumbai", "bombay": "Mumbai",
+    "bangalore": "Bangalore", "bengaluru": "Bangalore",
+    "pune": "Pune", "goa": "Goa", "nagpur": "Nagpur", "hyderabad": "Hyderabad"
+}
+IATA_CODES = {"DEL": "Delhi", "BOM": "Mumbai", "BLR": "Bangalore", "PNQ": "Pune", "GOI": "Goa"}
+
+
+def check_cues(matcher: CityMatcher):
+    cases = {
+        "Delhi to Mumbai": ("Delhi", "Mumbai"),
+        "to Mumbai from Delhi": ("Delhi", "Mumbai"),
+        "I want to reach Goa, leaving Pune tomorrow": ("Pune", "Goa"),
+        "departing Bangalore, destination Hyderabad": ("Bangalore", "Hyderabad"),
+        "Mumbai Delhi": ("Mumbai", "Delhi"),
+        "flights DEL BOM": ("Delhi", "Mumbai"),
+        "anything to Goa?": (None, "Goa"),
+        "from Nagpur": ("Nagpur", None),
+        "hello there": (None, None),
+    }
+    for message, expected in cases.items():
+        assert matcher.extract_route(message) == expected, f"{message!r}: {matcher.extract_route(message)}"
+    print(f"   {len(cases)} cue-word messages")
+
+
+def check_stopovers(matcher: CityMatcher):
+    cases = {
+        "Delhi to Mumbai via Pune": ("Delhi", "Mumbai"),
+        "via Pune from Delhi to Mumbai": ("Delhi", "Mumbai"),
+        "from Hyderabad via Nagpur to Delhi": ("Hyderabad", "Delhi"),
+        "Bangalore to Goa through Pune": ("Bangalore", "Goa"),
+        "Delhi via Pune": ("Delhi", None),
+    }
+    for message, expected in cases.items():
+        assert matcher.extract_route(message) == expected, f"{message!r}: {matcher.extract_route(message)}"
+    print(f"   {len(cases)} messages with a stopover")
+
+
+def check_matching(matcher: CityMatcher):
+    # Word boundaries, longest match and upper-case-only codes
+    assert [m.city for m in matcher.find_all("what a goal")] == []
+    assert [(m.city, m.kind) for m in matcher.find_all("New Delhi to GOI")] == [("Delhi", "alias"), ("Goa", "iata")]
+    assert matcher.find_all("del bom") == []
+
+    # Misspellings within the allowed distance
+    assert matcher.extract_route("fly dehli to bangalor") == ("Delhi", "Bangalore")
+    assert matcher.extract_route("from hydrabad to mumbia") == ("Hyderabad", "Mumbai")
+    assert matcher.extract_route("bengalore to nagpru") == ("Bangalore", "Nagpur")
+    # Short words and stopwords are never fuzzy-matched
+    assert matcher.extract_route("in june from Delhi") == ("Delhi", None)
+    assert matcher.extract_route("please show flights") == (None, None)
+    # Too far from any city
+    assert matcher.extract_route("from Dxxhi to Mumbai") == (None, "Mumbai")
+
+    assert osa_distance("dehli", "delhi", 1) == 1 and osa_distance("pune", "june", 1) == 1
+    assert osa_distance("bangalore", "mumbai", 2) == 3
+    tree = BKTree(["delhi", "mumbai", "bangalore"])
+    assert tree.search("bangalor", 2) == (1, "bangalore") and tree.search("kolkata", 2) is None
+    print("   boundaries, codes and typos")
+
+
+def check_same_city(matcher: CityMatcher):
+    cases = ["from Delhi to Delhi", "Delhi to New Delhi", "from Bombay to Mumbai", "DEL to dilli"]
+    for message in cases:
+        assert matcher.extract_route(message) == (None, None), f"{message!r}: {matcher.extract_route(message)}"
+    # One city named twice without cues is only a source
+    assert matcher.extract_route("Delhi, Delhi") == ("Delhi", None)
+    print(f"   {len(cases)} same-city messages rejected")
+
+
+def check_shared_matcher():
+    """The matcher built from the gazetteer handles the same phrasing"""
+    from Chatbot.chatbot import extract_route
+
+    assert extract_route("Delhi to Mumbai via Pune") == ("Delhi", "Mumbai")
+    assert extract_route("flights from bombay to bengaluru") == ("Mumbai", "Bangalore")
+    assert extract_route("from Delhi to New Delhi") == (None, None)
+    print("   shared gazetteer matcher")
+
+
+def test_city_matcher():
+    print("=" * 70)
+    print("CITY MATCHER TEST")
+    print("=" * 70)
+
+    matcher = CityMatcher(ALIASES, IATA_CODES)
+
+    print("\n1. Cue Words")
+    print("-" * 70)
+    check_cues(matcher)
+
+    print("\n2. Stopovers")
+    print("-" * 70)
+    check_stopovers(matcher)
+
+    print("\n3. Boundaries, Codes and Misspellings")
+    print("-" * 70)
+    check_matching(matcher)
+
+    print("\n4. Same City")
+    print("-" * 70)
+    check_same_city(matcher)
+
+    print("\n5. Shared Matcher")
+    print("-" * 70)
+    check_shared_matcher()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_city_matcher()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
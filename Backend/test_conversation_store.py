@@ -0,0 +1,200 @@
+"""
+Test the per-session conversation store: ring buffers, LRU/TTL eviction and
+the batched write-behind to ``conversations``
+Uses mongomock when installed, otherwise the mongod at MONGODB_URL
+Run with: python test_conversation_store.py
+"""
+
+import asyncio
+import time
+import uuid
+
+from Chatbot.conversation_store import ConversationStore
+
+
+class RecordingCollection:
+    """Wraps a collection: counts bulk writes and fails the next ``fail`` of them"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.writes = []
+        self.fail = 0
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("mongod unreachable")
+        self.writes.append(len(operations))
+        # mongomock's bulk_write rejects the UpdateOne of current PyMongo; apply the upserts one by one
+        for operation in operations:
+            self.collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+
+    def stored(self, session_id):
+        document = self.collection.find_one({"_id": session_id})
+        return [message["content"] for message in document["conversation"]] if document else None
+
+
+def check_ring_buffer():
+    store = ConversationStore(max_turns=2)
+    for turn in range(5):
+        store.append("s1", "user", f"question {turn}")
+        store.append("s1", "assistant", f"answer {turn}")
+    history = store.history("s1")
+    # Two turns = the last four messages, oldest first
+    assert [m["content"] for m in history] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert [m["role"] for m in history] == ["user", "assistant"] * 2
+    assert store.history("unknown") == [] and len(store) == 1
+    # Without a collection nothing is queued for writing
+    assert store.stats()["pending_writes"] == 0
+    print(f"   10 messages appended, {len(history)} kept")
+
+
+def check_eviction():
+    store = ConversationStore(max_sessions=2)
+    store.append("a", "user", "hi")
+    store.append("b", "user", "hi")
+    store.append("a", "user", "again")  # "b" is now the least recently used
+    store.append("c", "user", "hi")
+    assert store.history("b") == [] and len(store.history("a")) == 2 and len(store) == 2
+    assert store.evictions == 1
+
+    store = ConversationStore(ttl=0.05)
+    store.append("idle", "user", "hi")
+    time.sleep(0.1)
+    store.append("active", "user", "hi")
+    assert store.history("idle") == [] and store.history("active") and store.evictions == 1
+    print("   least recently used and idle sessions evicted")
+
+
+async def check_write_behind(collection):
+    recording = RecordingCollection(collection)
+    store = ConversationStore(recording, persist_interval=0.05, persist_batch=10)
+    store.start()
+    try:
+        for session_id in ("w1", "w2", "w3"):
+            store.append(session_id, "user", f"from {session_id}")
+            store.append(session_id, "assistant", f"to {session_id}")
+        # Queued, not yet written: appending never waits for the database
+        assert store.stats()["pending_writes"] == 3 and not recording.writes
+        for _ in range(100):
+            if store.persisted:
+                break
+            await asyncio.sleep(0.01)
+        # The three dirty sessions went out in one bulk write
+        assert recording.writes == [3] and store.persisted == 3, recording.writes
+        assert recording.stored("w2") == ["from w2", "to w2"]
+        print(f"   3 sessions written behind in {len(recording.writes)} bulk write")
+    finally:
+        await store.stop()
+
+
+async def check_failed_writes(collection):
+    recording = RecordingCollection(collection)
+    # The writer runs (so changes are queued) but never wakes up; batches are flushed by hand
+    store = ConversationStore(recording, max_sessions=2, persist_interval=3600)
+    store.start()
+    try:
+        store.append("r1", "user", "hello")
+        store.append("r2", "user", "hello")
+        recording.fail = 1
+        assert not await store.flush()
+        # Both sessions are queued again, and nothing was lost
+        assert store.persist_errors == 1 and store.stats()["pending_writes"] == 2 and not recording.writes
+        assert await store.flush() and recording.writes == [2]
+        assert recording.stored("r1") == ["hello"]
+
+        # A session evicted while its write is pending is persisted from its snapshot
+        store.append("r1", "assistant", "hi")
+        recording.fail = 1
+        assert not await store.flush()
+        store.append("r3", "user", "new session")
+        store.append("r2", "user", "still here")
+        assert store.history("r1") == [] and store.stats()["pending_writes"] == 3
+        assert await store.flush() and recording.writes == [2, 3]
+        assert recording.stored("r1") == ["hello", "hi"] and recording.stored("r3") == ["new session"]
+        assert store.persist_errors == 2
+        print(f"   {store.persist_errors} failed writes re-queued, then written")
+    finally:
+        await store.stop()
+
+
+async def check_stop_flushes(collection):
+    recording = RecordingCollection(collection)
+    store = ConversationStore(recording, persist_interval=3600, persist_batch=2)
+    store.start()
+    for session_id in ("f1", "f2", "f3"):
+        store.append(session_id, "user", "bye")
+    assert not recording.writes
+    await store.stop()
+    # Everything pending is written, in batches of persist_batch
+    assert recording.writes == [2, 1] and store.stats()["pending_writes"] == 0
+    assert all(recording.stored(session_id) == ["bye"] for session_id in ("f1", "f2", "f3"))
+
+    # With the database down, stop() gives up instead of looping
+    recording.fail = 10
+    store.start()
+    store.append("f1", "user", "lost?")
+    await store.stop()
+    assert store.stats()["pending_writes"] == 1 and recording.fail == 9
+    print("   stop() flushed the pending sessions")
+
+
+def test_conversation_store():
+    print("=" * 70)
+    print("CONVERSATION STORE TEST")
+    print("=" * 70)
+
+    print("\n1. Ring Buffer")
+    print("-" * 70)
+    check_ring_buffer()
+
+    print("\n2. LRU and TTL Eviction")
+    print("-" * 70)
+    check_eviction()
+
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+
+    if mongomock is not None:
+        print("\n   backend: mongomock")
+        database = mongomock.MongoClient()["test_airport_llm"]
+        client = None
+    else:
+        from pymongo import MongoClient
+        from authentication.mongo_connection import MONGODB_URL
+
+        print(f"\n   backend: mongod at {MONGODB_URL}")
+        client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
+        database = client[f"test_airport_llm_{uuid.uuid4().hex[:8]}"]
+
+    try:
+        print("\n3. Write-Behind")
+        print("-" * 70)
+        asyncio.run(check_write_behind(database["conversations"]))
+
+        print("\n4. Failed Writes")
+        print("-" * 70)
+        asyncio.run(check_failed_writes(database["conversations"]))
+
+        print("\n5. Flush on Stop")
+        print("-" * 70)
+        asyncio.run(check_stop_flushes(database["conversations"]))
+    finally:
+        if client is not None:
+            client.drop_database(database.name)
+            client.close()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_conversation_store()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
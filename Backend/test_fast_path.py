@@ -0,0 +1,154 @@
+"""
+Test the deterministic chat fast path: intent classification, ranking and
+when a query falls through to the LLM
+Run with: python test_fast_path.py
+"""
+
+import asyncio
+
+import Chatbot.chatbot as chatbot
+from Chatbot.chatbot import GroqTravelAssistant
+from Chatbot.fast_path import (
+    classify_intent, clock_minutes, duration_minutes, fast_recommendation, rank_flights
+)
+
+FLIGHTS = [
+    {"id": "AI101", "airline": "Air India", "departure": "2026-03-20T09:15:00", "arrival": "2026-03-20T11:20:00",
+     "duration": "PT2H5M", "price": 6100.0, "currency": "INR"},
+    {"id": "6E202", "airline": "IndiGo", "departure": "06:40", "arrival": "09:10",
+     "duration": "2h 30m", "price": 4800.0, "currency": "INR"},
+    {"id": "UK303", "airline": "Vistara", "departure": "21:05", "arrival": "23:00",
+     "duration": "1h 55m", "price": 7200.0, "currency": "INR"},
+    {"id": "SG404", "airline": "SpiceJet", "departure": "14:30", "arrival": "16:50",
+     "duration": "2h 20m", "price": 4800.0, "currency": "INR"}
+]
+
+
+class StubAmadeus:
+    """Serves FLIGHTS for every route"""
+
+    def __init__(self, flights):
+        self.flights = flights
+
+    async def get_flights(self, source_code, dest_code, departure_date=None, deadline=None):
+        return {"data": {"flights": self.flights}, "source": "mock"}
+
+
+def check_intents():
+    hits = {
+        "What's the cheapest flight?": "cheapest",
+        "show me a budget option": "cheapest",
+        "Lowest fare to Mumbai please": "cheapest",
+        "Which is the fastest?": "fastest",
+        "quickest way there": "fastest",
+        "earliest flight tomorrow": "earliest",
+        "What's the last flight out?": "latest"
+    }
+    misses = [
+        "What's the best flight option?",               # no ranking intent
+        "cheapest or fastest?",                          # two intents
+        "Why is the cheapest flight so cheap?",          # open-ended
+        "cheapest flight under 5000",                    # constraint the ranker can't apply
+        "cheapest non-stop flight",
+        "fastest flight in the evening",
+        "compare the cheapest and the fastest",
+        "",
+    ]
+    for query, intent in hits.items():
+        assert classify_intent(query) == intent, f"{query!r}: {classify_intent(query)}"
+    for query in misses:
+        assert classify_intent(query) is None, f"{query!r} should go to the LLM"
+    print(f"   {len(hits)} queries on the fast path, {len(misses)} sent to the LLM")
+
+
+def check_ranking():
+    assert duration_minutes("2h 30m") == 150 and duration_minutes("PT2H5M") == 125
+    assert duration_minutes("45m") == 45 and duration_minutes("") == float("inf")
+    assert clock_minutes("06:40") == 400 and clock_minutes("2026-03-20T09:15:00") == 555
+    assert clock_minutes("soon") == float("inf")
+
+    order = {intent: [f["id"] for f in rank_flights(FLIGHTS, intent)] for intent in
+             ("cheapest", "fastest", "earliest", "latest")}
+    print(f"   rankings: {order}")
+    # Equal fares break on duration
+    assert order["cheapest"] == ["SG404", "6E202", "AI101", "UK303"]
+    assert order["fastest"] == ["UK303", "AI101", "SG404", "6E202"]
+    assert order["earliest"] == ["6E202", "AI101", "SG404", "UK303"]
+    assert order["latest"] == ["UK303", "SG404", "AI101", "6E202"]
+
+    # Unparseable times rank last for both earliest and latest
+    undated = FLIGHTS + [dict(FLIGHTS[0], id="XX999", departure="TBA")]
+    assert rank_flights(undated, "earliest")[-1]["id"] == "XX999"
+    assert rank_flights(undated, "latest")[-1]["id"] == "XX999"
+
+    answer = fast_recommendation("delhi", "mumbai", "DEL", "BOM", FLIGHTS, "fastest")
+    assert answer["source_city"] == "Delhi" and answer["destination_airport"] == "BOM"
+    assert answer["best_flight"]["id"] == "UK303" and len(answer["all_flights"]) == len(FLIGHTS)
+    assert answer["recommendation_reason"].startswith("Vistara UK303 is the fastest of 4 available flights")
+
+
+async def check_serving_path():
+    """Fast-path hits skip the LLM; misses and unusable flight lists fall through to it"""
+    assistant = GroqTravelAssistant()
+    assistant.amadeus = StubAmadeus(FLIGHTS)
+    chain_calls = []
+    original_get_chain = chatbot.get_chain
+
+    def no_chain():
+        chain_calls.append(1)
+        return None
+
+    chatbot.get_chain = no_chain
+    try:
+        hit = await assistant.get_recommendation("Delhi", "Mumbai", "cheapest flight?")
+        assert hit["source"] == "fast_path" and hit["intent"] == "cheapest"
+        assert hit["data"]["best_flight"]["id"] == "SG404" and not chain_calls
+
+        miss = await assistant.get_recommendation("Delhi", "Mumbai", "Which flight has the best meals?")
+        assert miss["source"] == "mock_recommendation" and len(chain_calls) == 1
+
+        # A flight the model can't validate means no fast answer
+        assistant.amadeus = StubAmadeus(FLIGHTS + [{"id": "BAD", "airline": "?", "price": "n/a"}])
+        invalid = await assistant.get_recommendation("Delhi", "Mumbai", "cheapest flight?")
+        assert invalid["source"] == "mock_recommendation" and len(chain_calls) == 2
+
+        assistant.amadeus = StubAmadeus([])
+        empty = await assistant.get_recommendation("Delhi", "Mumbai", "cheapest flight?")
+        assert empty["source"] == "mock_recommendation" and len(chain_calls) == 3
+    finally:
+        chatbot.get_chain = original_get_chain
+
+    stats = assistant.path_stats.summary()
+    print(f"   serving paths: { {path: s['requests'] for path, s in stats.items()} }")
+    assert stats["fast_path"]["requests"] == 1 and stats["mock_recommendation"]["requests"] == 3
+
+
+def test_fast_path():
+    print("=" * 70)
+    print("CHAT FAST PATH TEST")
+    print("=" * 70)
+
+    print("\n1. Intent Classification")
+    print("-" * 70)
+    check_intents()
+
+    print("\n2. Ranking")
+    print("-" * 70)
+    check_ranking()
+
+    print("\n3. Serving Path")
+    print("-" * 70)
+    asyncio.run(check_serving_path())
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_fast_path()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
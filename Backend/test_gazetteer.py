@@ -0,0 +1,125 @@
+"""
+Test the gazetteer's exact lookups and prefix autocomplete
+Run with: python test_gazetteer.py
+"""
+
+import time
+
+import numpy as np
+
+from Chatbot.gazetteer import Gazetteer, MAX_AUTOCOMPLETE_LIMIT, get_gazetteer, read_airports
+from routes.route_graph import normalize_location
+
+AIRPORTS = [
+    {"iata": "DEL", "city": "Delhi", "airport": "Indira Gandhi International Airport", "state": "Delhi",
+     "aliases": ["new delhi", "dilli"]},
+    {"iata": "BOM", "city": "Mumbai", "airport": "Chhatrapati Shivaji Maharaj International Airport",
+     "state": "Maharashtra", "aliases": ["bombay"]},
+    {"iata": "BLR", "city": "Bangalore", "airport": "Kempegowda International Airport", "state": "Karnataka",
+     "aliases": ["bengaluru"]},
+    {"iata": "IXB", "city": "Bagdogra", "airport": "Bagdogra International Airport", "state": "West Bengal",
+     "aliases": []},
+    # A second row for a city already indexed is ignored
+    {"iata": "XXX", "city": "delhi", "airport": "Duplicate", "state": "Delhi", "aliases": []}
+]
+
+
+def brute_force(places: Gazetteer, query: str, limit: int):
+    """Cities a linear scan would return, in the autocomplete order"""
+    prefix = normalize_location(query)
+    matches = []
+    for place_id, place in enumerate(places.places):
+        names = [normalize_location(name) for name in [place["city"]] + place["aliases"]]
+        if place["iata"]:
+            names.append(place["iata"].lower())
+        if any(name.startswith(prefix) for name in names):
+            matches.append((-int(places.routes[place_id]), place["iata"] is None, place["city"].lower(), place["city"]))
+    return [match[-1] for match in sorted(matches)[:limit]]
+
+
+def check_lookups():
+    places = Gazetteer(AIRPORTS)
+    assert len(places) == 4
+    # Hits by city, alias and code, in any case
+    assert places.airport_code("Delhi") == "DEL" and places.airport_code(" NEW DELHI ") == "DEL"
+    assert places.airport_code("bengaluru") == "BLR"
+    assert places.city_for_code("bom") == "Mumbai" and places.resolve("ixb")["city"] == "Bagdogra"
+    assert places.resolve("Bombay")["airport"] == "Chhatrapati Shivaji Maharaj International Airport"
+    # Misses: unknown names, prefixes of names, and codes that were skipped as duplicates
+    assert places.airport_code("Pune") is None and places.resolve("mumb") is None
+    assert places.resolve("Delh") is None and places.city_for_code("XXX") is None
+    assert places.aliases()["dilli"] == "Delhi" and places.iata_codes()["BLR"] == "Bangalore"
+    print(f"   {len(places)} places, {len(places.aliases())} names, {len(places.iata_codes())} codes")
+
+
+def check_autocomplete():
+    places = Gazetteer(AIRPORTS)
+    # "b" matches Bangalore, Bagdogra and Mumbai (through "bombay" and "bom"), each once
+    assert [hit["city"] for hit in places.autocomplete("b")] == ["Bagdogra", "Bangalore", "Mumbai"]
+    assert [hit["city"] for hit in places.autocomplete("b", limit=2)] == ["Bagdogra", "Bangalore"]
+    assert [hit["city"] for hit in places.autocomplete("Ben")] == ["Bangalore"]
+    assert [hit["city"] for hit in places.autocomplete("dEl")] == ["Delhi"]
+    # Misses
+    assert places.autocomplete("zz") == [] and places.autocomplete("  ") == []
+    assert places.autocomplete("b", limit=0) == []
+    assert Gazetteer([]).autocomplete("a") == []
+
+
+def check_against_scan():
+    """The shared gazetteer (airports + route graph cities) ranks like a linear scan"""
+    started = time.perf_counter()
+    places = get_gazetteer()
+    print(f"   shared gazetteer: {len(places)} places, built in {time.perf_counter() - started:.2f}s")
+    assert places is get_gazetteer()
+    assert len(places.airport_cities()) == len({row["city"].lower() for row in read_airports()})
+
+    # The best-connected airport city comes first for its initial
+    best = places.autocomplete("b", limit=1)[0]
+    assert best["iata"] is not None and best["routes"] == max(hit["routes"] for hit in places.autocomplete("b", 50))
+
+    rng = np.random.default_rng(0)
+    queries = ["a", "b", "del", "mum", "bom", "xyz", "new ", "ixb"]
+    for place_id in rng.choice(len(places), size=60, replace=False).tolist():
+        city = places.places[place_id]["city"]
+        queries.append(city[:int(rng.integers(1, len(city) + 1))])
+    for query in queries:
+        for limit in (1, 10, MAX_AUTOCOMPLETE_LIMIT):
+            got = [hit["city"] for hit in places.autocomplete(query, limit)]
+            assert got == brute_force(places, query, limit), f"{query!r} limit {limit}: {got}"
+
+    started = time.perf_counter()
+    for query in queries:
+        places.autocomplete(query, MAX_AUTOCOMPLETE_LIMIT)
+    elapsed = (time.perf_counter() - started) / len(queries)
+    print(f"   {len(queries)} prefixes match the linear scan; {elapsed * 1e6:.0f}µs per query")
+
+
+def test_gazetteer():
+    print("=" * 70)
+    print("GAZETTEER TEST")
+    print("=" * 70)
+
+    print("\n1. Exact Lookups")
+    print("-" * 70)
+    check_lookups()
+
+    print("\n2. Prefix Autocomplete")
+    print("-" * 70)
+    check_autocomplete()
+
+    print("\n3. Shared Gazetteer vs Linear Scan")
+    print("-" * 70)
+    check_against_scan()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_gazetteer()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
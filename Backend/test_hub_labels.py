@@ -0,0 +1,117 @@
+"""
+Test the hub-label oracle against A* on a slice of the route datasets
+Builds labels for the first rows of each CSV in a temp directory (a full
+build takes minutes per metric)
+Run with: python test_hub_labels.py
+"""
+
+import itertools
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import routes.hub_labels as hub_labels
+from routes.hub_labels import HubLabels, build_hub_labels, read_manifest
+from routes.itinerary_search import ItinerarySearch
+from routes.route_graph import DATASET_DIR, FLIGHT_ROUTES_CSV, TRAIN_ROUTES_CSV, load_route_graph
+
+FLIGHT_ROWS = 2500
+TRAIN_ROWS = 5000
+SAMPLED_PAIRS = 300
+
+
+def slice_datasets(directory: Path):
+    for filename, rows in ((FLIGHT_ROUTES_CSV, FLIGHT_ROWS), (TRAIN_ROUTES_CSV, TRAIN_ROWS)):
+        with open(DATASET_DIR / filename, encoding="utf-8") as source, \
+                open(directory / filename, "w", encoding="utf-8") as target:
+            target.writelines(itertools.islice(source, rows + 1))
+
+
+def check_against_astar(graph, labels: HubLabels, metrics):
+    search = ItinerarySearch(graph)  # no labels: every query runs A*
+    sources = graph.edge_sources()
+    rng = np.random.default_rng(0)
+    # Sample from cities with outgoing edges, so most pairs are connected
+    cities = np.flatnonzero(np.diff(graph.offsets) > 0)
+    pairs = rng.choice(cities, size=(SAMPLED_PAIRS, 2))
+    for metric in metrics:
+        weights = search.edge_weights(metric)
+        reachable = 0
+        for source, target in pairs.tolist():
+            expected = search.search(source, target, metric)
+            cost, _ = labels.distance(source, target, metric)
+            path = labels.shortest_path(source, target, metric)
+            if expected is None:
+                assert cost == float("inf") and path is None, f"{metric} {source}->{target}: labels found a path"
+                continue
+            reachable += 1
+            assert abs(cost - expected[0]) < 1e-6 * max(1.0, expected[0]), \
+                f"{metric} {source}->{target}: labels {cost}, A* {expected[0]}"
+            label_cost, edges = path
+            if source == target:
+                assert edges == []
+                continue
+            assert int(sources[edges[0]]) == source and int(graph.targets[edges[-1]]) == target
+            assert all(int(graph.targets[a]) == int(sources[b]) for a, b in zip(edges, edges[1:])), "disconnected path"
+            assert abs(sum(weights[e] for e in edges) - label_cost) < 1e-6 * max(1.0, label_cost)
+        print(f"   {metric}: {reachable}/{SAMPLED_PAIRS} sampled pairs reachable, all match A*")
+        assert reachable > SAMPLED_PAIRS // 10
+
+
+def check_interrupted_build(dataset_dir: Path, directory: Path):
+    """A build that fails half way leaves no manifest, so the old one can't vouch for new arrays"""
+    original = hub_labels._pruned_labelling
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt("interrupted build")
+
+    hub_labels._pruned_labelling = crash
+    try:
+        build_hub_labels(["time"], directory, dataset_dir)
+        raise AssertionError("build did not fail")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub_labels._pruned_labelling = original
+    assert read_manifest(directory) is None
+    assert not (directory / (hub_labels.MANIFEST_FILE + ".tmp")).exists()
+    print("   interrupted build: manifest removed")
+
+
+def test_hub_labels():
+    print("=" * 70)
+    print("HUB LABEL TEST")
+    print("=" * 70)
+
+    workdir = Path(tempfile.mkdtemp(prefix="hub_labels_"))
+    try:
+        slice_datasets(workdir)
+        directory = workdir / "hub_labels"
+        started = time.perf_counter()
+        manifest = build_hub_labels(["time", "price"], directory, workdir)
+        graph = load_route_graph(workdir)
+        print(f"   {graph.num_cities} cities, {graph.num_edges} edges: labels built in "
+              f"{time.perf_counter() - started:.1f}s")
+        assert read_manifest(directory) == manifest
+        assert hub_labels.staleness_reason(manifest, graph, workdir) is None
+
+        check_against_astar(graph, HubLabels(graph, directory, manifest["metrics"]), manifest["metrics"])
+        check_interrupted_build(workdir, directory)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_hub_labels()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
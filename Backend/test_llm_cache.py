@@ -0,0 +1,133 @@
+"""
+Test the LLM response cache: exact tier, trigram similarity tier, eviction
+and invalidation
+Run with: python test_llm_cache.py
+"""
+
+import time
+
+from Chatbot.llm_cache import LLMResponseCache, SIMILAR_QUERIES_PER_ROUTE, normalize_query
+
+FLIGHTS = [
+    {"id": "AI101", "airline": "Air India", "price": 5200.0, "duration": "2h 10m", "departure": "08:00"},
+    {"id": "6E202", "airline": "IndiGo", "price": 4800.0, "duration": "2h 25m", "departure": "11:30"}
+]
+ANSWER = {"best_flight": FLIGHTS[1], "recommendation_reason": "cheapest"}
+
+
+def check_exact_tier():
+    cache = LLMResponseCache(ttl=60, max_entries=16, similarity_threshold=0)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is best?") == (None, None)
+    cache.store_result("Delhi", "Mumbai", FLIGHTS, "Which flight is best?", ANSWER, llm_seconds=1.5)
+
+    # Case, punctuation, whitespace and flight order don't change the key
+    assert normalize_query("  Which FLIGHT is   best?? ") == "which flight is best"
+    assert cache.lookup(" delhi", "MUMBAI ", list(reversed(FLIGHTS)), "which flight is best") == (ANSWER, "exact")
+    # Different wording is a miss without the similarity tier
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is the best one?") == (None, None)
+
+    stats = cache.stats()
+    print(f"   exact tier: {stats}")
+    assert stats["exact_hits"] == 1 and stats["misses"] == 2 and stats["similar_hits"] == 0
+    assert stats["llm_calls"] == 1 and stats["llm_latency_saved_ms"] == 1500.0
+
+
+def check_similarity_tier():
+    cache = LLMResponseCache(ttl=60, max_entries=16, similarity_threshold=0.8)
+    cache.store_result("Delhi", "Mumbai", FLIGHTS, "What's the best flight option?", ANSWER, llm_seconds=1.0)
+
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "whats the best flight option") == (ANSWER, "similar")
+    # Unrelated wording stays below the threshold
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Is there a refund policy for cancellations?") == (None, None)
+    # Similar queries only match on the same route and flight set
+    assert cache.lookup("Delhi", "Pune", FLIGHTS, "whats the best flight option") == (None, None)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS[:1], "whats the best flight option") == (None, None)
+
+    # Only the latest queries per route are compared
+    for n in range(SIMILAR_QUERIES_PER_ROUTE + 5):
+        cache.store_result("Delhi", "Mumbai", FLIGHTS, f"question number {n} about this route", ANSWER, llm_seconds=1.0)
+    assert len(cache._route_queries[cache.route_digest("Delhi", "Mumbai", FLIGHTS)]) == SIMILAR_QUERIES_PER_ROUTE
+
+    stats = cache.stats()
+    print(f"   similarity tier: similar_hits={stats['similar_hits']}, misses={stats['misses']}")
+    assert stats["similar_hits"] == 1 and stats["misses"] == 3
+
+
+def check_eviction():
+    cache = LLMResponseCache(ttl=60, max_entries=3, similarity_threshold=0.8)
+    for n in range(3):
+        cache.store_result("Delhi", "Mumbai", FLIGHTS, f"query {n}", {"n": n}, llm_seconds=1.0)
+    # Touch query 0 so query 1 is the least recently used
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "query 0") == ({"n": 0}, "exact")
+    cache.store_result("Delhi", "Mumbai", FLIGHTS, "query 3", {"n": 3}, llm_seconds=1.0)
+
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "query 0")[1] == "exact"
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "query 3")[1] == "exact"
+    # The evicted key isn't served, not even through the similarity tier
+    value, tier = cache.lookup("Delhi", "Mumbai", FLIGHTS, "query 1")
+    assert tier != "exact" and value != {"n": 1}
+
+    # Route lists are bounded by the store size too
+    for n in range(6):
+        cache.store_result(f"City {n}", "Mumbai", FLIGHTS, "best flight", {"n": n}, llm_seconds=1.0)
+    assert len(cache._route_queries) <= 3
+
+    stats = cache.stats()
+    print(f"   eviction: entries={stats['entries']}, evictions={stats['evictions']}")
+    assert stats["entries"] == 3 and stats["evictions"] == 7
+
+
+def check_invalidation():
+    cache = LLMResponseCache(ttl=0.2, max_entries=16, similarity_threshold=0.8)
+    cache.store_result("Delhi", "Mumbai", FLIGHTS, "Which flight is best?", ANSWER, llm_seconds=1.0)
+
+    # A changed flight set (new fare) gets a different key
+    repriced = [dict(FLIGHTS[0]), dict(FLIGHTS[1], price=4500.0)]
+    assert cache.lookup("Delhi", "Mumbai", repriced, "Which flight is best?") == (None, None)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is best?") == (ANSWER, "exact")
+
+    # Entries expire after the TTL, on both tiers
+    time.sleep(0.25)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is best?") == (None, None)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "which flight is best") == (None, None)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is the best?") == (None, None)
+
+    # A fresh answer replaces the expired one
+    cache.store_result("Delhi", "Mumbai", FLIGHTS, "Which flight is best?", {"fresh": True}, llm_seconds=1.0)
+    assert cache.lookup("Delhi", "Mumbai", FLIGHTS, "Which flight is best?") == ({"fresh": True}, "exact")
+    print(f"   invalidation: {cache.stats()['misses']} misses after reprice and expiry")
+
+
+def test_llm_cache():
+    print("=" * 70)
+    print("LLM RESPONSE CACHE TEST")
+    print("=" * 70)
+
+    print("\n1. Exact Tier")
+    print("-" * 70)
+    check_exact_tier()
+
+    print("\n2. Similarity Tier")
+    print("-" * 70)
+    check_similarity_tier()
+
+    print("\n3. Eviction")
+    print("-" * 70)
+    check_eviction()
+
+    print("\n4. Invalidation")
+    print("-" * 70)
+    check_invalidation()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_llm_cache()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
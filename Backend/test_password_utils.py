@@ -0,0 +1,170 @@
+"""
+Test the password-hash pool: saturation (503), cancelled callers, and the
+rehash of outdated hashes on login
+Uses mongomock for the login check when installed, otherwise skips it
+Run with: python test_password_utils.py
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+import bcrypt
+
+from authentication.password_utils import (
+    BCRYPT_ROUNDS,
+    HashPool,
+    HashPoolSaturated,
+    hash_password,
+    hash_rounds,
+    needs_rehash,
+    verify_and_rehash,
+    verify_password,
+)
+
+
+async def check_saturation():
+    """workers + queue_limit jobs are admitted; the next caller gets a 503"""
+    pool = HashPool(workers=1, queue_limit=2)
+    release = threading.Event()
+    try:
+        jobs = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["in_flight"] == 3 and pool.stats()["queued"] == 2
+
+        try:
+            await pool.run(time.sleep, 0)
+            raise AssertionError("saturated pool accepted a job")
+        except HashPoolSaturated as e:
+            assert e.status_code == 503 and e.headers == {"Retry-After": "1"}
+
+        release.set()
+        await asyncio.gather(*jobs)
+        stats = pool.stats()
+        print(f"   saturated pool: {stats['completed']} completed, {stats['rejected']} rejected")
+        assert stats["in_flight"] == 0 and stats["completed"] == 3 and stats["rejected"] == 1
+        # Capacity is back
+        assert await pool.run(len, "abc") == 3
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+async def check_cancelled_caller():
+    """A cancelled caller keeps its slot until the hash it started actually ends"""
+    pool = HashPool(workers=1, queue_limit=1)
+    release = threading.Event()
+    try:
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        running.cancel()
+        queued.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        # The queued job never started and is dropped; the running one still holds a worker
+        assert pool.stats()["in_flight"] == 1, pool.stats()
+
+        release.set()
+        for _ in range(100):
+            if pool.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.stats()["in_flight"] == 0
+        print("   cancelled callers: slots freed when their jobs end")
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def check_rehash():
+    legacy = bcrypt.hashpw(b"s3cret-pass", bcrypt.gensalt(4)).decode("ascii")
+    assert hash_rounds(legacy) == 4 and needs_rehash(legacy)
+    current = hash_password("s3cret-pass")
+    assert hash_rounds(current) == BCRYPT_ROUNDS and not needs_rehash(current)
+
+    assert verify_and_rehash("wrong", legacy) == (False, None)
+    assert verify_and_rehash("s3cret-pass", current) == (True, None)
+    valid, new_hash = verify_and_rehash("s3cret-pass", legacy)
+    assert valid and hash_rounds(new_hash) == BCRYPT_ROUNDS and verify_password("s3cret-pass", new_hash)
+    # Garbage never verifies
+    assert not verify_password("s3cret-pass", "not-a-hash")
+    print(f"   4-round hash rehashed at {BCRYPT_ROUNDS} rounds")
+
+
+async def check_rehash_on_login(database):
+    from fastapi import HTTPException
+
+    import authentication.login_api as login_api
+    from authentication.auth_schema import LoginSchema
+    from authentication.repositories import SessionRepository, UserRepository
+
+    original = login_api.users, login_api.sessions
+    login_api.users, login_api.sessions = UserRepository(database), SessionRepository(database)
+    try:
+        legacy = bcrypt.hashpw(b"s3cret-pass", bcrypt.gensalt(4)).decode("ascii")
+        await login_api.users.create({"name": "Ravi", "email": "ravi@example.com", "passwordHash": legacy, "lastLogin": None})
+
+        try:
+            await login_api.login(LoginSchema(email="ravi@example.com", password="wrong-pass"))
+            raise AssertionError("wrong password accepted")
+        except HTTPException as e:
+            assert e.status_code == 401
+        assert (await login_api.users.find_by_email("ravi@example.com"))["passwordHash"] == legacy
+
+        tokens = await login_api.login(LoginSchema(email="ravi@example.com", password="s3cret-pass"))
+        assert tokens["accessToken"] and tokens["refreshToken"]
+        user = await login_api.users.find_by_email("ravi@example.com")
+        assert hash_rounds(user["passwordHash"]) == BCRYPT_ROUNDS and user["lastLogin"] is not None
+
+        # A second login keeps the now-current hash
+        await login_api.login(LoginSchema(email="ravi@example.com", password="s3cret-pass"))
+        assert (await login_api.users.find_by_email("ravi@example.com"))["passwordHash"] == user["passwordHash"]
+        print(f"   login rehashed the stored hash from 4 to {BCRYPT_ROUNDS} rounds")
+    finally:
+        login_api.users, login_api.sessions = original
+
+
+def test_password_utils():
+    print("=" * 70)
+    print("PASSWORD HASH POOL TEST")
+    print("=" * 70)
+
+    print("\n1. Saturation")
+    print("-" * 70)
+    asyncio.run(check_saturation())
+
+    print("\n2. Cancelled Callers")
+    print("-" * 70)
+    asyncio.run(check_cancelled_caller())
+
+    print("\n3. Rehash")
+    print("-" * 70)
+    check_rehash()
+
+    print("\n4. Rehash on Login")
+    print("-" * 70)
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+    if mongomock is not None:
+        asyncio.run(check_rehash_on_login(mongomock.MongoClient()["test_airport_llm"]))
+    else:
+        print("   skipped: mongomock not installed")
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_password_utils()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
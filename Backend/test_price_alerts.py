@@ -0,0 +1,163 @@
+"""
+Test the price-alert matcher and PRICE_DROP notifications
+Uses mongomock when installed, otherwise the mongod at MONGODB_URL
+Run with: python test_price_alerts.py
+"""
+
+import asyncio
+import time
+import uuid
+
+import numpy as np
+
+from authentication.repositories import NotificationRepository, PriceAlertRepository
+from Chatbot.price_alerts import AlertIndex, PriceAlertMatcher, _columns
+
+
+async def run_checks(database):
+    alerts = PriceAlertRepository(database)
+    notifications = NotificationRepository(database)
+    for user, target in [("u1", 5000), ("u2", 4500), ("u3", 4000), ("u4", "not a price")]:
+        await alerts.create(user, "del", "bom", target)
+    await alerts.create("u5", "BOM", "DEL", 9000)
+
+    matcher = PriceAlertMatcher(alerts, notifications, queue_size=2, batch_size=2)
+    loaded = await matcher.load()
+    print(f"   loaded {loaded} alerts ({matcher.invalid_alerts} invalid)")
+    assert loaded == 4 and matcher.invalid_alerts == 1
+
+    # Added after the load: matched from the sorted overflow list
+    matcher.add(await alerts.create("u6", "DEL", "BOM", 4700), "u6", "DEL", "BOM", 4700)
+
+    # Repeated fares for a queued route coalesce into its minimum
+    matcher.observe("DEL", "BOM", [5200, 4800])
+    matcher.observe("del", "bom", [4600])
+    matcher.observe("HYD", "BLR", [100])  # no alerts on this route
+    await matcher.drain()
+    sent = await notifications.unread_for_user("u1") + await notifications.unread_for_user("u6")
+    print(f"   fare 4600 notified: {sorted(n['userId'] for n in sent)}")
+    assert len(sent) == 2 and all(n["type"] == "PRICE_DROP" for n in sent)
+    assert not await notifications.unread_for_user("u2")
+    assert matcher.coalesced == 1 and len(matcher.index) == 3
+
+    # Fired alerts are deactivated; a reload does not re-arm them
+    await matcher.load()
+    matcher.observe("DEL", "BOM", [4600])
+    await matcher.drain()
+    assert matcher.notified == 2
+
+    # A second matcher (another worker) racing on the same alert: one notification
+    other = PriceAlertMatcher(alerts, notifications)
+    await other.load()
+    matcher.observe("BOM", "DEL", [8000])
+    other.observe("BOM", "DEL", [8000])
+    await asyncio.gather(matcher.drain(), other.drain())
+    assert len(await notifications.unread_for_user("u5")) == 1
+
+    # A full queue sheds instead of growing
+    for route in [("DEL", "BOM"), ("BOM", "DEL")]:
+        matcher.add("x", "u7", *route, 1.0)
+    matcher.add("y", "u7", "DEL", "HYD", 1.0)
+    assert matcher.observe("DEL", "BOM", [2]) and matcher.observe("BOM", "DEL", [2])
+    assert not matcher.observe("DEL", "HYD", [2]) and matcher.shed == 1
+
+
+async def check_flush_under_traffic(database):
+    """Fired alerts are written within flush_interval even when the queue never goes idle"""
+    alerts = PriceAlertRepository(database)
+    notifications = NotificationRepository(database)
+    await alerts.create("u8", "DEL", "GOI", 5000)
+    await alerts.create("u9", "BOM", "GOI", 100)  # keeps BOM-GOI observed, never fires
+
+    matcher = PriceAlertMatcher(alerts, notifications, batch_size=500, flush_interval=0.3)
+    await matcher.load()
+    matcher_task = asyncio.ensure_future(matcher._match_loop())
+    try:
+        matcher.observe("DEL", "GOI", [4200])
+        fired_at = time.perf_counter()
+        written_after = None
+        # Other traffic every 20ms, much more often than the flush interval
+        while time.perf_counter() - fired_at < 1.0:
+            matcher.observe("BOM", "GOI", [9000])
+            await asyncio.sleep(0.02)
+            if written_after is None and matcher.notified:
+                written_after = time.perf_counter() - fired_at
+    finally:
+        matcher_task.cancel()
+        await asyncio.gather(matcher_task, return_exceptions=True)
+
+    print(f"   under continuous traffic, notified after {written_after or float('inf'):.2f}s")
+    assert written_after is not None and written_after < 0.3 + 0.15, written_after
+    assert len(await notifications.unread_for_user("u8")) == 1 and matcher.stats()["pending_notifications"] == 0
+
+
+def benchmark_index(total: int = 1_000_000):
+    rng = np.random.default_rng(0)
+    codes = [f"C{i:02d}" for i in range(40)]
+    origin = rng.integers(0, 40, total)
+    destination = (origin + rng.integers(1, 40, total)) % 40
+    rows = [
+        (codes[o], codes[d], float(t), uuid.uuid4().hex[:24], f"{u:024x}")
+        for o, d, t, u in zip(origin, destination, rng.uniform(2000, 9000, total).round(), rng.integers(0, 10**6, total))
+    ]
+    started = time.perf_counter()
+    index = AlertIndex([_columns(rows[i:i + 50000]) for i in range(0, total, 50000)])
+    built = time.perf_counter() - started
+    print(f"   {total:,} alerts indexed in {built:.2f}s, {index.nbytes / total:.0f} bytes/alert")
+
+    expected = sum(1 for o, d, t, _, _ in rows if (o, d) == ("C01", "C02") and t >= 2100)
+    started = time.perf_counter()
+    for _ in range(1000):
+        index.match("C05", "C06", 1.0e9)  # nothing fires: a single binary search
+    miss = (time.perf_counter() - started) / 1000
+    fired = index.match("C01", "C02", 2100)
+    print(f"   non-firing match {miss * 1e6:.1f} µs; fare 2100 fired {len(fired)} alerts")
+    assert len(fired) == expected and index.match("C01", "C02", 2100) == []
+    assert len(index) == total - expected
+
+
+def test_price_alerts():
+    print("=" * 70)
+    print("PRICE ALERT TEST")
+    print("=" * 70)
+
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+
+    if mongomock is not None:
+        print("   backend: mongomock")
+        asyncio.run(run_checks(mongomock.MongoClient()["test_airport_llm"]))
+        asyncio.run(check_flush_under_traffic(mongomock.MongoClient()["test_airport_llm_flush"]))
+    else:
+        from pymongo import AsyncMongoClient
+        from authentication.mongo_connection import MONGODB_URL
+
+        async def against_mongod():
+            client = AsyncMongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
+            name = f"test_airport_llm_{uuid.uuid4().hex[:8]}"
+            try:
+                await run_checks(client[name])
+                await check_flush_under_traffic(client[name])
+            finally:
+                await client.drop_database(name)
+                await client.close()
+
+        print(f"   backend: mongod at {MONGODB_URL}")
+        asyncio.run(against_mongod())
+
+    benchmark_index()
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_price_alerts()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,118 @@
+"""
+Test the price-history store, rollups and forecasts
+Run with: python test_price_history.py
+"""
+
+import asyncio
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from Chatbot.price_history import PriceHistory, offer_prices, rollup
+
+
+async def run_checks(directory: str):
+    history = PriceHistory(directory)
+    start = date(2026, 3, 1)
+
+    # Six days of falling fares for the 20th, rising fares for the 21st
+    for day, base in enumerate([6000, 5800, 5650, 5500, 5300, 5200]):
+        history.record("DEL", "BOM", "2026-03-20", [base, base + 400, base + 900], observed=start + timedelta(days=day))
+        history.record("del", "bom", "2026-03-21", [7000 + day * 100], observed=start + timedelta(days=day))
+        await history.flush()
+
+    stats = history.stats()
+    print(f"   recorded {stats['recorded']} fares into {stats['rollup_rows']} rollup rows")
+    assert stats["recorded"] == 24 and stats["rollup_rows"] == 12
+
+    first = history.daily_stats("DEL", "BOM", "2026-03-20")[0]
+    print(f"   first day: {first}")
+    assert first["min"] == 6000 and first["p50"] == 6400 and first["observations"] == 3
+
+    today = start + timedelta(days=5)
+    falling = history.forecast("DEL", "BOM", "2026-03-20", today=today)
+    rising = history.forecast("DEL", "BOM", "2026-03-21", today=today)
+    print(f"   forecasts: 20th {falling['outlook']} ({falling['expected_change_pct']}%), 21st {rising['outlook']}")
+    assert falling["outlook"] == "likely_cheaper" and rising["outlook"] == "likely_pricier"
+    assert history.forecast("DEL", "BLR", "2026-03-20")["outlook"] == "insufficient_data"
+
+    # A new process rebuilds the same rollups from disk
+    reloaded = PriceHistory(directory)
+    assert reloaded.daily_stats("DEL", "BOM") == history.daily_stats("DEL", "BOM")
+
+
+async def check_shared_directory(directory: str):
+    """Two workers on one directory: closing a day rolls up both workers' rows"""
+    first, second = PriceHistory(directory), PriceHistory(directory)
+    # Both start before either writes, so each only knows its own rows
+    first.load()
+    second.load()
+    day, next_day = date(2026, 3, 1), date(2026, 3, 2)
+
+    first.record("DEL", "BOM", "2026-03-20", [5000, 5200], observed=day)
+    await first.flush()
+    second.record("DEL", "BOM", "2026-03-20", [4800], observed=day)
+    await second.flush()
+
+    # The first worker moves on and closes the day
+    first.record("DEL", "BOM", "2026-03-20", [5100], observed=next_day)
+    await first.flush()
+    # The second still has the day open and writes to it late, then closes it too
+    second.record("DEL", "BOM", "2026-03-20", [4700], observed=day)
+    await second.flush()
+    second.record("DEL", "BOM", "2026-03-20", [4900], observed=next_day)
+    await second.flush()
+
+    closed = PriceHistory(directory).daily_stats("DEL", "BOM", "2026-03-20")[0]
+    print(f"   shared directory: closed day has {closed['observations']} observations from both workers")
+    assert closed["observed_date"] == day.isoformat()
+    assert closed["observations"] == 4 and closed["min"] == 4700
+    assert second.daily_stats("DEL", "BOM", "2026-03-20")[0] == closed
+    assert not list(Path(directory).glob("*.tmp.npz"))
+
+
+def test_price_history():
+    print("=" * 70)
+    print("PRICE HISTORY TEST")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run_checks(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(check_shared_directory(directory))
+
+    # Vectorised percentiles match NumPy's per-group percentile
+    rng = np.random.default_rng(0)
+    n = 50000
+    raw = {
+        "origin": rng.choice(np.array(["DEL", "BOM"], dtype="U8"), n),
+        "destination": np.full(n, "HYD", dtype="U8"),
+        "departure": rng.integers(0, 10, n).astype(np.int32),
+        "observed": rng.integers(0, 5, n).astype(np.int32),
+        "price": rng.uniform(2000, 9000, n).astype(np.float32)
+    }
+    rollups = rollup(raw)
+    group = (raw["origin"] == "DEL") & (raw["departure"] == 3) & (raw["observed"] == 4)
+    row = np.flatnonzero((rollups["origin"] == "DEL") & (rollups["departure"] == 3) & (rollups["observed"] == 4))[0]
+    expected = np.percentile(raw["price"][group].astype(np.float64), [25, 50, 75])
+    print(f"   {len(rollups['count'])} groups from {n} rows; percentiles match numpy")
+    assert np.allclose([rollups["p25"][row], rollups["p50"][row], rollups["p75"][row]], expected, rtol=1e-5)
+    assert rollups["min"][row] == raw["price"][group].min()
+
+    assert offer_prices({"data": [{"price": {"grandTotal": "123.45"}}, {"price": {"total": "99"}}]}) == [123.45, 99.0]
+    assert offer_prices({"flights": [{"price": 3500}]}) == [3500.0]
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_price_history()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
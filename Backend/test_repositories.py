@@ -0,0 +1,118 @@
+"""
+Test the Mongo repositories and index bootstrap
+Uses mongomock when installed, otherwise the mongod at MONGODB_URL
+Run with: python test_repositories.py
+"""
+
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from authentication.repositories import (
+    INDEXES,
+    PRICE_HISTORY,
+    SEARCHES,
+    PriceHistoryRepository,
+    SearchRepository,
+    SessionRepository,
+    UserRepository,
+    ensure_indexes,
+)
+
+
+async def run_checks(database):
+    created = await ensure_indexes(database)
+    print(f"   indexes: {sum(len(names) for names in created.values())} across {len(created)} collections")
+    assert set(created) == set(INDEXES)
+    # Route lookups on searches and price history use the compound (origin, destination, date) indexes
+    assert "route_date" in created[SEARCHES] and "route_date_recorded" in created[PRICE_HISTORY]
+    # Idempotent
+    await ensure_indexes(database)
+
+    users = UserRepository(database)
+    await users.create({"name": "Asha", "email": "asha@example.com", "passwordHash": "x", "lastLogin": None})
+    try:
+        await users.create({"name": "Asha 2", "email": "asha@example.com", "passwordHash": "y"})
+        raise AssertionError("duplicate email accepted")
+    except DuplicateKeyError:
+        print("   duplicate email rejected by the unique index")
+    user = await users.find_by_email("asha@example.com")
+    await users.record_login(user["_id"], "rehashed")
+    user = await users.find_by_email("asha@example.com")
+    assert user["passwordHash"] == "rehashed" and user["lastLogin"] is not None
+
+    searches = SearchRepository(database)
+    for day in range(3):
+        await searches.record("u1", "DEL", "BOM", date(2026, 3, 1) + timedelta(days=day))
+    recent = await searches.recent_for_user("u1", limit=2)
+    print(f"   recent searches: {len(recent)}")
+    assert len(recent) == 2 and recent[0]["searchedAt"] >= recent[1]["searchedAt"]
+    # BSON has no date type: calendar dates are stored as midnight datetimes
+    assert all(type(search["departureDate"]) is datetime and search["returnDate"] is None for search in recent)
+
+    prices = PriceHistoryRepository(database)
+    start = datetime(2026, 2, 1)
+    for i, price in enumerate([5200, 4900, 5100]):
+        await prices.record("DEL", "BOM", date(2026, 3, 1), price, recorded_at=start + timedelta(days=i))
+    await prices.record("DEL", "BOM", date(2026, 3, 2), 4500, recorded_at=start)
+    history = await prices.history("DEL", "BOM", date(2026, 3, 1))
+    print(f"   price history for one date: {[entry['price'] for entry in history]}")
+    assert [entry["price"] for entry in history] == ["5200", "4900", "5100"]
+    assert len(await prices.history("DEL", "BOM")) == 4 and len(await prices.history("DEL", "BOM", limit=2)) == 2
+
+    sessions = SessionRepository(database)
+    expires = datetime.utcnow() + timedelta(days=1)
+    await sessions.create_refresh_session("s1", "u1", "digest-1", expires)
+    assert await sessions.rotate_refresh("s1", "digest-1", "digest-2", expires) is not None
+    # The old digest can't be redeemed twice
+    assert await sessions.rotate_refresh("s1", "digest-1", "digest-3", expires) is None
+    cutoff = datetime.utcnow() - timedelta(seconds=1)
+    await sessions.revoke("s1")
+    assert await sessions.rotate_refresh("s1", "digest-2", "digest-3", expires) is None
+    assert await sessions.revoked_since(cutoff) == ["s1"]
+    print(f"   refresh sessions: {len(await sessions.for_user('u1'))} for u1, rotated then revoked")
+
+
+def test_repositories():
+    print("=" * 70)
+    print("MONGO REPOSITORIES TEST")
+    print("=" * 70)
+
+    try:
+        import mongomock
+    except ImportError:
+        mongomock = None
+
+    if mongomock is not None:
+        print("   backend: mongomock")
+        asyncio.run(run_checks(mongomock.MongoClient()["test_airport_llm"]))
+    else:
+        from pymongo import AsyncMongoClient
+        from authentication.mongo_connection import MONGODB_URL
+
+        async def against_mongod():
+            client = AsyncMongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000)
+            name = f"test_airport_llm_{uuid.uuid4().hex[:8]}"
+            try:
+                await run_checks(client[name])
+            finally:
+                await client.drop_database(name)
+                await client.close()
+
+        print(f"   backend: mongod at {MONGODB_URL}")
+        asyncio.run(against_mongod())
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_repositories()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
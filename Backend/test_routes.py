@@ -3,9 +3,199 @@ Quick test script to demonstrate the route recommendation feature
 Run with: python test_routes.py
 """
 
+import asyncio
 import json
-from routes.route_recommendations import recommend_routes, get_available_routes
-from schemas.route import RouteRecommendationRequest
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from fastapi.testclient import TestClient
+from main import API_INDEX_BODY
+from routes.itinerary_search import get_itinerary_search, pareto_front
+from routes import route_graph as route_graph_module
+from routes.json_responses import JSONBytesResponse, render_result
+from routes.route_graph import (
+    DATASET_DIR,
+    FLIGHT_ROUTES_CSV,
+    SNAPSHOT_COLUMNS,
+    TRAIN_ROUTES_CSV,
+    load_route_graph,
+    load_snapshot,
+    read_snapshot_manifest,
+    snapshot_staleness,
+    write_snapshot,
+)
+from routes.route_recommendations import app as route_router, recommend_routes, recommend_routes_batch
+from schemas.route import RouteRecommendationRequest, RouteRecommendationResponse
+
+
+def page_etag(client: TestClient, params: dict) -> str:
+    return client.get("/api/routes/available-routes", params=params).headers["etag"]
+
+
+def per_call(function, repeat: int = 2000) -> float:
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def benchmark_serialization(response: RouteRecommendationResponse, batch: dict):
+    """Per-request encoding cost: FastAPI's default path vs the trusted/orjson path"""
+    field = APIRoute("/recommend", recommend_routes, response_model=RouteRecommendationResponse).response_field
+    loop = asyncio.new_event_loop()
+
+    def default_model():
+        # What FastAPI does with a returned model: validate, dump to a dict, json.dumps
+        content = loop.run_until_complete(serialize_response(field=field, response_content=response))
+        return JSONResponse(content).body
+
+    index = json.loads(API_INDEX_BODY)
+    cases = [
+        ("recommend (model)", default_model, lambda: render_result(response).body),
+        ("batch (dict)", lambda: JSONResponse(jsonable_encoder(batch)).body, lambda: render_result(batch).body),
+        ("/ (static)", lambda: JSONResponse(jsonable_encoder(index)).body, lambda: JSONBytesResponse(API_INDEX_BODY).body)
+    ]
+    try:
+        for name, before, after in cases:
+            assert json.loads(before()) == json.loads(after())
+            before_us, after_us = per_call(before), per_call(after)
+            print(f"   {name:20} {before_us:8.1f} µs → {after_us:6.1f} µs ({before_us / after_us:.1f}x)")
+            assert after_us < before_us
+        empty = per_call(lambda: loop.run_until_complete(asyncio.sleep(0)))
+        print(f"   (event-loop round trip in the model baseline: {empty:.1f} µs)")
+    finally:
+        loop.close()
+
+
+def check_k_best(source: str, destination: str, k: int = 8, **constraints) -> int:
+    """k_shortest paths are connected, loopless and in non-decreasing cost order"""
+    search = get_itinerary_search()
+    graph = search.graph
+    source_id, target_id = graph.city_id(source), graph.city_id(destination)
+    sources = graph.edge_sources()
+    for metric in ("time", "price"):
+        weights = search.edge_weights(metric)
+        paths = search.k_shortest(source_id, target_id, k=k, metric=metric, **constraints)
+        assert paths, f"no {metric} paths {source} → {destination}"
+        costs = [cost for cost, _ in paths]
+        assert costs == sorted(costs), f"{metric} costs out of order: {costs}"
+        assert len({tuple(edges) for _, edges in paths}) == len(paths), "duplicate path"
+        for cost, edges in paths:
+            cities = [int(sources[edges[0]])] + [int(graph.targets[e]) for e in edges]
+            assert cities[0] == source_id and cities[-1] == target_id
+            assert all(int(sources[e]) == city for e, city in zip(edges, cities)), "disconnected path"
+            assert len(set(cities)) == len(cities), f"path revisits a city: {cities}"
+            assert abs(sum(weights[e] for e in edges) - cost) < 1e-6 * max(1.0, cost)
+            if "max_transfers" in constraints:
+                assert len(edges) - 1 <= constraints["max_transfers"]
+    return len(paths)
+
+
+def check_pareto_front(source: str, destination: str, k: int = 12):
+    """No front itinerary is dominated, and every dropped one is dominated by (or equal to) a kept one"""
+    search = get_itinerary_search()
+    graph = search.graph
+    paths = search.k_shortest(graph.city_id(source), graph.city_id(destination), k=k)
+    itineraries = [search.build_itinerary(edges) for _, edges in paths]
+    front = pareto_front(itineraries)
+
+    def criteria(itinerary: dict) -> tuple:
+        return itinerary["total_hours"], itinerary["total_price"], itinerary["transfers"]
+
+    def dominates(a: tuple, b: tuple) -> bool:
+        return all(x <= y for x, y in zip(a, b)) and a != b
+
+    assert front
+    for kept in front:
+        assert not any(dominates(criteria(other), criteria(kept)) for other in itineraries)
+    for dropped in itineraries:
+        if dropped not in front:
+            assert any(dominates(criteria(kept), criteria(dropped)) or criteria(kept) == criteria(dropped)
+                       for kept in front)
+    return len(itineraries), len(front)
+
+
+def check_snapshot():
+    """Snapshot round trip in a scratch directory: memory-mapped, identical lookups, CSV fallback when stale"""
+    with tempfile.TemporaryDirectory() as scratch:
+        dataset_dir, snapshot_dir = Path(scratch) / "dataset", Path(scratch) / "route_snapshot"
+        dataset_dir.mkdir()
+        for filename in (FLIGHT_ROUTES_CSV, TRAIN_ROUTES_CSV):
+            shutil.copy2(DATASET_DIR / filename, dataset_dir / filename)
+
+        parsed = load_route_graph(dataset_dir)
+        manifest = write_snapshot(parsed, snapshot_dir, dataset_dir)
+        assert manifest["num_edges"] == parsed.num_edges and snapshot_staleness(manifest, dataset_dir) is None
+        mapped = load_snapshot(snapshot_dir, dataset_dir)
+        assert mapped is not None and mapped.city_names == parsed.city_names
+        assert all(isinstance(getattr(mapped, column), np.memmap) for column in SNAPSHOT_COLUMNS)
+        assert mapped.fingerprint() == parsed.fingerprint() == manifest["graph_fingerprint"]
+
+        rng = np.random.default_rng(0)
+        sources = rng.integers(0, parsed.num_cities, 300).tolist()
+        pairs = [(source, int(parsed.targets[edge])) for source in sources for edge in parsed.out_edges(source)][:500]
+        pairs += list(zip(sources, rng.integers(0, parsed.num_cities, 300).tolist()))
+        for source, destination in pairs:
+            edges = parsed.edges_between(source, destination)
+            assert np.array_equal(mapped.edges_between(source, destination), edges)
+            for column in ("modes", "distance_km", "time_hr", "price", "daily_services"):
+                assert np.array_equal(getattr(mapped, column)[edges], getattr(parsed, column)[edges])
+        delhi, mumbai = mapped.city_id("Delhi"), mapped.city_id("mumbai")
+        assert [mapped.mode_name(edge) for edge in mapped.edges_between(delhi, mumbai)] == \
+            [parsed.mode_name(edge) for edge in parsed.edges_between(delhi, mumbai)]
+        print(f"   snapshot: {mapped.num_cities} cities, {mapped.num_edges} edges memory-mapped; "
+              f"{len(pairs)} edges_between lookups match the CSV build")
+
+        # The shared loader prefers the snapshot and parses the CSVs only when it is stale
+        parses = []
+        original = (route_graph_module.route_graph, route_graph_module.load_snapshot,
+                    route_graph_module.load_route_graph, route_graph_module.CURATED_ROUTES)
+
+        def parse_csvs():
+            parses.append(1)
+            return load_route_graph(dataset_dir)
+
+        def shared_graph():
+            route_graph_module.route_graph = None
+            return route_graph_module.get_route_graph()
+
+        route_graph_module.load_snapshot = lambda: load_snapshot(snapshot_dir, dataset_dir)
+        route_graph_module.load_route_graph = parse_csvs
+        try:
+            assert isinstance(shared_graph().targets, np.memmap) and not parses
+
+            # A touched CSV makes the snapshot stale
+            touched = dataset_dir / TRAIN_ROUTES_CSV
+            stat = touched.stat()
+            os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+            reason = snapshot_staleness(read_snapshot_manifest(snapshot_dir), dataset_dir)
+            assert reason == f"{TRAIN_ROUTES_CSV} changed since snapshot", reason
+            graph = shared_graph()
+            assert len(parses) == 1 and not isinstance(graph.targets, np.memmap)
+            assert graph.fingerprint() == parsed.fingerprint()
+
+            # So does a change to the curated routes
+            write_snapshot(parsed, snapshot_dir, dataset_dir)
+            assert isinstance(shared_graph().targets, np.memmap) and len(parses) == 1
+            curated = dict(route_graph_module.CURATED_ROUTES)
+            curated[("delhi", "nagpur")] = dict(curated[("delhi", "nagpur")], distance_km=1)
+            route_graph_module.CURATED_ROUTES = curated
+            reason = snapshot_staleness(read_snapshot_manifest(snapshot_dir), dataset_dir)
+            assert reason == "curated routes changed since snapshot", reason
+            assert not isinstance(shared_graph().targets, np.memmap) and len(parses) == 2
+            print(f"   stale snapshot ignored ({reason}); CSVs parsed {len(parses)} times")
+        finally:
+            (route_graph_module.route_graph, route_graph_module.load_snapshot,
+             route_graph_module.load_route_graph, route_graph_module.CURATED_ROUTES) = original
 
 
 def test_route_recommendations():
@@ -18,8 +208,13 @@ def test_route_recommendations():
     # Test 1: Get available routes
     print("\n1. Available Routes in System:")
     print("-" * 70)
-    available = get_available_routes()
-    for route in available["routes"]:
+    client = TestClient(FastAPI())
+    client.app.include_router(route_router, prefix="/api")
+    listing = client.get("/api/routes/available-routes")
+    assert listing.status_code == 200
+    available = listing.json()
+    print(f"   {available['total_routes']} routes loaded (showing first 10)")
+    for route in available["routes"][:10]:
         print(f"   {route['source']:15} → {route['destination']:15} ({route['distance_km']} km)")
     
     # Test 2: Recommend routes for Delhi to Nagpur
@@ -63,6 +258,103 @@ def test_route_recommendations():
     for mode in response2.travel_modes:
         print(f"   {mode.mode.upper():8} → {mode.duration:15} : ₹{mode.price:6} | {mode.comfort_level}")
     
+    # Test 4: Multi-leg itinerary (no direct route)
+    print("\n4. Multi-leg Itinerary: Hyderabad → Mumbai (fastest)")
+    print("-" * 70)
+
+    request3 = RouteRecommendationRequest(
+        source="Hyderabad",
+        destination="Mumbai",
+        search_mode="multi_leg",
+        optimize="time"
+    )
+
+    response3 = recommend_routes(request3)
+    itinerary = response3.itineraries[0]
+
+    for leg in itinerary.legs:
+        print(f"   {leg.mode.upper():8} {leg.source:12} → {leg.destination:12} {leg.duration:15} ₹{leg.price}")
+    print(f"   Total: {itinerary.total_duration}, ₹{itinerary.total_price}, {itinerary.transfers} transfer(s)")
+
+    # Test 5: Batch of pairs, including one unknown route
+    print("\n5. Batch Recommendations")
+    print("-" * 70)
+
+    batch = recommend_routes_batch([
+        RouteRecommendationRequest(source="Delhi", destination="Nagpur"),
+        RouteRecommendationRequest(source="Atlantis", destination="Nagpur"),
+        RouteRecommendationRequest(source="Bangalore", destination="Mumbai"),
+        RouteRecommendationRequest(source="Delhi", destination="Nagpur", travel_date="2020-01-01")
+    ])
+
+    for request_item, item in zip(
+        ["Delhi → Nagpur", "Atlantis → Nagpur", "Bangalore → Mumbai", "Delhi → Nagpur (2020)"], batch["results"]
+    ):
+        if item["status_code"] == 200:
+            print(f"   {request_item:20} → {item['result']['best_for']['cheapest']}")
+        else:
+            print(f"   {request_item:20} → {item['status_code']}: {item['detail'][:40]}")
+
+    assert batch["results"][0]["result"] == response.model_dump()
+    assert batch["results"][1]["status_code"] == 404
+    assert batch["results"][3]["status_code"] == 400
+
+    # Over HTTP a batch item is byte-for-byte the /recommend body, number types included
+    pairs = [(route["source"], route["destination"]) for route in available["routes"][:20]] + [("Delhi", "Nagpur")]
+    http_batch = client.post(
+        "/api/routes/recommend/batch", json=[{"source": source, "destination": destination} for source, destination in pairs]
+    ).json()
+    for (source, destination), item in zip(pairs, http_batch["results"]):
+        single = client.post("/api/routes/recommend", json={"source": source, "destination": destination})
+        assert item["status_code"] == single.status_code == 200, (source, destination)
+        assert json.dumps(item["result"]) == json.dumps(single.json()), (source, destination)
+        assert all(type(mode["price"]) is int for mode in item["result"]["travel_modes"])
+    print(f"   {len(pairs)} batch items identical to /recommend")
+
+    # Test 6: Route catalogue filters, pagination and ETags
+    print("\n6. Route Catalogue Filters")
+    print("-" * 70)
+
+    trains = client.get("/api/routes/available-routes", params={"mode": "train", "max_distance": 500}).json()
+    assert all("train" in route["modes"] and route["distance_km"] <= 500 for route in trains["routes"])
+    from_delhi = client.get("/api/routes/available-routes", params={"source": "delhi", "mode": "plane"}).json()
+    expected = [
+        route for route in available["routes"] if route["source"] == "Delhi" and "plane" in route["modes"]
+    ]
+    assert from_delhi["routes"] == expected
+    page = client.get("/api/routes/available-routes", params={"offset": 5, "limit": 3}).json()
+    assert page["routes"] == available["routes"][5:8] and page["total_routes"] == available["total_routes"]
+    print(f"   train ≤ 500 km: {trains['total_routes']}, plane from Delhi: {from_delhi['total_routes']}")
+
+    etag = listing.headers["etag"]
+    revalidated = client.get("/api/routes/available-routes", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and not revalidated.content
+    assert page_etag(client, {"offset": 5, "limit": 3}) != etag
+    assert client.get("/api/routes/available-routes", params={"mode": "boat"}).status_code == 400
+    print(f"   If-None-Match {etag} → {revalidated.status_code}")
+
+    # Test 7: Serialisation cost per request, before and after
+    print("\n7. Response Serialisation")
+    print("-" * 70)
+    benchmark_serialization(response, batch)
+    recommended = client.post("/api/routes/recommend", json={"source": "Delhi", "destination": "Nagpur"})
+    assert recommended.json() == json.loads(response.model_dump_json())
+
+    # Test 8: K-best paths and the Pareto filter
+    print("\n8. K-best Paths and Pareto Front")
+    print("-" * 70)
+    for source, destination in [("Hyderabad", "Mumbai"), ("Delhi", "Nagpur")]:
+        found = check_k_best(source, destination)
+        limited = check_k_best(source, destination, max_transfers=1)
+        total, kept = check_pareto_front(source, destination)
+        print(f"   {source} → {destination}: {found} paths ({limited} with ≤1 transfer), "
+              f"Pareto front keeps {kept} of {total}")
+
+    # Test 9: Memory-mapped route snapshot
+    print("\n9. Route Graph Snapshot")
+    print("-" * 70)
+    check_snapshot()
+
     print("\n" + "=" * 70)
     print("✅ All tests passed!")
     print("=" * 70)
@@ -0,0 +1,251 @@
+"""
+Test the streamed (SSE) recommendation and chat: event order, the
+recommendation_reason deltas parsed from partial JSON, the per-chunk
+deadline, the error event and the /chat/stream clarification
+Run with: python test_streaming.py
+"""
+
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake import FakeStreamingListLLM
+
+import Chatbot.chatbot as chatbot
+from Chatbot.chatbot import GroqTravelAssistant, groq_upstream, output_parser, prompt_template
+from Chatbot.resilience import Deadline
+from Chatbot.routes import app as chat_router
+
+FLIGHTS = [
+    {"id": "AI101", "airline": "Air India", "departure": "09:15", "arrival": "11:20",
+     "duration": "2h 5m", "price": 6100.0, "currency": "INR"},
+    {"id": "6E202", "airline": "IndiGo", "departure": "06:40", "arrival": "09:10",
+     "duration": "2h 30m", "price": 4800.0, "currency": "INR"},
+    {"id": "UK303", "airline": "Vistara", "departure": "21:05", "arrival": "23:00",
+     "duration": "1h 55m", "price": 7200.0, "currency": "INR"}
+]
+REASON = "IndiGo 6E202 is the cheapest option and leaves early enough to make a morning meeting."
+LLM_ANSWER = {
+    "source_city": "Delhi", "destination_city": "Mumbai", "source_airport": "DEL", "destination_airport": "BOM",
+    "best_flight": FLIGHTS[1], "all_flights": FLIGHTS, "recommendation_reason": REASON
+}
+OPEN_QUERY = "Which flight has the best meals?"
+
+
+class StubAmadeus:
+    """Serves FLIGHTS for every route, or raises ``error``"""
+
+    def __init__(self, flights, error: Exception = None):
+        self.flights = flights
+        self.error = error
+        self.calls = 0
+
+    async def get_flights(self, source_code, dest_code, departure_date=None, deadline=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return {"data": {"flights": self.flights}, "source": "mock"}
+
+
+class StallingChain:
+    """Streams one partial object, then stalls on the next chunk"""
+
+    def __init__(self, stall: float):
+        self.stall = stall
+        self.called = False
+        self.closed = False
+
+    def astream(self, inputs):
+        self.called = True
+        return self._chunks()
+
+    async def _chunks(self):
+        try:
+            yield {"recommendation_reason": "Cheap"}
+            await asyncio.sleep(self.stall)
+            yield {"recommendation_reason": "Cheapest of all"}
+        finally:
+            self.closed = True
+
+
+def streaming_chain(answer: dict):
+    """The real prompt and JSON parser over a fake LLM that streams the answer a character at a time"""
+    return prompt_template | FakeStreamingListLLM(responses=[json.dumps(answer)]) | output_parser
+
+
+def assistant_with(amadeus) -> GroqTravelAssistant:
+    assistant = GroqTravelAssistant()
+    assistant.amadeus = amadeus
+    return assistant
+
+
+async def collect(events):
+    return [(event, data) async for event, data in events]
+
+
+def names(events):
+    """Event names with runs of reason deltas collapsed"""
+    collapsed = []
+    for event, _ in events:
+        if not (event == "reason" and collapsed and collapsed[-1] == "reason"):
+            collapsed.append(event)
+    return collapsed
+
+
+def reason_text(events) -> str:
+    return "".join(data["delta"] for event, data in events if event == "reason")
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: "), block
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+async def check_llm_stream():
+    """route, flights, reason deltas, recommendation, done; the deltas rebuild the reason"""
+    assistant = assistant_with(StubAmadeus(FLIGHTS))
+    events = await collect(assistant.stream_recommendation("delhi", "mumbai", OPEN_QUERY))
+    assert names(events) == ["route", "flights", "reason", "recommendation", "done"], names(events)
+
+    route, flights = events[0][1], events[1][1]
+    assert route == {"source_city": "Delhi", "destination_city": "Mumbai",
+                     "source_airport": "DEL", "destination_airport": "BOM"}
+    # Without a ranking intent the flights are listed cheapest first
+    assert [f["id"] for f in flights["all_flights"]] == ["6E202", "AI101", "UK303"]
+
+    deltas = [data["delta"] for event, data in events if event == "reason"]
+    print(f"   recommendation_reason streamed in {len(deltas)} deltas")
+    assert len(deltas) > 10 and all(deltas) and reason_text(events) == REASON
+    assert events[-2] == ("recommendation", LLM_ANSWER)
+    assert events[-1][1] == {"source": "groq_ai", "amadeus_source": "mock"}
+
+    # The same question again comes from the LLM cache, as one delta
+    again = await collect(assistant.stream_recommendation("delhi", "mumbai", OPEN_QUERY))
+    assert names(again) == names(events) and reason_text(again) == REASON
+    assert [event for event, _ in again].count("reason") == 1 and again[-1][1]["source"] == "groq_ai_cached"
+
+    # A ranking question never reaches the LLM
+    fast = await collect(assistant.stream_recommendation("delhi", "mumbai", "fastest flight?"))
+    assert names(fast) == ["route", "flights", "reason", "recommendation", "done"]
+    assert fast[1][1]["all_flights"][0]["id"] == "UK303" and fast[-1][1]["source"] == "fast_path"
+    assert fast[-2][1]["best_flight"]["id"] == "UK303"
+
+
+async def check_chunk_deadline():
+    """A chunk that outlives the deadline ends the LLM stream; the mock answer follows"""
+    assistant = assistant_with(StubAmadeus(FLIGHTS))
+    stalling = StallingChain(stall=5)
+    chatbot.get_chain = lambda: stalling
+    failures = groq_upstream.breaker.consecutive_failures
+    events = await collect(assistant.stream_recommendation(
+        "delhi", "mumbai", OPEN_QUERY, deadline=Deadline(chatbot.GROQ_MIN_BUDGET + 0.3)
+    ))
+    assert names(events) == ["route", "flights", "reason", "recommendation", "done"], names(events)
+    deltas = [data["delta"] for event, data in events if event == "reason"]
+    # The first chunk arrived in time; the mock reason comes after it
+    assert deltas[0] == "Cheap" and len(deltas) == 2 and "mock" in deltas[1]
+    assert events[-1][1]["source"] == "mock_recommendation" and assistant.llm_deadline_misses == 1
+    # The stream is closed, and running out of time is not an upstream failure
+    assert stalling.closed and groq_upstream.breaker.consecutive_failures == failures
+
+    # Less than GROQ_MIN_BUDGET left: the LLM is not called at all
+    skipped = StallingChain(stall=0)
+    chatbot.get_chain = lambda: skipped
+    events = await collect(assistant.stream_recommendation(
+        "delhi", "mumbai", OPEN_QUERY, deadline=Deadline(chatbot.GROQ_MIN_BUDGET / 2)
+    ))
+    assert events[-1][1]["source"] == "mock_recommendation" and assistant.llm_deadline_misses == 2
+    assert not skipped.called
+    print(f"   stalled chunk cut off by the deadline ({assistant.llm_deadline_misses} deadline misses)")
+
+
+async def check_error_event():
+    assistant = assistant_with(StubAmadeus(FLIGHTS, error=RuntimeError("flight search failed")))
+    events = await collect(assistant.stream_recommendation("delhi", "mumbai", OPEN_QUERY))
+    assert events[0][0] == "route" and events[1:] == [("error", {"message": "flight search failed"})]
+    assert assistant.path_stats.summary()["error"]["requests"] == 1
+    print("   upstream exception sent as an error event")
+
+
+def check_sse_endpoints():
+    assistant = assistant_with(StubAmadeus(FLIGHTS))
+    original = chatbot.travel_assistant
+    chatbot.travel_assistant = assistant
+    try:
+        api = FastAPI()
+        api.include_router(chat_router)
+        client = TestClient(api)
+
+        # No route in the message: session, then one clarification, and no flight search
+        response = client.post("/chat/chat/stream", json={"message": "hello there", "session_id": "s-clarify"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["cache-control"] == "no-cache"
+        events = parse_sse(response.text)
+        assert events == [("session", {"session_id": "s-clarify"}), ("clarification", chatbot.CLARIFICATION_RESPONSE)]
+        assert assistant.amadeus.calls == 0
+        history = assistant.conversations.history("s-clarify")
+        assert [m["role"] for m in history] == ["user", "assistant"]
+        assert history[1]["content"] == chatbot.CLARIFICATION_RESPONSE["message"]
+
+        # A route: the session event, then the recommendation stream; the reason lands in the history
+        response = client.post("/chat/chat/stream", json={"message": f"Delhi to Mumbai. {OPEN_QUERY}"})
+        events = parse_sse(response.text)
+        session_id = events[0][1]["session_id"]
+        assert names(events) == ["session", "route", "flights", "reason", "recommendation", "done"], names(events)
+        assert assistant.conversations.history(session_id)[-1]["content"] == REASON
+
+        response = client.post("/chat/recommend/stream", json={"source": "Delhi", "destination": "Mumbai",
+                                                               "query": "cheapest?"})
+        events = parse_sse(response.text)
+        assert names(events) == ["route", "flights", "reason", "recommendation", "done"]
+        assert events[-1][1]["source"] == "fast_path"
+        print(f"   /chat/stream and /recommend/stream: {len(events)} SSE events")
+    finally:
+        chatbot.travel_assistant = original
+
+
+def test_streaming():
+    print("=" * 70)
+    print("STREAMING (SSE) TEST")
+    print("=" * 70)
+
+    original_get_chain = chatbot.get_chain
+    chatbot.get_chain = lambda: streaming_chain(LLM_ANSWER)
+    try:
+        print("\n1. Event Order and Reason Deltas")
+        print("-" * 70)
+        asyncio.run(check_llm_stream())
+
+        print("\n2. Per-Chunk Deadline")
+        print("-" * 70)
+        asyncio.run(check_chunk_deadline())
+
+        print("\n3. Error Event")
+        print("-" * 70)
+        asyncio.run(check_error_event())
+
+        print("\n4. SSE Endpoints")
+        print("-" * 70)
+        chatbot.get_chain = lambda: streaming_chain(LLM_ANSWER)
+        check_sse_endpoints()
+    finally:
+        chatbot.get_chain = original_get_chain
+
+    print("\n" + "=" * 70)
+    print("✅ All tests passed!")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    try:
+        test_streaming()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()